@@ -0,0 +1,6 @@
+from todo_app.asgi import create_async_app
+
+app = create_async_app()
+
+if __name__ == '__main__':
+    app.run(debug=True)
@@ -0,0 +1,155 @@
+"""Benchmark: throughput and p50/p99 latency of every API route at a given collection size.
+
+    python -m benchmarks.api [--backend memory|mongo] [--count 10000]
+        [--requests 500] [--duration 5] [--output api.json]
+
+Seeds --count todos (10 categories, a third of them overdue) into an empty
+collection, then calls each route in-process through Flask's test client,
+so the numbers cover routing, the query and serialization but not the
+network. With --backend mongo the todos go to MONGO_URI, whose todos
+collection is cleared first: point it at a scratch database. Run with
+10000, 100000 and 1000000 to see how each route scales.
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+from todo_app import create_app
+from todo_app.config import Config
+from todo_app.models.todo import Todo
+from todo_app.streaming import NDJSON_MIMETYPE
+from benchmarks import results
+
+SEED_BATCH_SIZE = 10000
+
+# Rows per POST /api/todos/import call
+IMPORT_ROWS = 100
+
+
+def make_todos(count):
+    now = datetime.utcnow()
+    for i in range(count):
+        yield Todo(f'Todo number {i}', category=f'Category {i % 10}',
+                   due_date=now + timedelta(hours=i - count // 3) if i % 5 else None,
+                   completed=i % 4 == 0)
+
+
+def seed(count):
+    """Replace the collection with count todos, returning their ids"""
+    Todo.clear_all()
+    ids, batch = [], []
+    for todo in make_todos(count):
+        batch.append(todo)
+        if len(batch) == SEED_BATCH_SIZE:
+            ids.extend(Todo.insert_many(batch).inserted_ids)
+            batch = []
+    if batch:
+        ids.extend(Todo.insert_many(batch).inserted_ids)
+    return ids
+
+
+def routes(ids):
+    """(name, method, path or path factory, body factory) for every route.
+
+    Factories take the call's sequence number so writes touch a different
+    seeded todo each time. A body factory returns a JSON payload, or bytes
+    to send as NDJSON.
+    """
+    update = {'title': 'Updated', 'completed': True}
+    return [
+        ('list first page', 'GET', '/api/todos?limit=20', None),
+        ('list by category', 'GET', '/api/todos?category=Category%203&limit=20', None),
+        ('list sorted by due', 'GET', '/api/todos?sort=due&order=desc&limit=20', None),
+        ('list sparse fields', 'GET', '/api/todos?fields=id,title&limit=100', None),
+        ('search', 'GET', '/api/todos?q=number&limit=20', None),
+        # Cycles over 100 todos, so after the first pass reads come from the todo cache
+        ('get one', 'GET', lambda i: f'/api/todos/{ids[i % min(100, len(ids))]}', None),
+        ('stream ndjson', 'GET', '/api/todos?stream=true', None),
+        ('export csv', 'GET', '/api/todos/export?format=csv', None),
+        ('create', 'POST', '/api/todos', lambda i: {'title': f'Benchmark {i}', 'category': 'Bench'}),
+        ('update', 'PUT', lambda i: f'/api/todos/{ids[i % len(ids)]}', lambda i: update),
+        ('bulk (50 ops)', 'POST', '/api/todos/bulk', lambda i: {'operations': [
+            {'op': 'update', 'id': str(ids[(i * 50 + j) % len(ids)]), 'todo': update}
+            for j in range(50)
+        ]}),
+        ('changes', 'GET', '/api/todos/changes?limit=500', None),
+        ('categories', 'GET', '/api/categories', None),
+        ('categories with counts', 'GET', '/api/categories?counts=true', None),
+        ('overdue page', 'GET', '/api/todos/overdue?limit=20', None),
+        # Served from the stats cache between writes, which is what readers mostly see
+        ('stats', 'GET', '/api/todos/stats', None),
+        ('stats by month', 'GET', '/api/todos/stats?bucket=month', None),
+        (f'import ({IMPORT_ROWS} rows)', 'POST', '/api/todos/import', lambda i: ''.join(
+            json.dumps({'title': f'Imported {i}.{j}', 'category': 'Import'}) + '\n'
+            for j in range(IMPORT_ROWS)
+        ).encode()),
+        # Runs last so the other routes see the full collection
+        ('delete', 'DELETE', lambda i: f'/api/todos/{ids[-1 - i % len(ids)]}', None),
+        ('health', 'GET', '/api/health', None),
+    ]
+
+
+def run_route(client, method, path, body, requests, duration):
+    """Call a route up to requests times or for duration seconds, whichever ends first"""
+    latencies, errors = [], 0
+    start = time.perf_counter()
+    deadline = start + duration
+    for i in range(requests):
+        url = path(i) if callable(path) else path
+        payload = body(i) if body else None
+        began = time.perf_counter()
+        if isinstance(payload, bytes):
+            response = client.open(url, method=method, data=payload, content_type=NDJSON_MIMETYPE)
+        else:
+            response = client.open(url, method=method, json=payload)
+        response.get_data()  # drain streamed bodies
+        latencies.append(time.perf_counter() - began)
+        errors += response.status_code >= 400
+        if began > deadline:
+            break
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': len(latencies) / elapsed,
+        'p50_ms': results.percentile(latencies, 0.50) * 1000,
+        'p99_ms': results.percentile(latencies, 0.99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--backend', choices=('memory', 'mongo'), default='memory')
+    parser.add_argument('--count', type=int, default=10000)
+    parser.add_argument('--requests', type=int, default=500, help='maximum calls per route')
+    parser.add_argument('--duration', type=float, default=5, help='maximum seconds per route')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    args = parser.parse_args()
+
+    class BenchmarkConfig(Config):
+        STORAGE_BACKEND = args.backend
+        MONGO_CREATE_INDEXES = True
+
+    app = create_app(BenchmarkConfig)
+    with app.app_context():
+        start = time.perf_counter()
+        ids = seed(args.count)
+        seconds = time.perf_counter() - start
+    print(f'Seeded {args.count} todos into {args.backend} in {seconds:.1f}s')
+
+    client = app.test_client()
+    rows = []
+    print(f'  {"route":<28} {"requests":>9} {"errors":>7} {"req/s":>9} {"p50 ms":>8} {"p99 ms":>8}')
+    for name, method, path, body in routes(ids):
+        row = dict(name=name, **run_route(client, method, path, body, args.requests, args.duration))
+        rows.append(row)
+        print(f'  {name:<28} {row["requests"]:>9} {row["errors"]:>7} '
+              f'{row["rps"]:>9.1f} {row["p50_ms"]:>8.2f} {row["p99_ms"]:>8.2f}')
+
+    if args.output:
+        results.save(args.output, 'api', vars(args), rows)
+
+
+if __name__ == '__main__':
+    main()
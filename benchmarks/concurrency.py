@@ -0,0 +1,124 @@
+"""Contention benchmark: items/sec through the concurrent stacks and queues.
+
+    python -m benchmarks.concurrency [--threads 1,2,4,8,16,32] [--items 200000]
+        [--capacity 1024] [--batch 64] [--output concurrency.json]
+
+For each thread count, that many producers and that many consumers move
+--items items through one bounded container, consumers taking one item
+per get() or up to --batch per get_many(). The asyncio variants run the
+same number of producer and consumer tasks on one event loop. The
+standard library's queue.Queue is included as a reference point.
+"""
+import argparse
+import asyncio
+import queue
+import threading
+import time
+from data_structures.concurrent import AsyncQueue, AsyncStack, ConcurrentQueue, ConcurrentStack
+from benchmarks import results
+
+
+class StdlibQueue(queue.Queue):
+    """queue.Queue behind the same put/get/get_many interface"""
+
+    def get_many(self, max_items=None, timeout=None):
+        try:
+            return [self.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+
+
+def run_threads(container, workers, items, batch):
+    per_producer = items // workers
+    total = per_producer * workers
+    consumed = [0]
+    lock = threading.Lock()
+
+    def produce():
+        for i in range(per_producer):
+            container.put(i)
+
+    def consume():
+        while True:
+            with lock:
+                if consumed[0] >= total:
+                    return
+            taken = container.get_many(batch, timeout=0.01)
+            with lock:
+                consumed[0] += len(taken)
+
+    threads = [threading.Thread(target=produce) for _ in range(workers)]
+    threads += [threading.Thread(target=consume) for _ in range(workers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return total / (time.perf_counter() - start)
+
+
+async def run_tasks(container, workers, items, batch):
+    per_producer = items // workers
+    total = per_producer * workers
+    consumed = 0
+
+    async def produce():
+        for i in range(per_producer):
+            await container.put(i)
+
+    async def consume():
+        nonlocal consumed
+        while consumed < total:
+            taken = await container.get_many(batch, timeout=0.01)
+            consumed += len(taken)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[produce() for _ in range(workers)],
+                         *[consume() for _ in range(workers)])
+    return total / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', default='1,2,4,8,16,32',
+                        help='comma-separated producer (and consumer) counts')
+    parser.add_argument('--items', type=int, default=200000)
+    parser.add_argument('--capacity', type=int, default=1024)
+    parser.add_argument('--batch', type=int, default=64, help='items per get_many()')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    args = parser.parse_args()
+
+    thread_variants = [
+        ('queue.Queue', lambda: StdlibQueue(args.capacity), 1),
+        ('ConcurrentQueue', lambda: ConcurrentQueue(args.capacity), 1),
+        (f'ConcurrentQueue get_many({args.batch})', lambda: ConcurrentQueue(args.capacity),
+         args.batch),
+        ('ConcurrentStack', lambda: ConcurrentStack(args.capacity), 1),
+        (f'ConcurrentStack get_many({args.batch})', lambda: ConcurrentStack(args.capacity),
+         args.batch),
+    ]
+    task_variants = [
+        ('AsyncQueue', lambda: AsyncQueue(args.capacity), 1),
+        (f'AsyncQueue get_many({args.batch})', lambda: AsyncQueue(args.capacity), args.batch),
+        ('AsyncStack', lambda: AsyncStack(args.capacity), 1),
+    ]
+
+    rows = []
+    print(f'{args.items} items, capacity {args.capacity}')
+    print(f'  {"container":<36} {"workers":>8} {"items/s":>12}')
+    for workers in [int(count) for count in args.threads.split(',')]:
+        for name, make, batch in thread_variants:
+            rate = run_threads(make(), workers, args.items, batch)
+            rows.append({'name': f'{name} x{workers}', 'ops_per_sec': rate})
+            print(f'  {name:<36} {workers:>8} {rate:>12.0f}')
+        for name, make, batch in task_variants:
+            rate = asyncio.run(run_tasks(make(), workers, args.items, batch))
+            rows.append({'name': f'{name} x{workers}', 'ops_per_sec': rate})
+            print(f'  {name:<36} {workers:>8} {rate:>12.0f}')
+
+    if args.output:
+        results.save(args.output, 'concurrency', vars(args), rows)
+
+
+if __name__ == '__main__':
+    main()
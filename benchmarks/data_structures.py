@@ -0,0 +1,250 @@
+"""Microbenchmark: every data_structures operation on structures of growing size.
+
+    python -m benchmarks.data_structures [--sizes 1000,10000,100000]
+        [--ops 1000] [--repeat 5] [--output data_structures.json]
+
+For each size a structure holding that many items is built (untimed), then
+--ops calls of one operation are timed against it, best of --repeat fresh
+structures. Per-call time that grows with the size marks an O(n) operation.
+Each structure's memory per item (measured with tracemalloc, items
+included) is reported alongside.
+The display methods walk the whole structure, so they run 10 times per
+repeat rather than --ops; Queue.drain dequeues every item, once per repeat,
+so its time should grow linearly with the size.
+"""
+import argparse
+import time
+import tracemalloc
+from array import array
+from data_structures.compact import (
+    CompactDoublyLinkedList, CompactLinkedList, CompactQueue, CompactStack
+)
+from data_structures.cyclic_linked_list import CyclicLinkedList
+from data_structures.doubly_linked_list import DoublyLinkedList, IndexedDoublyLinkedList
+from data_structures.linked_list import LinkedList
+from data_structures.lru_cache import LRUCache
+from data_structures.queue import Queue
+from data_structures.stack import Stack
+from benchmarks import results
+
+# Calls per repeat of operations that visit every item, instead of --ops
+WHOLE_STRUCTURE_CALLS = {
+    'display': 10,
+    'display_forward': 10,
+    'display_backward': 10,
+    'drain': 1,
+}
+BATCH = 10
+
+
+def build_stack(size):
+    stack = Stack()
+    for i in range(size):
+        stack.push(i)
+    return stack
+
+
+def build_queue(size):
+    queue = Queue()
+    for i in range(size):
+        queue.enqueue(i)
+    return queue
+
+
+def build_linked_list(size):
+    return LinkedList(range(size))
+
+
+def build_doubly_linked_list(size):
+    dll = DoublyLinkedList()
+    for i in range(size):
+        dll.append(i)
+    return dll
+
+
+def build_compact_stack(size):
+    return CompactStack(range(size))
+
+
+def build_compact_queue(size):
+    return CompactQueue(range(size))
+
+
+def build_compact_linked_list(size):
+    return CompactLinkedList(range(size))
+
+
+def build_compact_doubly_linked_list(size):
+    return CompactDoublyLinkedList(range(size))
+
+
+def build_indexed_doubly_linked_list(size):
+    return IndexedDoublyLinkedList(range(size))
+
+
+def build_lru_cache(size):
+    cache = LRUCache(maxsize=size)
+    for i in range(size):
+        cache.put(i, i)
+    return cache
+
+
+def build_cyclic_linked_list(size):
+    return CyclicLinkedList(range(size))
+
+
+def operations(size):
+    """(structure, build, {operation: call(structure, i)}) for every structure.
+
+    delete targets values from the middle outwards, so each call searches
+    about half of a structure of size items. dequeue_many may run the queue
+    dry once size / BATCH calls have been made.
+    """
+    def delete_middle(s, i):
+        s.delete((size // 2 + i) % size)
+
+    batch = array('q', range(BATCH))
+
+    def drain(s, i):
+        while not s.is_empty():
+            s.dequeue()
+
+    return [
+        ('Stack', build_stack, {
+            'push': lambda s, i: s.push(i),
+            'pop': lambda s, i: s.pop(),
+            'peek': lambda s, i: s.peek(),
+            'size': lambda s, i: s.size(),
+        }),
+        ('Queue', build_queue, {
+            'enqueue': lambda s, i: s.enqueue(i),
+            'dequeue': lambda s, i: s.dequeue(),
+            f'enqueue_many({BATCH})': lambda s, i: s.enqueue_many(range(BATCH)),
+            f'dequeue_many({BATCH})': lambda s, i: s.dequeue_many(BATCH),
+            'front': lambda s, i: s.front(),
+            'size': lambda s, i: s.size(),
+            'drain': drain,
+        }),
+        ('LinkedList', build_linked_list, {
+            'append': lambda s, i: s.append(i),
+            'prepend': lambda s, i: s.prepend(i),
+            'delete': delete_middle,
+            'display': lambda s, i: s.display(),
+        }),
+        ('DoublyLinkedList', build_doubly_linked_list, {
+            'append': lambda s, i: s.append(i),
+            'prepend': lambda s, i: s.prepend(i),
+            'delete': delete_middle,
+            'display_forward': lambda s, i: s.display_forward(),
+            'display_backward': lambda s, i: s.display_backward(),
+        }),
+        ('CompactStack', build_compact_stack, {
+            'push': lambda s, i: s.push(i),
+            f'push_many({BATCH})': lambda s, i: s.push_many(range(BATCH)),
+            f'push_many({BATCH}, buffer)': lambda s, i: s.push_many(batch),
+            'pop': lambda s, i: s.pop(),
+            'peek': lambda s, i: s.peek(),
+        }),
+        ('CompactQueue', build_compact_queue, {
+            'enqueue': lambda s, i: s.enqueue(i),
+            'dequeue': lambda s, i: s.dequeue(),
+            f'enqueue_many({BATCH})': lambda s, i: s.enqueue_many(range(BATCH)),
+            f'enqueue_many({BATCH}, buffer)': lambda s, i: s.enqueue_many(batch),
+            f'dequeue_many({BATCH})': lambda s, i: s.dequeue_many(BATCH),
+            'drain': drain,
+        }),
+        ('CompactLinkedList', build_compact_linked_list, {
+            'append': lambda s, i: s.append(i),
+            'prepend': lambda s, i: s.prepend(i),
+            'delete': delete_middle,
+            'display': lambda s, i: s.display(),
+        }),
+        ('CompactDoublyLinkedList', build_compact_doubly_linked_list, {
+            'append': lambda s, i: s.append(i),
+            'prepend': lambda s, i: s.prepend(i),
+            'delete': delete_middle,
+            'display_forward': lambda s, i: s.display_forward(),
+            'display_backward': lambda s, i: s.display_backward(),
+        }),
+        ('IndexedDoublyLinkedList', build_indexed_doubly_linked_list, {
+            'append': lambda s, i: s.append(size + i),
+            'delete': delete_middle,
+            'contains': lambda s, i: i in s,
+            'move_to_front': lambda s, i: s.move_to_front(i),
+            'pop_back': lambda s, i: s.pop_back(),
+        }),
+        ('LRUCache', build_lru_cache, {
+            'get (hit)': lambda s, i: s.get(i),
+            'get (miss)': lambda s, i: s.get(-1),
+            'put (evicting)': lambda s, i: s.put(size + i, i),
+            'put (existing)': lambda s, i: s.put(i, i),
+        }),
+        ('CyclicLinkedList', build_cyclic_linked_list, {
+            'append': lambda s, i: s.append(i),
+            'prepend': lambda s, i: s.prepend(i),
+            'delete': delete_middle,
+            'display': lambda s, i: s.display(),
+        }),
+    ]
+
+
+def time_operation(build, call, size, calls, repeat):
+    """Best seconds per call over repeat fresh structures of size items"""
+    best = float('inf')
+    for _ in range(repeat):
+        structure = build(size)
+        start = time.perf_counter()
+        for i in range(calls):
+            call(structure, i)
+        best = min(best, (time.perf_counter() - start) / calls)
+    return best
+
+
+def bytes_per_item(build, size):
+    """Memory allocated while building a structure of size items, per item"""
+    tracemalloc.start()
+    try:
+        structure = build(size)
+        allocated = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del structure
+    return allocated / size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='1000,10000,100000',
+                        help='comma-separated structure sizes')
+    parser.add_argument('--ops', type=int, default=1000, help='calls timed per repeat')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='write the results to this JSON file')
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(',')]
+
+    rows = []
+    print(f'  {"operation":<40} {"size":>9} {"us/call":>10} {"calls/s":>12}')
+    for size in sizes:
+        for structure, build, calls in operations(size):
+            row = {'name': f'{structure} memory n={size}',
+                   'bytes_per_item': bytes_per_item(build, size)}
+            rows.append(row)
+            print(f'  {structure + " bytes/item":<40} {size:>9} {row["bytes_per_item"]:>10.1f}')
+            for operation, call in calls.items():
+                count = WHOLE_STRUCTURE_CALLS.get(operation, min(args.ops, size))
+                seconds = time_operation(build, call, size, count, args.repeat)
+                row = {
+                    'name': f'{structure}.{operation} n={size}',
+                    'us_per_call': seconds * 1e6,
+                    'ops_per_sec': 1 / seconds,
+                }
+                rows.append(row)
+                print(f'  {structure + "." + operation:<40} {size:>9} '
+                      f'{row["us_per_call"]:>10.3f} {row["ops_per_sec"]:>12.0f}')
+
+    if args.output:
+        results.save(args.output, 'data_structures', vars(args), rows)
+
+
+if __name__ == '__main__':
+    main()
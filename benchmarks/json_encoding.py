@@ -0,0 +1,61 @@
+"""Microbenchmark: encoding a 10k-todo listing with each JSON provider.
+
+    python -m benchmarks.json_encoding [--count 10000] [--repeat 5]
+"""
+import argparse
+import json
+import timeit
+from datetime import datetime, timedelta
+from bson.objectid import ObjectId
+from flask import Flask
+from flask_pymongo.helpers import BSONProvider
+from todo_app.json_provider import OrjsonProvider, orjson
+from todo_app.models.todo import Todo
+
+
+def make_documents(count):
+    now = datetime.utcnow()
+    return [{
+        '_id': ObjectId(),
+        'title': f'Todo number {i}',
+        'category': f'Category {i % 10}',
+        'due_date': now + timedelta(hours=i) if i % 3 else None,
+        'completed': i % 2 == 0,
+        'created_at': now,
+    } for i in range(count)]
+
+
+def best_of(func, repeat):
+    return min(timeit.repeat(func, number=1, repeat=repeat)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    docs = make_documents(args.count)
+    serialize = Todo.serializer()
+    serialize_sparse = Todo.serializer(['id', 'title'])
+    items = [serialize(doc) for doc in docs]
+
+    results = {
+        'serialize (all fields)': best_of(lambda: [serialize(d) for d in docs], args.repeat),
+        'serialize (id,title)': best_of(
+            lambda: [serialize_sparse(d) for d in docs], args.repeat),
+        'stdlib json.dumps': best_of(lambda: json.dumps(items), args.repeat),
+        'BSONProvider.dumps': best_of(lambda: BSONProvider(app).dumps(items), args.repeat),
+    }
+    if orjson is not None:
+        results['OrjsonProvider.dumps'] = best_of(
+            lambda: OrjsonProvider(app).dumps(items), args.repeat)
+
+    print(f'{args.count} documents, best of {args.repeat} runs')
+    for name, millis in results.items():
+        print(f'  {name:<24} {millis:9.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
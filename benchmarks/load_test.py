@@ -0,0 +1,117 @@
+"""Load test: requests/sec and latency percentiles of the WSGI and ASGI apps.
+
+Start the servers to compare against the same database, e.g.
+
+    gunicorn -w 4 --threads 8 -b 127.0.0.1:5000 run:app
+    uvicorn asgi:app --workers 4 --port 8000
+
+then run
+
+    python -m benchmarks.load_test --target sync=http://127.0.0.1:5000 \\
+        --target async=http://127.0.0.1:8000 [--concurrency 500] [--duration 20]
+
+Each target gets the same number of concurrent keep-alive connections, each
+issuing GET requests back to back for the given duration. The client is
+plain asyncio so that it is not the bottleneck at high concurrency.
+"""
+import argparse
+import asyncio
+import time
+from urllib.parse import urlsplit
+from benchmarks.results import percentile, save
+
+
+async def read_response(reader):
+    """Read one HTTP/1.1 response, returning its status code"""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('Connection closed by server')
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    return status
+
+
+async def worker(host, port, request, deadline, latencies, errors):
+    reader = writer = None
+    while time.perf_counter() < deadline:
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            start = time.perf_counter()
+            writer.write(request)
+            status = await read_response(reader)
+            latencies.append(time.perf_counter() - start)
+            if status >= 400:
+                errors.append(status)
+        except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError) as e:
+            errors.append(type(e).__name__)
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def run_target(url, path, concurrency, duration):
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    request = (f'GET {path} HTTP/1.1\r\nHost: {parts.netloc}\r\n'
+               f'Accept: application/json\r\nConnection: keep-alive\r\n\r\n').encode('ascii')
+    latencies, errors = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        worker(host, port, request, start + duration, latencies, errors)
+        for _ in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'rps': len(latencies) / elapsed,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--target', action='append', required=True, metavar='NAME=URL',
+                        help='server to load, e.g. async=http://127.0.0.1:8000')
+    parser.add_argument('--path', default='/api/todos?limit=20')
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--output', help='write the results to this JSON file')
+    args = parser.parse_args()
+
+    print(f'GET {args.path}, {args.concurrency} connections, {args.duration:g}s per target')
+    print(f'  {"target":<10} {"requests":>9} {"errors":>7} {"req/s":>9} {"p50 ms":>8} {"p99 ms":>8}')
+    rows = []
+    for target in args.target:
+        name, _, url = target.partition('=')
+        result = asyncio.run(run_target(url, args.path, args.concurrency, args.duration))
+        rows.append(dict(name=name, **result))
+        print(f'  {name:<10} {result["requests"]:>9} {result["errors"]:>7} '
+              f'{result["rps"]:>9.1f} {result["p50_ms"]:>8.2f} {result["p99_ms"]:>8.2f}')
+
+    if args.output:
+        save(args.output, 'load_test', vars(args), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Saving benchmark results as JSON, and comparing two saved runs.
+
+    python -m benchmarks.results BASELINE.json CANDIDATE.json [--threshold 0.1]
+
+Every benchmark that takes --output writes one file: the benchmark's name,
+its parameters, the git commit and Python it ran on, and a list of result
+rows keyed by "name". Comparing two files prints the change in each shared
+metric and exits with status 1 when any row got slower by more than the
+threshold, so it can gate a CI job.
+"""
+import argparse
+import json
+import math
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+# Metrics where a larger value is better; every other metric is a duration
+HIGHER_IS_BETTER = ('ops_per_sec', 'rps')
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return float('nan')
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save(path, benchmark, params, rows):
+    """Write rows (dicts with a "name" key) and the run's context to path"""
+    with open(path, 'w') as f:
+        json.dump({
+            'benchmark': benchmark,
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'params': params,
+            'results': rows,
+        }, f, indent=2)
+        f.write('\n')
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(baseline, candidate, threshold):
+    """Yield (name, metric, old, new, change, regressed) for metrics in both runs"""
+    old_rows = {row['name']: row for row in baseline['results']}
+    for row in candidate['results']:
+        old = old_rows.get(row['name'])
+        if old is None:
+            continue
+        for metric, new_value in row.items():
+            old_value = old.get(metric)
+            if (metric == 'name' or not isinstance(new_value, (int, float))
+                    or not isinstance(old_value, (int, float)) or not old_value
+                    or math.isnan(old_value) or math.isnan(new_value)):
+                continue
+            change = new_value / old_value - 1
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            yield row['name'], metric, old_value, new_value, change, worse > threshold
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='relative slowdown reported as a regression (default 0.1)')
+    args = parser.parse_args()
+
+    baseline, candidate = load(args.baseline), load(args.candidate)
+    print(f'{baseline["benchmark"]}: {baseline["commit"]} -> {candidate["commit"]}')
+    regressions = 0
+    for name, metric, old, new, change, regressed in compare(baseline, candidate, args.threshold):
+        regressions += regressed
+        flag = '  REGRESSION' if regressed else ''
+        print(f'  {name:<44} {metric:<12} {old:>12.3f} {new:>12.3f} {change:>+8.1%}{flag}')
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
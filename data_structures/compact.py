@@ -0,0 +1,412 @@
+"""Typed, array-backed variants of Stack, Queue and the linked lists.
+
+Items live unboxed in an array.array of one typecode ('q' = signed 64-bit
+int by default, 'd' for floats, ...), so each costs its machine size rather
+than a Python object, and the linked lists link nodes by slot index in
+parallel arrays instead of through Node objects. Slots freed by deletes are
+reused before the arrays grow.
+
+view() hands out a memoryview over the items without copying, for
+numpy.asarray(), struct unpacking or writing straight to a file. An array
+cannot be resized while a view of it is alive, so release the view (or use
+it in a with block) before pushing more items; otherwise BufferError is
+raised. The bulk methods accept any iterable, and copy buffers of the same
+numeric kind and item size (another array, a memoryview, a NumPy array)
+with a single memcpy.
+"""
+from array import array
+from data_structures.iteration import LazyIterable
+
+# Slot index meaning "no node"; links are 32-bit, so a list holds up to 2**31 - 1 nodes
+NIL = -1
+LINK_TYPECODE = 'i'
+
+_KINDS = {code: 'int' for code in 'bhilq'}
+_KINDS.update({code: 'uint' for code in 'BHILQ'})
+_KINDS.update({code: 'float' for code in 'fd'})
+
+def _extend_array(target, items):
+    """Extend target with items, as one memcpy when items is a compatible buffer"""
+    try:
+        view = memoryview(items)
+    except TypeError:
+        target.extend(items)
+        return
+    with view:
+        code = view.format.lstrip('@=<>!')
+        if (view.ndim == 1 and view.c_contiguous and view.itemsize == target.itemsize
+                and _KINDS.get(code) == _KINDS.get(target.typecode)):
+            target.frombytes(view.cast('B'))
+        else:
+            target.extend(view.tolist())
+
+class CompactStack:
+    def __init__(self, items=(), typecode='q'):
+        self.items = array(typecode)
+        self.push_many(items)
+
+    def push(self, item):
+        """Add an item to the top of the stack"""
+        self.items.append(item)
+
+    def push_many(self, items):
+        """Push every item of an iterable or buffer, the last one ending on top"""
+        _extend_array(self.items, items)
+
+    def pop(self):
+        """Remove and return the top item from the stack"""
+        if not self.is_empty():
+            return self.items.pop()
+        raise IndexError("Pop from empty stack")
+
+    def peek(self):
+        """Return the top item without removing it"""
+        if not self.is_empty():
+            return self.items[-1]
+        raise IndexError("Peek at empty stack")
+
+    def is_empty(self):
+        """Check if the stack is empty"""
+        return len(self.items) == 0
+
+    def size(self):
+        """Return the number of items in the stack"""
+        return len(self.items)
+
+    def view(self):
+        """Zero-copy memoryview of the items, bottom to top"""
+        return memoryview(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        """Iterate from bottom to top"""
+        return iter(self.items)
+
+class CompactQueue:
+    """A FIFO queue in a circular buffer that doubles when full"""
+
+    def __init__(self, items=(), typecode='q', capacity=16):
+        self._buffer = array(typecode, [0]) * max(capacity, 1)
+        self._head = 0
+        self._count = 0
+        self.enqueue_many(items)
+
+    def enqueue(self, item):
+        """Add an item to the end of the queue"""
+        if self._count == len(self._buffer):
+            self._grow(self._count + 1)
+        self._buffer[(self._head + self._count) % len(self._buffer)] = item
+        self._count += 1
+
+    def enqueue_many(self, items):
+        """Add every item of an iterable or buffer to the end, in order"""
+        incoming = array(self._buffer.typecode)
+        _extend_array(incoming, items)
+        if self._count + len(incoming) > len(self._buffer):
+            self._grow(self._count + len(incoming))
+        start = (self._head + self._count) % len(self._buffer)
+        first = min(len(incoming), len(self._buffer) - start)
+        self._buffer[start:start + first] = incoming[:first]
+        self._buffer[:len(incoming) - first] = incoming[first:]
+        self._count += len(incoming)
+
+    def dequeue(self):
+        """Remove and return the first item in the queue"""
+        if self.is_empty():
+            raise IndexError("Dequeue from empty queue")
+        item = self._buffer[self._head]
+        self._head = (self._head + 1) % len(self._buffer)
+        self._count -= 1
+        return item
+
+    def dequeue_many(self, count=None):
+        """Remove up to count items (all by default) from the front, returned as an array"""
+        count = self._count if count is None else min(count, self._count)
+        taken = array(self._buffer.typecode)
+        for segment in self._segments(count):
+            taken.extend(segment)
+        self._head = (self._head + count) % len(self._buffer)
+        self._count -= count
+        return taken
+
+    def front(self):
+        """Return the first item without removing it"""
+        if self.is_empty():
+            raise IndexError("Front of empty queue")
+        return self._buffer[self._head]
+
+    def is_empty(self):
+        """Check if the queue is empty"""
+        return self._count == 0
+
+    def size(self):
+        """Return the number of items in the queue"""
+        return self._count
+
+    def views(self):
+        """Zero-copy memoryviews of the items, front to back: one, or two if they wrap"""
+        view = memoryview(self._buffer)
+        end = self._head + self._count
+        if end <= len(self._buffer):
+            return (view[self._head:end],)
+        return (view[self._head:], view[:end - len(self._buffer)])
+
+    def _segments(self, count):
+        end = self._head + count
+        if end <= len(self._buffer):
+            return (self._buffer[self._head:end],)
+        return (self._buffer[self._head:], self._buffer[:end - len(self._buffer)])
+
+    def _grow(self, needed):
+        """Move the items to the start of a buffer with room for needed items"""
+        capacity = len(self._buffer)
+        while capacity < needed:
+            capacity *= 2
+        buffer = array(self._buffer.typecode)
+        for segment in self._segments(self._count):
+            buffer.extend(segment)
+        buffer.extend(array(self._buffer.typecode, [0]) * (capacity - self._count))
+        self._buffer, self._head = buffer, 0
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        """Iterate from front to back without removing anything"""
+        for segment in self._segments(self._count):
+            yield from segment
+
+class CompactLinkedList(LazyIterable):
+    """A singly linked list whose nodes are slots in parallel value/next arrays"""
+
+    def __init__(self, items=(), typecode='q'):
+        self._values = array(typecode)
+        self._next = array(LINK_TYPECODE)
+        self._free = NIL
+        self.head = self.tail = NIL
+        self._size = 0
+        # True while slot i holds the i-th item and no slot is free, so
+        # view() can expose the value array as it is
+        self._ordered = True
+        self.extend(items)
+
+    def append(self, data):
+        """Add data to the end of the list"""
+        slot = self._allocate(data)
+        if self.tail == NIL:
+            self.head = slot
+        else:
+            self._next[self.tail] = slot
+        self.tail = slot
+        self._size += 1
+
+    def prepend(self, data):
+        """Add data to the beginning of the list"""
+        slot = self._allocate(data)
+        self._next[slot] = self.head
+        if self.head == NIL:
+            self.tail = slot
+        else:
+            self._ordered = False
+        self.head = slot
+        self._size += 1
+
+    def extend(self, items):
+        """Append every item of an iterable or buffer, in order"""
+        # Convert everything first, so an item of the wrong type leaves the list untouched
+        incoming = array(self._values.typecode)
+        _extend_array(incoming, items)
+        if self._free != NIL:
+            for data in incoming:
+                self.append(data)
+            return
+        start, count = len(self._values), len(incoming)
+        if not count:
+            return
+        self._values.extend(incoming)
+        self._link_block(start, count)
+        if self.tail == NIL:
+            self.head = start
+        else:
+            self._next[self.tail] = start
+        self.tail = start + count - 1
+        self._size += count
+
+    def delete(self, data):
+        """Delete the first occurrence of data in the list"""
+        previous, slot = NIL, self.head
+        while slot != NIL:
+            if self._values[slot] == data:
+                following = self._next[slot]
+                if previous == NIL:
+                    self.head = following
+                else:
+                    self._next[previous] = following
+                if slot == self.tail:
+                    self.tail = previous
+                self._release(slot)
+                return
+            previous, slot = slot, self._next[slot]
+
+    def view(self):
+        """Zero-copy memoryview of the values in list order.
+
+        Rewrites the arrays in list order first (O(n)) if prepends or
+        deletes have shuffled them.
+        """
+        if not self._ordered:
+            self._compact()
+        return memoryview(self._values)
+
+    def display(self):
+        """Print all elements in the linked list"""
+        return "->".join(str(data) for data in self)
+
+    def _allocate(self, data):
+        """A slot holding data, reusing a freed one if there is one"""
+        slot = self._free
+        if slot == NIL:
+            self._values.append(data)
+            self._next.append(NIL)
+            return len(self._values) - 1
+        self._values[slot] = data
+        self._free = self._next[slot]
+        self._next[slot] = NIL
+        self._ordered = False
+        return slot
+
+    def _release(self, slot):
+        self._next[slot] = self._free
+        self._free = slot
+        self._size -= 1
+        self._ordered = False
+
+    def _link_block(self, start, count):
+        """Link freshly appended slots start..start+count-1 one after another"""
+        self._next.extend(range(start + 1, start + count))
+        self._next.append(NIL)
+
+    def _slots(self):
+        # Read each link before yielding: a deleted slot's link joins the free list
+        slot = self.head
+        while slot != NIL:
+            following = self._next[slot]
+            yield slot
+            slot = following
+
+    def _compact(self):
+        values = array(self._values.typecode, (self._values[slot] for slot in self._slots()))
+        self._values = array(values.typecode)
+        self._next = array(LINK_TYPECODE)
+        self._free = NIL
+        self.head = self.tail = NIL
+        self._size = 0
+        self._ordered = True
+        self.extend(values)
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        values = self._values
+        for slot in self._slots():
+            yield values[slot]
+
+class CompactDoublyLinkedList(CompactLinkedList):
+    """CompactLinkedList with a prev array, for backward walks and O(1) pops at either end"""
+
+    def __init__(self, items=(), typecode='q'):
+        self._prev = array(LINK_TYPECODE)
+        super().__init__(items, typecode)
+
+    def append(self, data):
+        """Add data to the end of the list"""
+        tail = self.tail
+        super().append(data)
+        self._prev[self.tail] = tail
+
+    def prepend(self, data):
+        """Add data to the beginning of the list"""
+        head = self.head
+        super().prepend(data)
+        if head != NIL:
+            self._prev[head] = self.head
+
+    def extend(self, items):
+        """Append every item of an iterable or buffer, in order"""
+        tail = self.tail
+        super().extend(items)
+        if tail != NIL and self._next[tail] != NIL:
+            self._prev[self._next[tail]] = tail
+
+    def delete(self, data):
+        """Delete the first occurrence of data in the list"""
+        for slot in self._slots():
+            if self._values[slot] == data:
+                self._unlink(slot)
+                return
+
+    def pop_front(self):
+        """Remove and return the first element"""
+        if self.head == NIL:
+            raise IndexError("Pop from empty list")
+        data = self._values[self.head]
+        self._unlink(self.head)
+        return data
+
+    def pop_back(self):
+        """Remove and return the last element"""
+        if self.tail == NIL:
+            raise IndexError("Pop from empty list")
+        data = self._values[self.tail]
+        self._unlink(self.tail)
+        return data
+
+    def display_forward(self):
+        """Display elements from head to tail"""
+        return "<->".join(str(data) for data in self)
+
+    def display_backward(self):
+        """Display elements from tail to head"""
+        return "<->".join(str(data) for data in reversed(self))
+
+    def __reversed__(self):
+        """Iterate from tail to head"""
+        values, prev = self._values, self._prev
+        slot = self.tail
+        while slot != NIL:
+            preceding = prev[slot]
+            yield values[slot]
+            slot = preceding
+
+    def _unlink(self, slot):
+        previous, following = self._prev[slot], self._next[slot]
+        if previous == NIL:
+            self.head = following
+        else:
+            self._next[previous] = following
+        if following == NIL:
+            self.tail = previous
+        else:
+            self._prev[following] = previous
+        self._release(slot)
+
+    def _allocate(self, data):
+        slot = super()._allocate(data)
+        if slot == len(self._prev):
+            self._prev.append(NIL)
+        else:
+            self._prev[slot] = NIL
+        return slot
+
+    def _link_block(self, start, count):
+        super()._link_block(start, count)
+        # The first slot's prev is fixed up by extend once the block is linked in
+        self._prev.extend(range(start - 1, start + count - 1))
+        self._prev[start] = NIL
+
+    def _compact(self):
+        self._prev = array(LINK_TYPECODE)
+        super()._compact()
@@ -0,0 +1,182 @@
+"""Stack and Queue variants for passing work between threads or asyncio tasks.
+
+ConcurrentQueue/ConcurrentStack guard a deque with one lock and two
+conditions (not empty, not full), so producers and consumers only wake when
+there is something for them to do. AsyncQueue/AsyncStack do the same with
+asyncio primitives for coroutines on one event loop.
+
+All four take an optional capacity. A full container makes put() wait,
+which pushes back on producers, and get() waits while it is empty. A
+timeout bounds either wait, and IndexError is raised when it runs out. The
+batch methods put or take many items under a single lock acquisition.
+"""
+import asyncio
+import threading
+from collections import deque
+
+class ConcurrentQueue:
+    def __init__(self, capacity=None):
+        if capacity is not None and capacity < 1:
+            raise ValueError("Capacity must be at least 1")
+        self.capacity = capacity
+        self.items = deque()
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+
+    def put(self, item, timeout=None):
+        """Add an item, waiting up to timeout seconds (forever if None) for room"""
+        with self._not_full:
+            if not self._not_full.wait_for(self._has_room, timeout):
+                raise IndexError("Put to full queue")
+            self.items.append(item)
+            self._not_empty.notify()
+
+    def put_many(self, items, timeout=None):
+        """Add items in order, waiting for room as needed; timeout applies per wait"""
+        items = list(items)
+        with self._not_full:
+            while items:
+                if not self._not_full.wait_for(self._has_room, timeout):
+                    raise IndexError("Put to full queue")
+                room = len(items) if self.capacity is None else self.capacity - len(self.items)
+                self.items.extend(items[:room])
+                del items[:room]
+                self._not_empty.notify_all()
+
+    def get(self, timeout=None):
+        """Remove and return the next item, waiting up to timeout seconds for one"""
+        with self._not_empty:
+            if not self._not_empty.wait_for(self._has_items, timeout):
+                raise IndexError("Get from empty queue")
+            item = self._take()
+            self._not_full.notify()
+            return item
+
+    def get_many(self, max_items=None, timeout=None):
+        """Wait up to timeout for at least one item, then take up to max_items at once
+
+        timeout=0 drains whatever is there without waiting; the result is
+        empty if nothing is.
+        """
+        with self._not_empty:
+            if not self._not_empty.wait_for(self._has_items, timeout):
+                return []
+            count = len(self.items) if max_items is None else min(max_items, len(self.items))
+            taken = [self._take() for _ in range(count)]
+            self._not_full.notify_all()
+            return taken
+
+    def is_empty(self):
+        return not self.items
+
+    def size(self):
+        return len(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def _take(self):
+        return self.items.popleft()
+
+    def _has_items(self):
+        return bool(self.items)
+
+    def _has_room(self):
+        return self.capacity is None or len(self.items) < self.capacity
+
+class ConcurrentStack(ConcurrentQueue):
+    """ConcurrentQueue that hands out the most recently put item first"""
+
+    def _take(self):
+        return self.items.pop()
+
+class AsyncQueue:
+    def __init__(self, capacity=None):
+        if capacity is not None and capacity < 1:
+            raise ValueError("Capacity must be at least 1")
+        self.capacity = capacity
+        self.items = deque()
+        lock = asyncio.Lock()
+        self._not_empty = asyncio.Condition(lock)
+        self._not_full = asyncio.Condition(lock)
+
+    async def put(self, item, timeout=None):
+        """Add an item, waiting up to timeout seconds (forever if None) for room"""
+        async with self._not_full:
+            if not await self._wait(self._not_full, self._has_room, timeout):
+                raise IndexError("Put to full queue")
+            self.items.append(item)
+            self._not_empty.notify()
+
+    async def put_many(self, items, timeout=None):
+        """Add items in order, waiting for room as needed; timeout applies per wait"""
+        items = list(items)
+        async with self._not_full:
+            while items:
+                if not await self._wait(self._not_full, self._has_room, timeout):
+                    raise IndexError("Put to full queue")
+                room = len(items) if self.capacity is None else self.capacity - len(self.items)
+                self.items.extend(items[:room])
+                del items[:room]
+                self._not_empty.notify_all()
+
+    async def get(self, timeout=None):
+        """Remove and return the next item, waiting up to timeout seconds for one"""
+        async with self._not_empty:
+            if not await self._wait(self._not_empty, self._has_items, timeout):
+                raise IndexError("Get from empty queue")
+            item = self._take()
+            self._not_full.notify()
+            return item
+
+    async def get_many(self, max_items=None, timeout=None):
+        """Wait up to timeout for at least one item, then take up to max_items at once
+
+        timeout=0 drains whatever is there without waiting.
+        """
+        async with self._not_empty:
+            if not await self._wait(self._not_empty, self._has_items, timeout):
+                return []
+            count = len(self.items) if max_items is None else min(max_items, len(self.items))
+            taken = [self._take() for _ in range(count)]
+            self._not_full.notify_all()
+            return taken
+
+    def is_empty(self):
+        return not self.items
+
+    def size(self):
+        return len(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    @staticmethod
+    async def _wait(condition, predicate, timeout):
+        """Condition.wait_for with a timeout; False if it ran out"""
+        if predicate():
+            return True
+        if timeout is None:
+            await condition.wait_for(predicate)
+            return True
+        try:
+            await asyncio.wait_for(condition.wait_for(predicate), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def _take(self):
+        return self.items.popleft()
+
+    def _has_items(self):
+        return bool(self.items)
+
+    def _has_room(self):
+        return self.capacity is None or len(self.items) < self.capacity
+
+class AsyncStack(AsyncQueue):
+    """AsyncQueue that hands out the most recently put item first"""
+
+    def _take(self):
+        return self.items.pop()
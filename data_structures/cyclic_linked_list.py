@@ -1,78 +1,107 @@
+from data_structures.iteration import LazyIterable
+
+# Default start of CyclicLinkedList.cycle, distinct from any stored value
+_HEAD = object()
+
 class Node:
+    __slots__ = ('data', 'next')
+
     def __init__(self, data):
         self.data = data
         self.next = None
 
-class CyclicLinkedList:
-    def __init__(self):
+class CyclicLinkedList(LazyIterable):
+    def __init__(self, items=()):
         self.head = None
-    
+        # The last node, whose next is head; kept so both ends are O(1)
+        self.tail = None
+        self._size = 0
+        self.extend(items)
+
     def append(self, data):
         """Add a new node with data to the end of the list"""
-        new_node = Node(data)
-        
-        if self.head is None:
-            self.head = new_node
-            new_node.next = self.head
-            return
-            
-        current = self.head
-        while current.next != self.head:
-            current = current.next
-        current.next = new_node
-        new_node.next = self.head
-    
+        self.prepend(data)
+        # The new head sits between the old tail and the old head, so
+        # rotating one step makes it the tail instead
+        self.tail = self.head
+        self.head = self.head.next
+
     def prepend(self, data):
         """Add a new node with data to the beginning of the list"""
         new_node = Node(data)
-        
+
         if self.head is None:
-            self.head = new_node
+            new_node.next = new_node
+            self.head = self.tail = new_node
+        else:
             new_node.next = self.head
-            return
-            
-        current = self.head
-        while current.next != self.head:
-            current = current.next
-        new_node.next = self.head
-        current.next = new_node
-        self.head = new_node
-    
+            self.tail.next = new_node
+            self.head = new_node
+        self._size += 1
+
+    def extend(self, items):
+        """Append every item of an iterable, in order"""
+        for data in items:
+            self.append(data)
+
     def delete(self, data):
         """Delete the first occurrence of data in the list"""
         if self.head is None:
             return
-            
+
         # If head node contains data
         if self.head.data == data:
-            if self.head.next == self.head:
-                self.head = None
-                return
-            current = self.head
-            while current.next != self.head:
-                current = current.next
-            current.next = self.head.next
-            self.head = self.head.next
+            if self.head is self.tail:
+                self.head = self.tail = None
+            else:
+                self.head = self.head.next
+                self.tail.next = self.head
+            self._size -= 1
             return
-            
+
         # Search for the node to delete
         current = self.head
-        while current.next != self.head:
+        while current.next is not self.head:
             if current.next.data == data:
+                if current.next is self.tail:
+                    self.tail = current
                 current.next = current.next.next
+                self._size -= 1
                 return
             current = current.next
-    
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        """Iterate once around the ring, starting at head"""
+        return self._walk(self.head, self._size)
+
+    def cycle(self, start=_HEAD, count=None):
+        """Iterate around the ring from the first node holding start (head by default).
+
+        Yields count items, wrapping past the head as often as needed, or one
+        full lap when count is None. Raises ValueError if start isn't in the list.
+        """
+        if count is None:
+            count = self._size
+        node = self.head
+        if start is not _HEAD:
+            for _ in range(self._size):
+                if node.data == start:
+                    break
+                node = node.next
+            else:
+                raise ValueError(f"{start!r} is not in the list")
+        return self._walk(node, count)
+
+    def _walk(self, node, count):
+        for _ in range(count if node is not None else 0):
+            yield node.data
+            node = node.next
+
     def display(self):
         """Display all elements in the list"""
         if self.head is None:
             return ""
-            
-        elements = []
-        current = self.head
-        while True:
-            elements.append(str(current.data))
-            current = current.next
-            if current == self.head:
-                break
-        return "->".join(elements) + "->(head)" 
\ No newline at end of file
+        return "->".join(str(data) for data in self) + "->(head)"
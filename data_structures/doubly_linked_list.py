@@ -1,84 +1,175 @@
+from data_structures.iteration import LazyIterable
+
 class Node:
+    __slots__ = ('data', 'next', 'prev')
+
     def __init__(self, data):
         self.data = data
         self.next = None
         self.prev = None
 
-class DoublyLinkedList:
-    def __init__(self):
+class DoublyLinkedList(LazyIterable):
+    def __init__(self, items=()):
         self.head = None
         self.tail = None
-    
+        self._size = 0
+        self.extend(items)
+
     def append(self, data):
         """Add a new node with data to the end of the list"""
-        new_node = Node(data)
-        
-        if self.head is None:
-            self.head = new_node
-            self.tail = new_node
-            return
-            
-        new_node.prev = self.tail
-        self.tail.next = new_node
-        self.tail = new_node
-    
+        self._link_back(Node(data))
+
     def prepend(self, data):
         """Add a new node with data to the beginning of the list"""
-        new_node = Node(data)
-        
-        if self.head is None:
-            self.head = new_node
-            self.tail = new_node
-            return
-            
-        new_node.next = self.head
-        self.head.prev = new_node
-        self.head = new_node
-    
+        self._link_front(Node(data))
+
+    def extend(self, items):
+        """Append every item of an iterable, in order"""
+        for data in items:
+            self.append(data)
+
     def delete(self, data):
         """Delete the first occurrence of data in the list"""
         current = self.head
-        
-        # If list is empty
-        if current is None:
-            return
-            
-        # If head node contains data
-        if current.data == data:
-            self.head = current.next
-            if self.head:
-                self.head.prev = None
-            else:
-                self.tail = None
-            return
-            
-        # Search for the node to delete
         while current:
             if current.data == data:
-                # If it's the last node
-                if current == self.tail:
-                    self.tail = current.prev
-                    self.tail.next = None
-                else:
-                    current.prev.next = current.next
-                    current.next.prev = current.prev
+                self._unlink(current)
                 return
             current = current.next
-    
-    def display_forward(self):
-        """Display elements from head to tail"""
-        elements = []
+
+    def pop_front(self):
+        """Remove and return the first element"""
+        if self.head is None:
+            raise IndexError("Pop from empty list")
+        node = self.head
+        self._unlink(node)
+        return node.data
+
+    def pop_back(self):
+        """Remove and return the last element"""
+        if self.tail is None:
+            raise IndexError("Pop from empty list")
+        node = self.tail
+        self._unlink(node)
+        return node.data
+
+    def _link_front(self, node):
+        node.prev = None
+        node.next = self.head
+        if self.head is None:
+            self.tail = node
+        else:
+            self.head.prev = node
+        self.head = node
+        self._size += 1
+
+    def _link_back(self, node):
+        node.next = None
+        node.prev = self.tail
+        if self.tail is None:
+            self.head = node
+        else:
+            self.tail.next = node
+        self.tail = node
+        self._size += 1
+
+    def _unlink(self, node):
+        if node.prev is None:
+            self.head = node.next
+        else:
+            node.prev.next = node.next
+        if node.next is None:
+            self.tail = node.prev
+        else:
+            node.next.prev = node.prev
+        node.prev = node.next = None
+        self._size -= 1
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        # Each step reads its link before yielding, so the caller may
+        # delete the current item without ending the iteration
         current = self.head
         while current:
-            elements.append(str(current.data))
-            current = current.next
-        return "<->".join(elements)
-    
-    def display_backward(self):
-        """Display elements from tail to head"""
-        elements = []
+            following = current.next
+            yield current.data
+            current = following
+
+    def __reversed__(self):
+        """Iterate from tail to head"""
         current = self.tail
         while current:
-            elements.append(str(current.data))
-            current = current.prev
-        return "<->".join(elements) 
\ No newline at end of file
+            preceding = current.prev
+            yield current.data
+            current = preceding
+
+    def display_forward(self):
+        """Display elements from head to tail"""
+        return "<->".join(str(data) for data in self)
+
+    def display_backward(self):
+        """Display elements from tail to head"""
+        return "<->".join(str(data) for data in reversed(self))
+
+class IndexedDoublyLinkedList(DoublyLinkedList):
+    """A DoublyLinkedList of unique, hashable values with a value-to-node map.
+
+    delete, membership tests and moving a value to either end are O(1)
+    instead of a scan. Adding a value that is already present raises
+    ValueError.
+    """
+
+    def __init__(self, items=()):
+        self._nodes = {}
+        super().__init__(items)
+
+    def append(self, data):
+        """Add data to the end of the list"""
+        self._check_new(data)
+        super().append(data)
+        self._nodes[data] = self.tail
+
+    def prepend(self, data):
+        """Add data to the beginning of the list"""
+        self._check_new(data)
+        super().prepend(data)
+        self._nodes[data] = self.head
+
+    def delete(self, data):
+        """Delete data from the list if present"""
+        node = self._nodes.pop(data, None)
+        if node is not None:
+            self._unlink(node)
+
+    def pop_front(self):
+        data = super().pop_front()
+        del self._nodes[data]
+        return data
+
+    def pop_back(self):
+        data = super().pop_back()
+        del self._nodes[data]
+        return data
+
+    def move_to_front(self, data):
+        """Move data to the beginning of the list; KeyError if absent"""
+        node = self._nodes[data]
+        if node is not self.head:
+            self._unlink(node)
+            self._link_front(node)
+
+    def move_to_back(self, data):
+        """Move data to the end of the list; KeyError if absent"""
+        node = self._nodes[data]
+        if node is not self.tail:
+            self._unlink(node)
+            self._link_back(node)
+
+    def _check_new(self, data):
+        if data in self._nodes:
+            raise ValueError(f"{data!r} is already in the list")
+
+    def __contains__(self, data):
+        return data in self._nodes
@@ -0,0 +1,49 @@
+"""Lazy map/filter/slice pipelines over the data_structures containers."""
+from functools import partial
+from itertools import islice
+
+class Pipeline:
+    """A chain of map, filter and slice steps over an iterable, run lazily.
+
+    Nothing is evaluated until the pipeline is iterated, and then one item
+    at a time, so a pipeline over a million-node list never builds an
+    intermediate list. Each step returns a new Pipeline, and iterating a
+    pipeline again starts over from its source.
+    """
+
+    def __init__(self, source, steps=()):
+        self._source = source
+        self._steps = steps
+
+    def map(self, func):
+        return self._then(partial(map, func))
+
+    def filter(self, predicate):
+        return self._then(partial(filter, predicate))
+
+    def slice(self, *args):
+        """Keep items start:stop:step, taking the same arguments as slice()"""
+        bounds = slice(*args)
+        return self._then(lambda items: islice(items, bounds.start, bounds.stop, bounds.step))
+
+    def _then(self, step):
+        return Pipeline(self._source, self._steps + (step,))
+
+    def __iter__(self):
+        items = iter(self._source)
+        for step in self._steps:
+            items = step(items)
+        return items
+
+class LazyIterable:
+    """Mixin giving an iterable container map, filter and slice as Pipelines"""
+
+    def map(self, func):
+        return Pipeline(self).map(func)
+
+    def filter(self, predicate):
+        return Pipeline(self).filter(predicate)
+
+    def slice(self, *args):
+        """Items start:stop:step of the container, walked lazily without copying"""
+        return Pipeline(self).slice(*args)
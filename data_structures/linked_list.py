@@ -1,52 +1,75 @@
+from data_structures.iteration import LazyIterable
+
 class Node:
+    __slots__ = ('data', 'next')
+
     def __init__(self, data):
         self.data = data
         self.next = None
 
-class LinkedList:
-    def __init__(self):
+class LinkedList(LazyIterable):
+    def __init__(self, items=()):
         self.head = None
-    
+        self.tail = None
+        self._size = 0
+        self.extend(items)
+
     def append(self, data):
         """Add a new node with data to the end of the list"""
         new_node = Node(data)
-        
+
         if self.head is None:
             self.head = new_node
-            return
-            
-        current = self.head
-        while current.next:
-            current = current.next
-        current.next = new_node
-    
+        else:
+            self.tail.next = new_node
+        self.tail = new_node
+        self._size += 1
+
     def prepend(self, data):
         """Add a new node with data to the beginning of the list"""
         new_node = Node(data)
         new_node.next = self.head
         self.head = new_node
-    
+        if self.tail is None:
+            self.tail = new_node
+        self._size += 1
+
+    def extend(self, items):
+        """Append every item of an iterable, in order"""
+        for data in items:
+            self.append(data)
+
     def delete(self, data):
         """Delete the first occurrence of data in the linked list"""
         if self.head is None:
             return
-            
+
         if self.head.data == data:
             self.head = self.head.next
+            if self.head is None:
+                self.tail = None
+            self._size -= 1
             return
-            
+
         current = self.head
         while current.next:
             if current.next.data == data:
+                if current.next is self.tail:
+                    self.tail = current
                 current.next = current.next.next
+                self._size -= 1
                 return
             current = current.next
-    
-    def display(self):
-        """Print all elements in the linked list"""
-        elements = []
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
         current = self.head
         while current:
-            elements.append(str(current.data))
+            yield current.data
             current = current.next
-        return "->".join(elements) 
\ No newline at end of file
+
+    def display(self):
+        """Print all elements in the linked list"""
+        return "->".join(str(data) for data in self)
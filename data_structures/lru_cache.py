@@ -0,0 +1,112 @@
+import functools
+import threading
+from collections import namedtuple
+from data_structures.doubly_linked_list import IndexedDoublyLinkedList
+
+CacheStats = namedtuple('CacheStats', ['hits', 'misses', 'evictions', 'size', 'maxsize'])
+
+_MISSING = object()
+# Separates positional from keyword arguments in memoize's keys
+_KWARGS = object()
+
+class LRUCache:
+    """A mapping that evicts its least recently used key beyond maxsize entries.
+
+    Keys are kept in an IndexedDoublyLinkedList, most recently used first,
+    so lookups, inserts and evictions are all O(1). on_evict(key, value) is
+    called for every entry pushed out by a newer one. Every method takes a
+    lock, so one cache can be shared between threads.
+    """
+
+    def __init__(self, maxsize=128, on_evict=None):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self.on_evict = on_evict
+        self._values = {}
+        self._order = IndexedDoublyLinkedList()
+        self._lock = threading.RLock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key, default=None):
+        """Return the value for key, marking it most recently used, or default"""
+        with self._lock:
+            value = self._values.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._order.move_to_front(key)
+            return value
+
+    def put(self, key, value):
+        """Store value under key, evicting the least recently used entry if full"""
+        evicted = None
+        with self._lock:
+            if key in self._values:
+                self._order.move_to_front(key)
+            else:
+                if len(self._values) >= self.maxsize:
+                    old_key = self._order.pop_back()
+                    evicted = (old_key, self._values.pop(old_key))
+                    self.evictions += 1
+                self._order.prepend(key)
+            self._values[key] = value
+        if evicted is not None and self.on_evict is not None:
+            self.on_evict(*evicted)
+
+    def pop(self, key, default=None):
+        """Remove key and return its value, or default; not counted as an eviction"""
+        with self._lock:
+            self._order.delete(key)
+            return self._values.pop(key, default)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+            self._order = IndexedDoublyLinkedList()
+
+    def stats(self):
+        with self._lock:
+            return CacheStats(self.hits, self.misses, self.evictions,
+                              len(self._values), self.maxsize)
+
+    def memoize(self, func):
+        """Decorator caching func's results in this cache, keyed by its arguments
+
+        Arguments must be hashable. The wrapper's cache attribute is this cache.
+        """
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = args + (_KWARGS,) + tuple(sorted(kwargs.items())) if kwargs else args
+            value = self.get(key, _MISSING)
+            if value is _MISSING:
+                value = func(*args, **kwargs)
+                self.put(key, value)
+            return value
+        wrapper.cache = self
+        return wrapper
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.put(key, value)
+
+    def __delitem__(self, key):
+        if self.pop(key, _MISSING) is _MISSING:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        """Membership test; neither counted in stats nor refreshing recency"""
+        return key in self._values
+
+    def __len__(self):
+        return len(self._values)
+
+def memoize(maxsize=128, on_evict=None):
+    """Decorator factory: memoize a function in its own LRUCache"""
+    return LRUCache(maxsize, on_evict).memoize
@@ -1,27 +1,105 @@
+import threading
+from collections import deque
+
+OVERFLOW_POLICIES = ('error', 'overwrite', 'block')
+
 class Queue:
-    def __init__(self):
-        self.items = []
-    
-    def enqueue(self, item):
-        """Add an item to the end of the queue"""
+    def __init__(self, capacity=None, overflow='error'):
+        """A FIFO queue with O(1) enqueue and dequeue.
+
+        With a capacity, enqueueing to a full queue raises IndexError
+        (overflow='error'), drops the oldest item (overflow='overwrite') or
+        waits for another thread to dequeue (overflow='block').
+        """
+        if capacity is not None and capacity < 1:
+            raise ValueError("Capacity must be at least 1")
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Overflow must be one of {', '.join(OVERFLOW_POLICIES)}")
+        self.capacity = capacity
+        self.overflow = overflow
+        self.items = deque(maxlen=capacity if overflow == 'overwrite' else None)
+        self._not_full = threading.Condition() if capacity and overflow == 'block' else None
+
+    def enqueue(self, item, timeout=None):
+        """Add an item to the end of the queue
+
+        timeout bounds the wait of a blocking queue; IndexError is raised if
+        it is still full after that many seconds.
+        """
+        if self._not_full is not None:
+            with self._not_full:
+                if not self._not_full.wait_for(self._has_room, timeout):
+                    raise IndexError("Enqueue to full queue")
+                self.items.append(item)
+            return
+        if self.overflow == 'error' and self.capacity and len(self.items) >= self.capacity:
+            raise IndexError("Enqueue to full queue")
         self.items.append(item)
-    
+
+    def enqueue_many(self, items, timeout=None):
+        """Add several items to the end of the queue, in order
+
+        A queue with overflow='error' adds all of them or, if they don't
+        fit, none.
+        """
+        if self._not_full is not None:
+            for item in items:
+                self.enqueue(item, timeout)
+            return
+        if self.overflow == 'error' and self.capacity:
+            items = list(items)
+            if len(self.items) + len(items) > self.capacity:
+                raise IndexError("Enqueue to full queue")
+        self.items.extend(items)
+
     def dequeue(self):
         """Remove and return the first item in the queue"""
         if not self.is_empty():
-            return self.items.pop(0)
+            item = self.items.popleft()
+            self._notify()
+            return item
         raise IndexError("Dequeue from empty queue")
-    
+
+    def dequeue_many(self, count=None):
+        """Remove and return up to count items (all of them by default) from the front"""
+        if count is None or count >= len(self.items):
+            taken = list(self.items)
+            self.items.clear()
+        else:
+            popleft = self.items.popleft
+            taken = [popleft() for _ in range(count)]
+        self._notify()
+        return taken
+
     def front(self):
         """Return the first item without removing it"""
         if not self.is_empty():
             return self.items[0]
         raise IndexError("Front of empty queue")
-    
+
     def is_empty(self):
         """Check if the queue is empty"""
         return len(self.items) == 0
-    
+
+    def is_full(self):
+        """Check if the queue has reached its capacity"""
+        return self.capacity is not None and len(self.items) >= self.capacity
+
     def size(self):
         """Return the number of items in the queue"""
-        return len(self.items) 
\ No newline at end of file
+        return len(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        """Iterate from front to back without removing anything"""
+        return iter(self.items)
+
+    def _has_room(self):
+        return len(self.items) < self.capacity
+
+    def _notify(self):
+        if self._not_full is not None:
+            with self._not_full:
+                self._not_full.notify_all()
@@ -1,8 +1,16 @@
+import asyncio
+import threading
 import unittest
+from array import array
 from data_structures.stack import Stack
 from data_structures.queue import Queue
+from data_structures.compact import (
+    CompactDoublyLinkedList, CompactLinkedList, CompactQueue, CompactStack
+)
+from data_structures.concurrent import AsyncQueue, AsyncStack, ConcurrentQueue, ConcurrentStack
 from data_structures.linked_list import LinkedList
-from data_structures.doubly_linked_list import DoublyLinkedList
+from data_structures.doubly_linked_list import DoublyLinkedList, IndexedDoublyLinkedList
+from data_structures.lru_cache import LRUCache
 from data_structures.cyclic_linked_list import CyclicLinkedList
 
 class TestDataStructures(unittest.TestCase):
@@ -32,6 +40,49 @@ class TestDataStructures(unittest.TestCase):
         self.assertEqual(queue.dequeue(), 1)
         self.assertEqual(queue.size(), 2)
 
+    def test_queue_bulk_and_iteration(self):
+        queue = Queue()
+        queue.enqueue_many(range(5))
+
+        self.assertEqual(len(queue), 5)
+        self.assertEqual(list(queue), [0, 1, 2, 3, 4])
+        self.assertEqual(queue.dequeue_many(2), [0, 1])
+        self.assertEqual(queue.dequeue_many(), [2, 3, 4])
+        self.assertEqual(queue.dequeue_many(), [])
+        with self.assertRaises(IndexError):
+            queue.dequeue()
+
+    def test_bounded_queue_overflow(self):
+        queue = Queue(capacity=2)
+        queue.enqueue_many([1, 2])
+        self.assertTrue(queue.is_full())
+        with self.assertRaises(IndexError):
+            queue.enqueue(3)
+        queue.dequeue()
+        with self.assertRaises(IndexError):
+            queue.enqueue_many([3, 4])
+        self.assertEqual(list(queue), [2])
+
+        ring = Queue(capacity=3, overflow='overwrite')
+        ring.enqueue_many(range(5))
+        self.assertEqual(list(ring), [2, 3, 4])
+
+        with self.assertRaises(ValueError):
+            Queue(capacity=2, overflow='drop')
+
+    def test_blocking_queue_waits_for_room(self):
+        queue = Queue(capacity=1, overflow='block')
+        queue.enqueue(1)
+        with self.assertRaises(IndexError):
+            queue.enqueue(2, timeout=0.01)
+
+        producer = threading.Thread(target=queue.enqueue, args=(2,))
+        producer.start()
+        self.assertEqual(queue.dequeue(), 1)
+        producer.join(timeout=1)
+        self.assertFalse(producer.is_alive())
+        self.assertEqual(list(queue), [2])
+
     def test_linked_list(self):
         ll = LinkedList()
         ll.append(1)
@@ -46,6 +97,25 @@ class TestDataStructures(unittest.TestCase):
         ll.delete(2)
         self.assertEqual(ll.display(), "0->1->3")
 
+    def test_linked_list_tracks_tail_and_size(self):
+        ll = LinkedList([1, 2, 3])
+        self.assertEqual(len(ll), 3)
+        self.assertEqual(list(ll), [1, 2, 3])
+
+        # Deleting the tail must leave append adding after the new last node
+        ll.delete(3)
+        ll.append(4)
+        self.assertEqual(ll.display(), "1->2->4")
+        self.assertEqual(ll.tail.data, 4)
+
+        for data in (1, 2, 4):
+            ll.delete(data)
+        self.assertEqual(len(ll), 0)
+        self.assertIsNone(ll.tail)
+        ll.prepend(5)
+        ll.extend([6, 7])
+        self.assertEqual(list(ll), [5, 6, 7])
+
     def test_doubly_linked_list(self):
         dll = DoublyLinkedList()
         
@@ -72,6 +142,50 @@ class TestDataStructures(unittest.TestCase):
         dll.delete(3)
         self.assertEqual(dll.display_forward(), "1")
 
+    def test_indexed_doubly_linked_list(self):
+        idll = IndexedDoublyLinkedList(['a', 'b', 'c', 'd'])
+        self.assertIn('c', idll)
+
+        idll.delete('c')
+        idll.move_to_front('d')
+        idll.move_to_back('a')
+        self.assertNotIn('c', idll)
+        self.assertEqual(idll.display_forward(), "d<->b<->a")
+        self.assertEqual(idll.display_backward(), "a<->b<->d")
+        self.assertEqual(idll.pop_back(), 'a')
+        self.assertEqual(len(idll), 2)
+
+        with self.assertRaises(ValueError):
+            idll.append('b')
+        with self.assertRaises(KeyError):
+            idll.move_to_front('c')
+
+    def test_lru_cache(self):
+        evicted = []
+        cache = LRUCache(maxsize=2, on_evict=lambda key, value: evicted.append(key))
+        cache['a'] = 1
+        cache['b'] = 2
+        self.assertEqual(cache['a'], 1)  # b is now least recently used
+        cache['c'] = 3
+
+        self.assertEqual(evicted, ['b'])
+        self.assertNotIn('b', cache)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.stats(), (1, 1, 1, 2, 2))
+
+    def test_lru_memoize(self):
+        calls = []
+        cache = LRUCache(maxsize=10)
+
+        @cache.memoize
+        def square(x, offset=0):
+            calls.append(x)
+            return x * x + offset
+
+        self.assertEqual([square(3), square(3), square(3, offset=1)], [9, 9, 10])
+        self.assertEqual(calls, [3, 3])
+        self.assertEqual(square.cache.stats().hits, 1)
+
     def test_cyclic_linked_list(self):
         cll = CyclicLinkedList()
         
@@ -98,5 +212,152 @@ class TestDataStructures(unittest.TestCase):
         cll.delete(3)
         self.assertEqual(cll.display(), "")
 
+    def test_cyclic_linked_list_tracks_tail_and_size(self):
+        cll = CyclicLinkedList([1, 2, 3])
+        self.assertEqual(len(cll), 3)
+        self.assertEqual(list(cll), [1, 2, 3])
+        self.assertIs(cll.tail.next, cll.head)
+
+        cll.delete(3)
+        cll.append(4)
+        cll.delete(1)
+        cll.prepend(0)
+        self.assertEqual(cll.display(), "0->2->4->(head)")
+        self.assertEqual(len(cll), 3)
+        self.assertIs(cll.tail.next, cll.head)
+        self.assertEqual(cll.tail.data, 4)
+
+    def test_lazy_iteration(self):
+        dll = DoublyLinkedList(range(10))
+        self.assertEqual(list(reversed(dll))[:3], [9, 8, 7])
+
+        evens = dll.filter(lambda x: x % 2 == 0).map(lambda x: x * 10)
+        self.assertEqual(list(evens.slice(1, 3)), [20, 40])
+        self.assertEqual(list(evens.slice(1, 3)), [20, 40])  # pipelines can be re-run
+        self.assertEqual(list(LinkedList(range(10)).slice(2, 8, 3)), [2, 5])
+
+        # Deleting the item just yielded doesn't stop iteration
+        for data in dll:
+            if data % 3:
+                dll.delete(data)
+        self.assertEqual(list(dll), [0, 3, 6, 9])
+
+        cdll = CompactDoublyLinkedList(range(4))
+        for data in cdll:
+            if data == 1:
+                cdll.delete(data)
+        cdll.append(1)
+        self.assertEqual(list(reversed(cdll)), [1, 3, 2, 0])
+        self.assertEqual(list(cdll.map(str)), ['0', '2', '3', '1'])
+
+    def test_cyclic_iteration_from_any_node(self):
+        cll = CyclicLinkedList([1, 2, 3])
+        self.assertEqual(list(cll.cycle(2)), [2, 3, 1])
+        self.assertEqual(list(cll.cycle(3, count=5)), [3, 1, 2, 3, 1])
+        self.assertEqual(list(CyclicLinkedList().cycle(count=5)), [])
+        with self.assertRaises(ValueError):
+            cll.cycle(4)
+
+    def test_compact_stack_views_without_copying(self):
+        stack = CompactStack([1, 2])
+        stack.push_many(array('q', [3, 4]))
+        self.assertEqual(stack.pop(), 4)
+
+        with stack.view() as view:
+            self.assertEqual(view.tolist(), [1, 2, 3])
+            stack.items[0] = 10
+            self.assertEqual(view[0], 10)
+            with self.assertRaises(BufferError):
+                stack.push(5)
+
+    def test_compact_queue_wraps_and_grows(self):
+        queue = CompactQueue(capacity=4)
+        queue.enqueue_many([1, 2, 3])
+        self.assertEqual(queue.dequeue_many(2).tolist(), [1, 2])
+        queue.enqueue_many([4, 5])  # wraps around the end of the buffer
+        self.assertEqual([view.tolist() for view in queue.views()], [[3, 4], [5]])
+
+        queue.enqueue_many(range(6, 10))  # grows
+        self.assertEqual(list(queue), [3, 4, 5, 6, 7, 8, 9])
+        self.assertEqual(queue.dequeue(), 3)
+        self.assertEqual(len(queue), 6)
+
+    def test_compact_linked_lists_reuse_freed_slots(self):
+        ll = CompactLinkedList([1, 2, 3])
+        ll.delete(2)
+        ll.append(4)
+        ll.prepend(0)
+        self.assertEqual(ll.display(), "0->1->3->4")
+        self.assertEqual(len(ll._values), 4)  # 4 took 2's slot
+        self.assertEqual(ll.view().tolist(), [0, 1, 3, 4])
+
+        dll = CompactDoublyLinkedList(array('q', [1, 2, 3]))
+        dll.extend([4])
+        dll.delete(1)
+        self.assertEqual(dll.pop_back(), 4)
+        dll.prepend(0)
+        self.assertEqual(dll.display_forward(), "0<->2<->3")
+        self.assertEqual(dll.display_backward(), "3<->2<->0")
+
+    def test_compact_linked_lists_failed_extend_changes_nothing(self):
+        for cls in (CompactLinkedList, CompactDoublyLinkedList):
+            ll = cls([1, 2])
+            with self.assertRaises(TypeError):
+                ll.extend([3, 'x'])
+            self.assertEqual((list(ll), len(ll)), ([1, 2], 2))
+            self.assertEqual(len(ll._values), len(ll._next))
+            ll.delete(1)
+            with self.assertRaises(TypeError):
+                ll.extend([3, 'x'])  # with a free slot to reuse
+            ll.extend([3, 4])
+            self.assertEqual(list(ll), [2, 3, 4])
+
+    def test_concurrent_queue_between_threads(self):
+        queue = ConcurrentQueue(capacity=8)
+        producers = [threading.Thread(target=queue.put_many, args=(range(i * 100, i * 100 + 100),))
+                     for i in range(4)]
+        for producer in producers:
+            producer.start()
+
+        received = []
+        while len(received) < 400:
+            received.extend(queue.get_many(max_items=16, timeout=1))
+            self.assertLessEqual(len(queue), 8)
+        for producer in producers:
+            producer.join()
+        self.assertEqual(sorted(received), list(range(400)))
+        self.assertEqual(queue.get_many(timeout=0), [])
+        with self.assertRaises(IndexError):
+            queue.get(timeout=0.01)
+
+    def test_concurrent_stack_is_lifo_and_bounded(self):
+        stack = ConcurrentStack(capacity=2)
+        stack.put(1)
+        stack.put(2)
+        with self.assertRaises(IndexError):
+            stack.put(3, timeout=0.01)
+        self.assertEqual(stack.get(), 2)
+        self.assertEqual(stack.get_many(), [1])
+
+    def test_async_queue_backpressure(self):
+        async def scenario():
+            queue = AsyncQueue(capacity=2)
+            producer = asyncio.ensure_future(queue.put_many(range(5)))
+            await asyncio.sleep(0)
+            self.assertEqual(len(queue), 2)  # the producer is waiting for room
+
+            received = []
+            while len(received) < 5:
+                received.extend(await queue.get_many(timeout=1))
+            await producer
+            with self.assertRaises(IndexError):
+                await queue.get(timeout=0.01)
+
+            stack = AsyncStack()
+            await stack.put_many([1, 2])
+            return received, await stack.get()
+
+        self.assertEqual(asyncio.run(scenario()), ([0, 1, 2, 3, 4], 2))
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
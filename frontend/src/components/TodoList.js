@@ -28,8 +28,17 @@ import { format } from 'date-fns';
 import { AdapterDateFns } from '@mui/x-date-pickers/AdapterDateFns';
 import { LocalizationProvider, DateTimePicker } from '@mui/x-date-pickers';
 
+// Sorting, filtering and search all happen on the server; these map the
+// "Sort By" menu onto the API's sort/order parameters.
+const SORT_PARAMS = {
+  created: { sort: 'created', order: 'desc' },
+  dueDate: { sort: 'due', order: 'asc' },
+  title: { sort: 'title', order: 'asc' },
+};
+
 function TodoList() {
   const [todos, setTodos] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [newTodo, setNewTodo] = useState('');
   const [categories, setCategories] = useState([]);
   const [selectedCategory, setSelectedCategory] = useState('');
@@ -40,19 +49,45 @@ function TodoList() {
   const [dueDate, setDueDate] = useState(null);
 
   useEffect(() => {
-    loadTodos();
     loadCategories();
   }, []);
 
+  useEffect(() => {
+    // Debounce so typing in the search box doesn't fire a request per keystroke
+    const timer = setTimeout(loadTodos, 300);
+    return () => clearTimeout(timer);
+  }, [searchQuery, filterStatus, sortBy, selectedCategory]);
+
+  const queryParams = () => {
+    const params = { ...SORT_PARAMS[sortBy] };
+    if (searchQuery.trim()) params.q = searchQuery.trim();
+    if (filterStatus !== 'all') params.completed = filterStatus === 'completed';
+    if (selectedCategory) params.category = selectedCategory;
+    return params;
+  };
+
   const loadTodos = async () => {
     try {
-      const data = await todoService.getAllTodos();
-      setTodos(data);
+      const page = await todoService.getTodos(queryParams());
+      setTodos(page.todos);
+      setNextCursor(page.nextCursor);
     } catch (error) {
       console.error('Error loading todos:', error);
     }
   };
 
+  const loadMoreTodos = async () => {
+    if (!nextCursor) return;
+
+    try {
+      const page = await todoService.getTodos({ ...queryParams(), cursor: nextCursor });
+      setTodos((current) => [...current, ...page.todos]);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      console.error('Error loading more todos:', error);
+    }
+  };
+
   const loadCategories = async () => {
     try {
       const data = await todoService.getCategories();
@@ -117,45 +152,6 @@ function TodoList() {
     }
   };
 
-  const filteredAndSortedTodos = () => {
-    let filtered = [...todos];
-
-    // Apply search filter
-    if (searchQuery) {
-      filtered = filtered.filter(todo =>
-        todo.title.toLowerCase().includes(searchQuery.toLowerCase())
-      );
-    }
-
-    // Apply status filter
-    if (filterStatus !== 'all') {
-      filtered = filtered.filter(todo =>
-        filterStatus === 'completed' ? todo.completed : !todo.completed
-      );
-    }
-
-    // Apply category filter
-    if (selectedCategory) {
-      filtered = filtered.filter(todo => todo.category === selectedCategory);
-    }
-
-    // Apply sorting
-    filtered.sort((a, b) => {
-      switch (sortBy) {
-        case 'title':
-          return a.title.localeCompare(b.title);
-        case 'dueDate':
-          return new Date(a.due_date || '9999') - new Date(b.due_date || '9999');
-        case 'created':
-          return new Date(b.created_at) - new Date(a.created_at);
-        default:
-          return 0;
-      }
-    });
-
-    return filtered;
-  };
-
   return (
     <Box sx={{ mt: 2 }}>
       {/* Add Todo Form */}
@@ -251,7 +247,7 @@ function TodoList() {
       {/* Todo List */}
       <Paper>
         <List>
-          {filteredAndSortedTodos().map((todo) => (
+          {todos.map((todo) => (
             <ListItem
               key={todo.id}
               divider
@@ -303,6 +299,11 @@ function TodoList() {
             </ListItem>
           ))}
         </List>
+        {nextCursor && (
+          <Box sx={{ p: 2, textAlign: 'center' }}>
+            <Button onClick={loadMoreTodos}>Load more</Button>
+          </Box>
+        )}
       </Paper>
 
       {/* Edit Todo Dialog */}
@@ -3,9 +3,12 @@ import axios from 'axios';
 const API_URL = 'http://localhost:5000/api';
 
 export const todoService = {
-    async getAllTodos() {
-        const response = await axios.get(`${API_URL}/todos`);
-        return response.data;
+    async getTodos(params = {}) {
+        const response = await axios.get(`${API_URL}/todos`, { params });
+        return {
+            todos: response.data,
+            nextCursor: response.headers['x-next-cursor'] || null,
+        };
     },
 
     async createTodo(todo) {
@@ -0,0 +1,19 @@
+"""Gunicorn settings for serving the WSGI app in production.
+
+    gunicorn -c gunicorn.conf.py run:app
+"""
+import os
+
+bind = os.environ.get('GUNICORN_BIND') or '0.0.0.0:5000'
+workers = int(os.environ.get('WEB_CONCURRENCY') or 4)
+# Keep MONGO_MAX_POOL_SIZE >= threads so requests don't queue for a connection
+threads = int(os.environ.get('GUNICORN_THREADS') or 8)
+preload_app = (os.environ.get('GUNICORN_PRELOAD') or 'false').lower() == 'true'
+
+def post_fork(server, worker):
+    # A preloaded app built its MongoClient and background threads in the
+    # master; PyMongo clients are not fork-safe and threads don't survive a
+    # fork, so each worker sets up its own
+    if preload_app:
+        from todo_app import after_fork
+        after_fork(server.app.wsgi())
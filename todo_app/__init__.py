@@ -1,3 +1,4 @@
+import click
 from flask import Flask
 from flask_pymongo import PyMongo
 from flask_cors import CORS
@@ -5,20 +6,93 @@ from todo_app.config import Config
 
 mongo = PyMongo()
 
+def init_mongo(app):
+    """Create this process's MongoClient from the MONGO_* pool and driver settings.
+
+    Called by create_app, and again in each worker of a pre-forking server
+    that loaded the app before forking (see gunicorn.conf.py), so workers
+    never share a client's sockets and monitor threads.
+    """
+    from todo_app.metrics import metrics
+    from todo_app.mongo_client import PoolStats, client_options
+    pool_stats = PoolStats()
+    listeners = [pool_stats]
+    if app.config['METRICS_ENABLED']:
+        listeners.append(metrics.command_listener)
+    mongo.init_app(app, **client_options(app.config, listeners))
+    app.extensions['mongo_pool_stats'] = pool_stats
+    
+    # Flask-PyMongo installs its own JSON provider in init_app, so this has to come after
+    from todo_app.json_provider import init_json_provider
+    init_json_provider(app)
+
+def after_fork(app):
+    """Set up a worker forked from a process that had already built app.
+
+    The worker gets its own MongoClient, and the background threads that
+    did not survive the fork are started again.
+    """
+    from todo_app.overdue import overdue_scheduler
+    from todo_app.storage import storage
+    from todo_app.write_behind import write_behind
+    if storage.backend == 'mongo':
+        init_mongo(app)
+    write_behind.after_fork()
+    overdue_scheduler.after_fork()
+
 def create_app(config_class=Config):
     app = Flask(__name__)
-    CORS(app)
+    CORS(app, expose_headers=['X-Next-Cursor', 'Link', 'ETag'])
     app.config.from_object(config_class)
     
-    # Initialize MongoDB with retry logic
-    try:
-        mongo.init_app(app)
-    except Exception as e:
-        app.logger.error(f"Failed to initialize MongoDB: {e}")
-        raise
+    from todo_app.metrics import metrics
+    from todo_app.profiler import profiler
+    metrics.init_app(app)
+    profiler.init_app(app)
+    
+    # Drains any writes still queued for a previous app before its storage is replaced
+    from todo_app.write_behind import write_behind
+    write_behind.init_app(app)
+    
+    from todo_app.storage import storage
+    storage.init_app(app)
+    if storage.backend == 'mongo':
+        # Initialize MongoDB with retry logic
+        try:
+            init_mongo(app)
+        except Exception as e:
+            app.logger.error(f"Failed to initialize MongoDB: {e}")
+            raise
+    else:
+        from todo_app.json_provider import init_json_provider
+        init_json_provider(app)
+    
+    from todo_app.cache import category_cache, stats_cache, todo_cache
+    from todo_app.overdue import overdue_scheduler
+    category_cache.init_app(app)
+    todo_cache.init_app(app)
+    stats_cache.init_app(app)
+    overdue_scheduler.init_app(app)
     
     # Register blueprints
     from todo_app.routes.todo_routes import todos
     app.register_blueprint(todos)
     
+    # Indexes are idempotent to create; a missing server must not stop startup.
+    # A new in-memory store always gets them, since $text needs the text index
+    if app.config['MONGO_CREATE_INDEXES'] or storage.backend == 'memory':
+        from todo_app.models.todo import Todo
+        with app.app_context():
+            try:
+                Todo.create_indexes()
+            except Exception as e:
+                app.logger.error(f"Failed to create MongoDB indexes: {e}")
+    
+    @app.cli.command('create-indexes')
+    def create_indexes_command():
+        """Create the MongoDB indexes declared in todo_app.models.indexes"""
+        from todo_app.models.todo import Todo
+        for name in Todo.create_indexes():
+            click.echo(f"Index ready: {name}")
+    
     return app 
\ No newline at end of file
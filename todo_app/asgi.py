@@ -0,0 +1,55 @@
+"""ASGI counterpart of create_app, serving the same API from Quart.
+
+    uvicorn asgi:app --workers 4
+
+Routes await PyMongo's asyncio client instead of blocking a thread per
+request, so one worker process can hold thousands of open connections.
+"""
+from quart import Quart
+from todo_app.async_mongo import async_mongo
+from todo_app.config import Config
+
+try:
+    from quart_cors import cors
+except ImportError:  # quart-cors is only needed when a browser calls the API cross-origin
+    cors = None
+
+def create_async_app(config_class=Config):
+    app = Quart(__name__)
+    app.config.from_object(config_class)
+    # These hang off the Flask write routes; the async routes would bypass them
+    for setting in ('OVERDUE_SCHEDULER_ENABLED', 'WRITE_BEHIND_ENABLED'):
+        if app.config[setting]:
+            raise ValueError(f'{setting} is not supported by the ASGI app')
+    if app.config['METRICS_ENABLED']:
+        app.logger.warning("METRICS_ENABLED only instruments the Flask app")
+    if cors is not None:
+        app = cors(app, expose_headers=['X-Next-Cursor', 'Link', 'ETag'])
+    else:
+        app.logger.warning("quart-cors is not installed; CORS headers are disabled")
+    
+    async_mongo.init_app(app)
+    
+    from todo_app.json_provider import init_json_provider
+    init_json_provider(app)
+    
+    from todo_app.cache import category_cache, stats_cache, todo_cache
+    category_cache.init_app(app)
+    todo_cache.init_app(app)
+    stats_cache.init_app(app)
+    
+    from todo_app.routes.async_routes import todos
+    app.register_blueprint(todos)
+    
+    # Indexes are idempotent to create; a missing server must not stop startup.
+    # A new in-memory store always gets them, since $text needs the text index
+    if app.config['MONGO_CREATE_INDEXES'] or app.config['STORAGE_BACKEND'] == 'memory':
+        @app.before_serving
+        async def create_indexes():
+            from todo_app.models.async_todo import AsyncTodo
+            try:
+                await AsyncTodo.create_indexes()
+            except Exception as e:
+                app.logger.error(f"Failed to create MongoDB indexes: {e}")
+    
+    return app
@@ -0,0 +1,34 @@
+from pymongo import AsyncMongoClient
+from todo_app.mongo_client import PoolStats, client_options
+from todo_app.storage.memory import AsyncMemoryDatabase, MemoryDatabase
+
+class AsyncPyMongo:
+    """Flask-PyMongo's PyMongo for the ASGI app, on PyMongo's asyncio client.
+
+    init_app() reads the same MONGO_URI and pool settings as the WSGI app; db
+    is the database named in it. The client connects lazily on the app's event
+    loop and is closed when the app stops serving. With STORAGE_BACKEND set to
+    'memory', db is an in-process store behind the same async interface.
+    """
+
+    def __init__(self):
+        self.cx = None
+        self.db = None
+
+    def init_app(self, app):
+        if app.config['STORAGE_BACKEND'] == 'memory':
+            self.cx = None
+            self.db = AsyncMemoryDatabase(MemoryDatabase())
+            return
+
+        pool_stats = PoolStats()
+        self.cx = AsyncMongoClient(app.config['MONGO_URI'],
+                                   **client_options(app.config, [pool_stats]))
+        app.extensions['mongo_pool_stats'] = pool_stats
+        self.db = self.cx.get_default_database()
+
+        @app.after_serving
+        async def close_client():
+            await self.cx.close()
+
+async_mongo = AsyncPyMongo()
@@ -0,0 +1,229 @@
+import threading
+import time
+from data_structures.lru_cache import LRUCache
+
+class CategoryCache:
+    """Per-process category -> todo count map, kept current by the write routes.
+
+    The write routes report every change through record(), so reads never
+    touch the todos collection. Other worker processes' writes are not seen
+    that way; the TTL bounds how long such drift can last before the counts
+    are reloaded with one aggregation. The aggregation runs without the
+    lock, and its result is only kept if no change was recorded meanwhile,
+    since such a change may already be counted in it.
+    """
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._counts = None
+        self._loaded_at = 0.0
+        # Bumped by every recorded change, so a reload that raced a write isn't kept
+        self._generation = 0
+
+    def init_app(self, app):
+        self.ttl = app.config['CATEGORY_CACHE_TTL']
+        self.invalidate()
+
+    def _stale(self):
+        return self._counts is None or time.monotonic() - self._loaded_at > self.ttl
+
+    @staticmethod
+    def _visible(counts):
+        return {name: count for name, count in counts.items()
+                if name is not None and count > 0}
+
+    def counts(self):
+        """Return {category: count} for every non-empty category"""
+        counts, generation = self.lookup()
+        if counts is None:
+            from todo_app.models.todo import Todo
+            counts = self.load(Todo.get_category_counts(), generation)
+        return counts
+
+    def lookup(self):
+        """(counts(), or None when the cache is empty or stale, and a token for load()).
+
+        For callers that load the counts themselves, e.g. with the async
+        driver, and hand them back through load().
+        """
+        with self._lock:
+            return (None if self._stale() else self._visible(self._counts)), self._generation
+
+    def load(self, counts, generation):
+        """Cache counts aggregated after lookup() missed, unless a change was recorded since.
+
+        Returns the non-empty categories of counts either way.
+        """
+        with self._lock:
+            if generation == self._generation:
+                self._counts = dict(counts)
+                self._loaded_at = time.monotonic()
+        return self._visible(counts)
+
+    def categories(self):
+        """Sorted list of category names"""
+        return sorted(self.counts())
+
+    def record(self, before, after):
+        """Apply one todo change; before/after are documents, None for create/delete"""
+        old = before.get('category') if before else None
+        new = after.get('category') if after else None
+        if before is not None and after is not None and old == new:
+            return
+        with self._lock:
+            self._generation += 1
+            if self._counts is None:
+                return
+            if before is not None:
+                self._counts[old] = self._counts.get(old, 0) - 1
+            if after is not None:
+                self._counts[new] = self._counts.get(new, 0) + 1
+
+    def invalidate(self):
+        """Drop the cached counts so the next read reloads them"""
+        with self._lock:
+            self._generation += 1
+            self._counts = None
+
+category_cache = CategoryCache()
+
+class TodoCache:
+    """Per-process read-through cache of todo documents by _id, for single-todo reads.
+
+    Entries sit in an LRUCache bounded to maxsize and are reloaded once
+    older than ttl seconds. The write routes drop the todos they change
+    through record(); as with the category cache, the TTL bounds how long
+    another process's write can go unseen. Missing ids are not cached.
+    """
+
+    def __init__(self, maxsize=10000, ttl=30):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = LRUCache(maxsize)  # _id -> (document, loaded_at)
+        self._expired = 0
+        # Bumped by every invalidation, so a read that raced a write isn't cached
+        self._generation = 0
+
+    def init_app(self, app):
+        self.ttl = app.config['TODO_CACHE_TTL']
+        with self._lock:
+            self._entries = LRUCache(app.config['TODO_CACHE_SIZE'])
+            self._expired = 0
+            self._generation += 1
+
+    def get(self, todo_id):
+        """The todo document for todo_id, loading it on a miss; None if it doesn't exist"""
+        doc, generation = self.lookup(todo_id)
+        if doc is None:
+            from todo_app.models.todo import Todo
+            doc = self.load(todo_id, Todo.get_by_id(todo_id), generation)
+        return doc
+
+    def lookup(self, todo_id):
+        """(cached document or None, token to pass to load() after a miss).
+
+        For callers that read the document themselves, e.g. with the async driver.
+        """
+        with self._lock:
+            entry = self._entries.get(todo_id)
+            if entry is not None and time.monotonic() - entry[1] > self.ttl:
+                self._entries.pop(todo_id)
+                self._expired += 1
+                entry = None
+            return (entry[0] if entry is not None else None), self._generation
+
+    def load(self, todo_id, doc, generation):
+        """Cache a document read after lookup() missed, unless a write may have changed it since"""
+        with self._lock:
+            if doc is not None and generation == self._generation:
+                self._entries.put(todo_id, (doc, time.monotonic()))
+        return doc
+
+    def record(self, before, after):
+        """Drop the todo changed by a write; before/after are documents, None for create/delete"""
+        if before is not None:
+            self.invalidate(before['_id'])
+
+    def invalidate(self, todo_id=None):
+        """Drop one todo, or every todo when todo_id is None"""
+        with self._lock:
+            self._generation += 1
+            if todo_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(todo_id)
+
+    def stats(self):
+        """Hits, misses (expired entries included), evictions, size and maxsize"""
+        with self._lock:
+            stats = self._entries.stats()
+            return {
+                'hits': stats.hits - self._expired,
+                'misses': stats.misses + self._expired,
+                'evictions': stats.evictions,
+                'size': stats.size,
+                'maxsize': stats.maxsize,
+            }
+
+todo_cache = TodoCache()
+
+class StatsCache:
+    """Per-process copy of the GET /api/todos/stats results, one per bucket size.
+
+    Results are reused for ttl seconds. A write through the routes drops
+    them all, so this process's own writes show up at once; other
+    processes' writes and todos falling overdue show up within the TTL.
+    """
+
+    def __init__(self, ttl=10):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._results = {}  # bucket -> (stats, loaded_at)
+        self._generation = 0
+
+    def init_app(self, app):
+        self.ttl = app.config['TODO_STATS_TTL']
+        self.invalidate()
+
+    def get(self, bucket=None):
+        """Stats for bucket, aggregating them on a miss"""
+        stats, generation = self.lookup(bucket)
+        if stats is None:
+            from todo_app.models.todo import Todo
+            stats = self.load(bucket, Todo.get_stats(bucket), generation)
+        return stats
+
+    def lookup(self, bucket=None):
+        """(cached stats or None, token to pass to load() after a miss)"""
+        with self._lock:
+            entry = self._results.get(bucket)
+            if entry is None or time.monotonic() - entry[1] > self.ttl:
+                return None, self._generation
+            return entry[0], self._generation
+
+    def load(self, bucket, stats, generation):
+        """Cache stats aggregated after lookup() missed, unless a write came in since"""
+        with self._lock:
+            if generation == self._generation:
+                self._results[bucket] = (stats, time.monotonic())
+        return stats
+
+    def record(self, before, after):
+        """Any todo change may alter every figure, so drop them all"""
+        self.invalidate()
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._results.clear()
+
+stats_cache = StatsCache()
+
+def invalidate_all():
+    """Reset every in-process cache, e.g. after writes that bypass the routes"""
+    from todo_app.overdue import overdue_scheduler
+    category_cache.invalidate()
+    todo_cache.invalidate()
+    stats_cache.invalidate()
+    overdue_scheduler.invalidate()
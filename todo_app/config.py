@@ -5,4 +5,85 @@ load_dotenv()
 
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev'
-    MONGO_URI = os.environ.get('MONGO_URI') or 'mongodb://localhost:27017/todo_app' 
\ No newline at end of file
+    # 'mongo', or 'memory' for the in-process engine (one process, not persisted)
+    STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND') or 'mongo'
+    MONGO_URI = os.environ.get('MONGO_URI') or 'mongodb://localhost:27017/todo_app'
+    MONGO_CREATE_INDEXES = (os.environ.get('MONGO_CREATE_INDEXES') or 'true').lower() == 'true'
+    
+    # MongoDB client pool, per worker process: size it to at least the worker's
+    # threads (or concurrent requests under ASGI), and keep the total across
+    # workers below the server's connection limit
+    MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE') or 100)
+    MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE') or 0)
+    # 0 keeps idle connections open indefinitely
+    MONGO_MAX_IDLE_TIME_MS = int(os.environ.get('MONGO_MAX_IDLE_TIME_MS') or 0)
+    # How long a request waits for a free pooled connection before failing
+    MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS') or 2000)
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS') or 5000)
+    MONGO_CONNECT_TIMEOUT_MS = int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS') or 5000)
+    # Wire compression in order of preference, e.g. 'zstd,snappy,zlib'; zstd and
+    # snappy need their optional compression packages, zlib is always available
+    MONGO_COMPRESSORS = os.environ.get('MONGO_COMPRESSORS') or ''
+    # primary, primaryPreferred, secondary, secondaryPreferred or nearest
+    MONGO_READ_PREFERENCE = os.environ.get('MONGO_READ_PREFERENCE') or 'primary'
+    # 'orjson' (used when installed) or 'bson' for Flask-PyMongo's json_util encoder
+    JSON_PROVIDER = os.environ.get('JSON_PROVIDER') or 'orjson'
+    
+    # Keyset pagination for todo listings
+    TODOS_PAGE_SIZE = int(os.environ.get('TODOS_PAGE_SIZE') or 100)
+    TODOS_MAX_PAGE_SIZE = int(os.environ.get('TODOS_MAX_PAGE_SIZE') or 1000)
+    
+    # Streamed listings (?stream=true or Accept: application/x-ndjson)
+    TODOS_STREAM_BATCH_SIZE = int(os.environ.get('TODOS_STREAM_BATCH_SIZE') or 500)
+    TODOS_STREAM_CHUNK_SIZE = int(os.environ.get('TODOS_STREAM_CHUNK_SIZE') or 100)
+    
+    # Largest batch accepted by POST /api/todos/bulk
+    TODOS_BULK_MAX_OPERATIONS = int(os.environ.get('TODOS_BULK_MAX_OPERATIONS') or 1000)
+    
+    # POST /api/todos/import: rows per insert_many, and how many row errors are reported
+    TODOS_IMPORT_BATCH_SIZE = int(os.environ.get('TODOS_IMPORT_BATCH_SIZE') or 1000)
+    TODOS_IMPORT_MAX_ERRORS = int(os.environ.get('TODOS_IMPORT_MAX_ERRORS') or 100)
+    
+    # Write-behind: queue todo writes in-process and flush them as batched bulk_writes,
+    # once WRITE_BEHIND_BATCH_SIZE are waiting or WRITE_BEHIND_FLUSH_MS after the oldest.
+    # Durability 'flush' answers a write once its batch is stored; 'enqueue' answers at
+    # once and loses queued writes if the process dies
+    WRITE_BEHIND_ENABLED = (os.environ.get('WRITE_BEHIND_ENABLED') or 'false').lower() == 'true'
+    WRITE_BEHIND_DURABILITY = os.environ.get('WRITE_BEHIND_DURABILITY') or 'flush'
+    WRITE_BEHIND_BATCH_SIZE = int(os.environ.get('WRITE_BEHIND_BATCH_SIZE') or 500)
+    WRITE_BEHIND_FLUSH_MS = float(os.environ.get('WRITE_BEHIND_FLUSH_MS') or 20)
+    # Writes that may wait at once; further writes block until a batch is written
+    WRITE_BEHIND_MAX_PENDING = int(os.environ.get('WRITE_BEHIND_MAX_PENDING') or 10000)
+    
+    # Request instrumentation: /metrics, Server-Timing headers and MongoDB command timings
+    METRICS_ENABLED = (os.environ.get('METRICS_ENABLED') or 'false').lower() == 'true'
+    # Write sampled stacks of requests slower than this many seconds to PROFILE_DIR (0 disables)
+    PROFILE_SLOW_REQUESTS_SECONDS = float(os.environ.get('PROFILE_SLOW_REQUESTS_SECONDS') or 0)
+    PROFILE_DIR = os.environ.get('PROFILE_DIR') or 'profiles'
+    PROFILE_INTERVAL_MS = float(os.environ.get('PROFILE_INTERVAL_MS') or 5)
+    
+    # Seconds before the in-process category counts are reloaded from MongoDB
+    CATEGORY_CACHE_TTL = float(os.environ.get('CATEGORY_CACHE_TTL') or 60)
+    # In-process LRU of single todos for GET /api/todos/<id>: entries, and seconds before reload
+    TODO_CACHE_SIZE = int(os.environ.get('TODO_CACHE_SIZE') or 10000)
+    TODO_CACHE_TTL = float(os.environ.get('TODO_CACHE_TTL') or 30)
+    # Seconds GET /api/todos/stats results are reused before aggregating again
+    TODO_STATS_TTL = float(os.environ.get('TODO_STATS_TTL') or 10)
+    
+    # Seconds an overdue listing's ETag stays valid, since todos become overdue over time
+    OVERDUE_ETAG_WINDOW = int(os.environ.get('OVERDUE_ETAG_WINDOW') or 60)
+    # Serve /api/todos/overdue from an in-process set that a background thread keeps
+    # current as due dates pass, reloaded from MongoDB every OVERDUE_RELOAD_SECONDS
+    OVERDUE_SCHEDULER_ENABLED = (os.environ.get('OVERDUE_SCHEDULER_ENABLED') or 'false').lower() == 'true'
+    OVERDUE_RELOAD_SECONDS = float(os.environ.get('OVERDUE_RELOAD_SECONDS') or 300)
+    
+    # GET /api/todos/changes: page size, and how far behind "now" a caught-up
+    # sync token is placed so slow-to-commit writes are not skipped
+    SYNC_PAGE_SIZE = int(os.environ.get('SYNC_PAGE_SIZE') or 500)
+    SYNC_LAG_SECONDS = float(os.environ.get('SYNC_LAG_SECONDS') or 5)
+
+class TestingConfig(Config):
+    """Test suite settings: in-memory storage unless TEST_STORAGE_BACKEND=mongo"""
+    TESTING = True
+    STORAGE_BACKEND = os.environ.get('TEST_STORAGE_BACKEND') or 'memory'
+    MONGO_URI = os.environ.get('TEST_MONGO_URI') or 'mongodb://localhost:27017/todo_app_test'
@@ -0,0 +1,37 @@
+from bson import json_util
+from bson.json_util import RELAXED_JSON_OPTIONS
+from flask_pymongo.helpers import BSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson is an optional speedup
+    orjson = None
+
+def _default(obj):
+    # Anything orjson can't encode natively (ObjectId, Decimal128, ...) gets
+    # the same extended-JSON form BSONProvider would have produced
+    return json_util.default(obj, RELAXED_JSON_OPTIONS)
+
+class OrjsonProvider(BSONProvider):
+    """JSON provider encoding responses with orjson.
+
+    Drop-in replacement for Flask-PyMongo's BSONProvider: decoding is left to
+    bson.json_util, while encoding, which dominates listing responses, goes
+    through orjson.
+    """
+
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_NON_STR_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_default, option=option).decode('utf-8')
+
+def init_json_provider(app):
+    """Install the fastest available JSON provider according to JSON_PROVIDER"""
+    if app.config['JSON_PROVIDER'] == 'orjson':
+        if orjson is not None:
+            app.json = OrjsonProvider(app)
+            return
+        app.logger.warning("JSON_PROVIDER is 'orjson' but orjson is not installed")
+    # Flask-PyMongo's init_app installs this too, but not every storage backend runs it
+    app.json = BSONProvider(app)
@@ -0,0 +1,212 @@
+"""Opt-in request instrumentation (METRICS_ENABLED).
+
+Records per-route latency histograms, MongoDB command timings from PyMongo's
+command monitoring and the number of todo documents serialized, serves them
+in Prometheus text format on /metrics, and breaks each response's time down
+in a Server-Timing header (db, serialize, total).
+
+Per-request figures are collected in a context variable, so the command
+listener, which PyMongo calls on the thread that issued the command,
+attributes each round trip to the request that made it. With metrics
+disabled phase() and count_serialized() return immediately.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from flask import Response, g, request
+from pymongo import monitoring
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_current = ContextVar('request_timings', default=None)
+
+def _labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(
+        '%s="%s"' % (name, str(value).replace('\\', r'\\').replace('"', r'\"'))
+        for name, value in zip(names, values)
+    )
+    return '{' + pairs + '}'
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, amount=1, *label_values):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_labels(self.labels, label_values)} {value}')
+        return lines
+
+class Histogram:
+    """Prometheus histogram: cumulative buckets, sum and count per label set"""
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}  # label values -> [count per bucket..., +Inf count, sum]
+
+    def observe(self, value, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for label_values, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + ('+Inf',), series):
+                    cumulative += count
+                    labels = _labels(self.labels + ('le',), label_values + (bound,))
+                    lines.append(f'{self.name}_bucket{labels} {cumulative}')
+                labels = _labels(self.labels, label_values)
+                lines.append(f'{self.name}_sum{labels} {series[-1]}')
+                lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+class RequestTimings:
+    """Seconds and call counts per phase of the current request"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases = {}
+
+    def add(self, name, seconds):
+        total, calls = self.phases.get(name, (0.0, 0))
+        self.phases[name] = (total + seconds, calls + 1)
+
+    def server_timing(self, total):
+        entries = [f'{name};dur={seconds * 1000:.2f};desc="{calls} calls"'
+                   for name, (seconds, calls) in self.phases.items()]
+        entries.append(f'total;dur={total * 1000:.2f}')
+        return ', '.join(entries)
+
+class CommandTimer(monitoring.CommandListener):
+    """Feeds MongoDB command durations to the histogram and the current request"""
+
+    def __init__(self, metrics):
+        self.metrics = metrics
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._record(event, 'ok')
+
+    def failed(self, event):
+        self._record(event, 'error')
+
+    def _record(self, event, outcome):
+        seconds = event.duration_micros / 1e6
+        self.metrics.mongo_seconds.observe(seconds, event.command_name, outcome)
+        timings = _current.get()
+        if timings is not None:
+            timings.add('db', seconds)
+
+class Metrics:
+    def __init__(self):
+        self.enabled = False
+        self.command_listener = CommandTimer(self)
+        self._reset()
+
+    def _reset(self):
+        self.request_seconds = Histogram(
+            'todo_request_duration_seconds', 'Time to build each response',
+            ('endpoint', 'method', 'status'))
+        self.mongo_seconds = Histogram(
+            'todo_mongo_command_duration_seconds', 'MongoDB command round trips',
+            ('command', 'outcome'))
+        self.documents = Counter(
+            'todo_documents_serialized_total', 'Todo documents serialized for responses',
+            ('endpoint',))
+
+    def init_app(self, app):
+        self.enabled = app.config['METRICS_ENABLED']
+        if not self.enabled:
+            return
+        self._reset()
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.teardown_request(self._teardown)
+        app.add_url_rule('/metrics', 'metrics', self.render_response)
+
+    def _start(self):
+        g.request_timings_token = _current.set(RequestTimings())
+
+    def _finish(self, response):
+        timings = _current.get()
+        if timings is None:
+            return response
+        total = time.perf_counter() - timings.start
+        self.request_seconds.observe(
+            total, request.endpoint or 'unmatched', request.method, response.status_code
+        )
+        response.headers['Server-Timing'] = timings.server_timing(total)
+        return response
+
+    def _teardown(self, exc):
+        token = g.pop('request_timings_token', None)
+        if token is not None:
+            _current.reset(token)
+
+    def render(self):
+        from todo_app.cache import todo_cache
+        lines = []
+        for metric in (self.request_seconds, self.mongo_seconds, self.documents):
+            lines.extend(metric.render())
+        lines.extend(render_cache_stats('todo_cache', 'Single-todo cache', todo_cache.stats()))
+        return '\n'.join(lines) + '\n'
+
+    def render_response(self):
+        return Response(self.render(), mimetype='text/plain; version=0.0.4')
+
+def render_cache_stats(name, help, stats):
+    """Prometheus lines for a cache's stats() dict"""
+    return [
+        f'# HELP {name}_requests_total {help} lookups by result',
+        f'# TYPE {name}_requests_total counter',
+        f'{name}_requests_total{{result="hit"}} {stats["hits"]}',
+        f'{name}_requests_total{{result="miss"}} {stats["misses"]}',
+        f'# HELP {name}_evictions_total {help} entries evicted to stay within maxsize',
+        f'# TYPE {name}_evictions_total counter',
+        f'{name}_evictions_total {stats["evictions"]}',
+        f'# HELP {name}_entries {help} entries held',
+        f'# TYPE {name}_entries gauge',
+        f'{name}_entries {stats["size"]}',
+    ]
+
+metrics = Metrics()
+
+@contextmanager
+def phase(name):
+    """Time a block as one Server-Timing phase of the current request"""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start)
+
+def count_serialized(count):
+    """Count documents serialized for the current request's endpoint"""
+    if metrics.enabled and count:
+        metrics.documents.inc(count, request.endpoint or 'unmatched')
@@ -0,0 +1,140 @@
+"""Todo queries for the ASGI app, on PyMongo's asyncio client.
+
+Queries, projections, keyset pages and sync tokens are built by the same
+Todo helpers the WSGI routes use, so both apps read and write identical
+documents; only the round trips here are awaited.
+"""
+from datetime import datetime
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
+from todo_app.async_mongo import async_mongo
+from todo_app.models import indexes
+from todo_app.models.todo import CATEGORY_COUNTS_PIPELINE, ChangeSet, Todo
+
+class AsyncTodo:
+    @staticmethod
+    async def save(todo):
+        return await async_mongo.db.todos.insert_one(todo.to_document())
+
+    @staticmethod
+    async def find_page(query=None, sort='created', order='asc', limit=100, cursor=None,
+                        fields=None):
+        """Get one page of todos matching query, plus the cursor for the next page"""
+        sort_field, direction = Todo.sort_spec(sort, order)
+        return await AsyncTodo._paginate(query or {}, sort_field, limit, cursor, direction,
+                                         fields)
+
+    @staticmethod
+    def find_cursor(query=None, sort='created', order='asc', batch_size=500, fields=None):
+        """Get a batched async cursor over every todo matching query, for streaming"""
+        sort_field, direction = Todo.sort_spec(sort, order)
+        return async_mongo.db.todos.find(
+            query or {},
+            Todo.projection(fields),
+            sort=[(sort_field, direction), ('_id', direction)],
+            batch_size=batch_size
+        )
+
+    @staticmethod
+    async def get_by_id(todo_id):
+        return await async_mongo.db.todos.find_one({'_id': todo_id})
+
+    @staticmethod
+    async def get_many(todo_ids):
+        """Get {id: document} for the todo_ids that exist, in one indexed query"""
+        found = async_mongo.db.todos.find({'_id': {'$in': list(todo_ids)}})
+        return {doc['_id']: doc async for doc in found}
+
+    @staticmethod
+    async def delete(todo_id):
+        """Delete a todo, returning the deleted document or None if it didn't exist"""
+        deleted = await async_mongo.db.todos.find_one_and_delete({'_id': todo_id})
+        if deleted is not None:
+            await AsyncTodo.add_tombstones([todo_id])
+        return deleted
+
+    @staticmethod
+    async def add_tombstones(todo_ids):
+        """Remember deleted todos so delta sync can report them"""
+        return await async_mongo.db.todo_tombstones.bulk_write(
+            Todo.tombstone_ops(todo_ids), ordered=False
+        )
+
+    @staticmethod
+    async def update(todo_id, updates):
+        """Update a todo, returning the document as it was before, or None if it didn't exist"""
+        return await async_mongo.db.todos.find_one_and_update(
+            {'_id': todo_id},
+            {'$set': dict(updates, updated_at=datetime.utcnow())},
+            return_document=ReturnDocument.BEFORE
+        )
+
+    @staticmethod
+    async def insert_documents(documents):
+        """Insert todo documents with one unordered insert_many; see Todo.insert_documents"""
+        try:
+            await async_mongo.db.todos.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            return {error['index']: error['errmsg'] for error in e.details['writeErrors']}
+        return {}
+
+    @staticmethod
+    async def bulk(operations):
+        """Run write operations as one unordered bulk_write; see Todo.bulk"""
+        try:
+            await async_mongo.db.todos.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            return {error['index']: error['errmsg'] for error in e.details['writeErrors']}
+        return {}
+
+    @staticmethod
+    async def get_changes(since=None, limit=500, lag=5):
+        """Get todos changed and ids deleted since a sync token; see Todo.get_changes"""
+        changes = ChangeSet(since, limit, lag)
+        return changes.result(
+            await async_mongo.db.todos.find(**changes.todo_query()).to_list(),
+            await async_mongo.db.todo_tombstones.find(**changes.tombstone_query()).to_list()
+        )
+
+    @staticmethod
+    async def get_category_counts():
+        """Get {category: number of todos}, including None for uncategorized todos"""
+        groups = await async_mongo.db.todos.aggregate(CATEGORY_COUNTS_PIPELINE)
+        return {group['_id']: group['count'] async for group in groups}
+
+    @staticmethod
+    async def get_stats(bucket=None):
+        """Todo counts by status, category and overdue state, in one round trip"""
+        found = await async_mongo.db.todos.aggregate(Todo.stats_pipeline(bucket))
+        result, = await found.to_list()
+        return Todo.stats_from(result, bucket)
+
+    @staticmethod
+    def get_overdue(batch_size=None, fields=None):
+        """Get all overdue todos ordered by due date"""
+        return async_mongo.db.todos.find(
+            Todo.overdue_query(),
+            Todo.projection(fields),
+            sort=[('due_date', 1), ('_id', 1)],
+            batch_size=batch_size or 0
+        )
+
+    @staticmethod
+    async def get_overdue_page(limit=100, cursor=None, fields=None):
+        """Get one page of overdue todos ordered by due date, plus the next cursor"""
+        return await AsyncTodo._paginate(Todo.overdue_query(), 'due_date', limit, cursor,
+                                         fields=fields)
+
+    @staticmethod
+    async def _paginate(query, sort_field, limit, cursor=None, direction=1, fields=None):
+        found = async_mongo.db.todos.find(**Todo.page_query(
+            query, sort_field, limit, cursor, direction, fields
+        ))
+        return Todo.split_page(await found.to_list(), sort_field, limit, direction)
+
+    @staticmethod
+    async def create_indexes():
+        """Create every index declared in todo_app.models.indexes"""
+        return (await indexes.create_indexes(async_mongo.db.todos) +
+                await indexes.create_indexes(async_mongo.db.todo_tombstones,
+                                             indexes.TOMBSTONE_INDEXES))
@@ -0,0 +1,66 @@
+from pymongo import ASCENDING, TEXT, IndexModel
+
+# Declarative registry of every index on the todos collection. Each entry
+# names the queries it serves; create_indexes() is idempotent, so adding an
+# entry here is all it takes to roll a new index out at the next startup.
+TODO_INDEXES = [
+    # Default listing order and its keyset pagination
+    IndexModel([('created_at', ASCENDING), ('_id', ASCENDING)],
+               name='created_at_id'),
+    # ?category= listings, get_by_category and distinct('category')
+    IndexModel([('category', ASCENDING), ('created_at', ASCENDING), ('_id', ASCENDING)],
+               name='category_created_at_id'),
+    # ?completed= listings
+    IndexModel([('completed', ASCENDING), ('created_at', ASCENDING), ('_id', ASCENDING)],
+               name='completed_created_at_id'),
+    # ?sort=due and due_before/due_after ranges
+    IndexModel([('due_date', ASCENDING), ('_id', ASCENDING)],
+               name='due_date_id'),
+    # get_overdue and the overdue scheduler's load: only open todos are ever
+    # overdue, so completed ones stay out
+    IndexModel([('due_date', ASCENDING)],
+               name='overdue_due_date',
+               partialFilterExpression={'completed': False}),
+    # ?sort=title
+    IndexModel([('title', ASCENDING), ('_id', ASCENDING)],
+               name='title_id'),
+    # ?q= title search
+    IndexModel([('title', TEXT)],
+               name='title_text'),
+    # GET /api/todos/changes
+    IndexModel([('updated_at', ASCENDING), ('_id', ASCENDING)],
+               name='updated_at_id'),
+]
+
+# How long deletions are remembered for delta sync; clients whose sync token
+# is older than this have to do a full sync again
+TOMBSTONE_RETENTION_SECONDS = 30 * 24 * 60 * 60
+
+TOMBSTONE_INDEXES = [
+    # GET /api/todos/changes
+    IndexModel([('deleted_at', ASCENDING), ('_id', ASCENDING)],
+               name='deleted_at_id'),
+    # Expire tombstones once no valid sync token can still need them
+    IndexModel([('deleted_at', ASCENDING)],
+               name='deleted_at_ttl',
+               expireAfterSeconds=TOMBSTONE_RETENTION_SECONDS),
+]
+
+def create_indexes(collection, indexes=TODO_INDEXES):
+    """Create the registered indexes on collection, returning their names"""
+    return collection.create_indexes(indexes)
+
+def collection_scans(explain):
+    """Return the COLLSCAN stages in the winning plan of an explain() result"""
+    planner = explain.get('queryPlanner', explain)
+    scans = []
+    stack = [planner.get('winningPlan', {})]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if node.get('stage') == 'COLLSCAN':
+                scans.append(node)
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+    return scans
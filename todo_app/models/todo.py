@@ -1,5 +1,116 @@
-from datetime import datetime
-from todo_app import mongo
+from datetime import datetime, timedelta
+from bson.objectid import ObjectId
+from pymongo import DeleteOne, InsertOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+from todo_app.storage import storage
+from todo_app.models import indexes
+from todo_app.pagination import (
+    decode_cursor, decode_sync_token, encode_cursor, encode_sync_token, keyset_filter
+)
+
+# Public sort keys accepted by the API, mapped to document fields
+SORT_FIELDS = {
+    'created': 'created_at',
+    'due': 'due_date',
+    'title': 'title',
+}
+
+SORT_ORDERS = {
+    'asc': 1,
+    'desc': -1,
+}
+
+def _isoformat(value):
+    return value.isoformat()
+
+# Public API fields, mapped to the document field each is read from and the
+# conversion applied to non-null values on the way out
+FIELDS = {
+    'id': ('_id', str),
+    'title': ('title', None),
+    'category': ('category', None),
+    'due_date': ('due_date', _isoformat),
+    'completed': ('completed', None),
+    'created_at': ('created_at', _isoformat),
+    'updated_at': ('updated_at', _isoformat),
+}
+
+# {category, count} for every category value, including None
+CATEGORY_COUNTS_PIPELINE = [
+    {'$group': {'_id': '$category', 'count': {'$sum': 1}}}
+]
+
+# Date buckets accepted by GET /api/todos/stats, as $dateToString formats (UTC)
+STATS_BUCKETS = {
+    'day': '%Y-%m-%d',
+    'week': '%G-W%V',
+    'month': '%Y-%m',
+    'year': '%Y',
+}
+
+def _count_by(key, match=None):
+    """Pipeline stages counting documents per key, optionally after a $match"""
+    stages = [{'$match': match}] if match else []
+    return stages + [{'$group': {'_id': key, 'count': {'$sum': 1}}}, {'$sort': {'_id': 1}}]
+
+def _counts(groups):
+    return {group['_id']: group['count'] for group in groups}
+
+# Sorts before every real ObjectId; the starting point of a keyset position
+MIN_OBJECT_ID = ObjectId('0' * 24)
+
+class SyncTokenExpired(Exception):
+    """Raised when a sync token predates the tombstone retention window"""
+
+class ChangeSet:
+    """Keyset positions and queries for one delta-sync request (see Todo.get_changes)"""
+    
+    def __init__(self, since, limit, lag):
+        now = datetime.utcnow()
+        # MongoDB stores milliseconds; truncating keeps same-millisecond writes in range
+        floor_time = now - timedelta(seconds=lag)
+        self.floor = (floor_time.replace(microsecond=floor_time.microsecond // 1000 * 1000),
+                      MIN_OBJECT_ID)
+        self.limit = limit
+        if since:
+            self.updated_after, self.deleted_after = decode_sync_token(since)
+            if self.deleted_after[0] < now - timedelta(seconds=indexes.TOMBSTONE_RETENTION_SECONDS):
+                raise SyncTokenExpired()
+        else:
+            self.updated_after, self.deleted_after = (None, MIN_OBJECT_ID), self.floor
+    
+    def todo_query(self):
+        """find() arguments for the todos changed after the token"""
+        return {
+            'filter': keyset_filter('updated_at', *self.updated_after),
+            'sort': [('updated_at', 1), ('_id', 1)],
+            'limit': self.limit + 1
+        }
+    
+    def tombstone_query(self):
+        """find() arguments for the tombstones written after the token"""
+        return {
+            'filter': keyset_filter('deleted_at', *self.deleted_after),
+            'sort': [('deleted_at', 1), ('_id', 1)],
+            'limit': self.limit + 1
+        }
+    
+    def _advance(self, position, docs, field):
+        if len(docs) == self.limit:
+            return docs[-1][field], docs[-1]['_id']
+        if position[0] is None or position[0] < self.floor[0]:
+            return self.floor
+        return position
+    
+    def result(self, changed, deleted):
+        """(changed documents, deleted ids, next token, has_more) from the two query results"""
+        has_more = len(changed) > self.limit or len(deleted) > self.limit
+        changed, deleted = changed[:self.limit], deleted[:self.limit]
+        next_token = encode_sync_token(
+            self._advance(self.updated_after, changed, 'updated_at'),
+            self._advance(self.deleted_after, deleted, 'deleted_at')
+        )
+        return changed, [doc['_id'] for doc in deleted], next_token, has_more
 
 class Todo:
     def __init__(self, title, category=None, due_date=None, completed=False):
@@ -8,54 +119,372 @@ class Todo:
         self.due_date = due_date
         self.completed = completed
         self.created_at = datetime.utcnow()
+        self.updated_at = self.created_at
     
-    def save(self):
-        return mongo.db.todos.insert_one({
+    def to_document(self):
+        """Document stored in MongoDB for this todo"""
+        return {
             'title': self.title,
             'category': self.category,
             'due_date': self.due_date,
             'completed': self.completed,
-            'created_at': self.created_at
-        })
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
+        }
+    
+    def save(self):
+        return storage.db.todos.insert_one(self.to_document())
+    
+    @staticmethod
+    def parse_fields(value):
+        """Parse a comma-separated sparse fieldset, e.g. 'id,title'"""
+        if not value:
+            return None
+        fields = [name.strip() for name in value.split(',') if name.strip()]
+        for name in fields:
+            if name not in FIELDS:
+                raise ValueError(f'Unknown field: {name}')
+        return fields
+    
+    @staticmethod
+    def projection(fields=None, extra=()):
+        """Mongo projection reading only what a sparse fieldset needs.
+
+        extra names document fields the caller needs besides the output
+        fields, such as the sort key used to build a pagination cursor.
+        """
+        if fields is None:
+            return None
+        projection = {FIELDS[name][0]: 1 for name in fields}
+        projection.update((field, 1) for field in extra)
+        return projection
+    
+    @staticmethod
+    def serializer(fields=None):
+        """Build a function turning a todo document into its JSON representation"""
+        spec = [(name,) + FIELDS[name] for name in (fields or FIELDS)]
+        
+        def serialize(doc):
+            result = {}
+            for name, source, convert in spec:
+                value = doc.get(source)
+                result[name] = convert(value) if convert and value is not None else value
+            return result
+        return serialize
+    
+    @staticmethod
+    def to_dict(doc, fields=None):
+        """JSON representation of a todo document, limited to fields if given"""
+        return Todo.serializer(fields)(doc)
     
     @staticmethod
     def get_all():
         """Get all todos"""
-        return mongo.db.todos.find()
+        return storage.db.todos.find()
     
     @staticmethod
     def get_by_category(category):
-        return mongo.db.todos.find({'category': category})
+        return storage.db.todos.find({'category': category})
+    
+    @staticmethod
+    def build_query(category=None, q=None, completed=None, due_before=None, due_after=None):
+        """Translate listing filters into a single Mongo query.
+
+        Title search uses the text index on title; the remaining filters are
+        plain equality/range predicates that the compound indexes can serve.
+        """
+        query = {}
+        if category:
+            query['category'] = category
+        if q:
+            query['$text'] = {'$search': q}
+        if completed is not None:
+            query['completed'] = completed
+        due_date = {}
+        if due_before is not None:
+            due_date['$lt'] = due_before
+        if due_after is not None:
+            due_date['$gte'] = due_after
+        if due_date:
+            query['due_date'] = due_date
+        return query
+    
+    @staticmethod
+    def find_page(query=None, sort='created', order='asc', limit=100, cursor=None,
+                  fields=None, explain=False):
+        """Get one page of todos matching query, plus the cursor for the next page"""
+        sort_field, direction = Todo.sort_spec(sort, order)
+        return Todo._paginate(query or {}, sort_field, limit, cursor, direction,
+                              fields, explain)
+    
+    @staticmethod
+    def find_cursor(query=None, sort='created', order='asc', batch_size=500, fields=None):
+        """Get a batched cursor over every todo matching query, for streaming"""
+        sort_field, direction = Todo.sort_spec(sort, order)
+        return storage.db.todos.find(
+            query or {},
+            Todo.projection(fields),
+            sort=[(sort_field, direction), ('_id', direction)],
+            batch_size=batch_size
+        )
+    
+    @staticmethod
+    def sort_spec(sort, order):
+        if sort not in SORT_FIELDS:
+            raise ValueError('Invalid sort field')
+        if order not in SORT_ORDERS:
+            raise ValueError('Invalid sort order')
+        return SORT_FIELDS[sort], SORT_ORDERS[order]
     
     @staticmethod
     def get_by_id(todo_id):
-        return mongo.db.todos.find_one({'_id': todo_id})
+        return storage.db.todos.find_one({'_id': todo_id})
+    
+    @staticmethod
+    def get_many(todo_ids):
+        """Get {id: document} for the todo_ids that exist, in one indexed query"""
+        return {doc['_id']: doc for doc in storage.db.todos.find(
+            {'_id': {'$in': list(todo_ids)}}
+        )}
     
     @staticmethod
     def delete(todo_id):
-        return mongo.db.todos.delete_one({'_id': todo_id})
+        """Delete a todo, returning the deleted document or None if it didn't exist"""
+        deleted = storage.db.todos.find_one_and_delete({'_id': todo_id})
+        if deleted is not None:
+            Todo.add_tombstones([todo_id])
+        return deleted
+    
+    @staticmethod
+    def add_tombstones(todo_ids):
+        """Remember deleted todos so delta sync can report them"""
+        return storage.db.todo_tombstones.bulk_write(Todo.tombstone_ops(todo_ids), ordered=False)
+    
+    @staticmethod
+    def tombstone_ops(todo_ids):
+        now = datetime.utcnow()
+        return [UpdateOne({'_id': todo_id}, {'$set': {'deleted_at': now}}, upsert=True)
+                for todo_id in todo_ids]
     
     @staticmethod
     def update(todo_id, updates):
-        return mongo.db.todos.update_one(
+        """Update a todo, returning the document as it was before, or None if it didn't exist"""
+        return storage.db.todos.find_one_and_update(
             {'_id': todo_id},
-            {'$set': updates}
+            {'$set': dict(updates, updated_at=datetime.utcnow())},
+            return_document=ReturnDocument.BEFORE
         )
     
     @staticmethod
-    def get_categories():
+    def insert_many(todos):
+        """Insert several Todo instances in one round trip"""
+        return storage.db.todos.insert_many(
+            [todo.to_document() for todo in todos],
+            ordered=False
+        )
+    
+    @staticmethod
+    def insert_documents(documents):
+        """Insert todo documents with one unordered insert_many.
+
+        Returns a dict mapping the position of each document that failed to
+        its error message, like bulk().
+        """
+        try:
+            storage.db.todos.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            return {error['index']: error['errmsg'] for error in e.details['writeErrors']}
+        return {}
+    
+    @staticmethod
+    def insert_op(document):
+        return InsertOne(document)
+    
+    @staticmethod
+    def update_op(todo_id, updates):
+        return UpdateOne({'_id': todo_id}, {'$set': dict(updates, updated_at=datetime.utcnow())})
+    
+    @staticmethod
+    def delete_op(todo_id):
+        return DeleteOne({'_id': todo_id})
+    
+    @staticmethod
+    def bulk(operations):
+        """Run write operations as one unordered bulk_write.
+
+        Returns a dict mapping the position of each failed operation to its
+        error message; operations not in it succeeded.
+        """
+        try:
+            storage.db.todos.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            return {error['index']: error['errmsg'] for error in e.details['writeErrors']}
+        return {}
+    
+    @staticmethod
+    def get_categories(explain=False):
         """Get list of unique categories"""
-        return mongo.db.todos.distinct('category')
+        if explain:
+            return storage.db.command('explain', {'distinct': 'todos', 'key': 'category'})
+        return storage.db.todos.distinct('category')
+    
+    @staticmethod
+    def get_changes(since=None, limit=500, lag=5):
+        """Get todos changed and ids deleted since a sync token.
+
+        Returns (changed documents, deleted ids, next token, has_more). Without
+        a token every todo is returned, as for a first full sync. Changes and
+        tombstones are read in (timestamp, _id) order, each from its own
+        keyset position in the token. Once a client has caught up, the token
+        is only advanced to lag seconds ago, so writes whose timestamp was
+        taken just before a slower commit are delivered on the next sync
+        rather than skipped; clients must apply changes idempotently.
+        Raises InvalidCursor or SyncTokenExpired for unusable tokens.
+        """
+        changes = ChangeSet(since, limit, lag)
+        return changes.result(
+            list(storage.db.todos.find(**changes.todo_query())),
+            list(storage.db.todo_tombstones.find(**changes.tombstone_query()))
+        )
+    
+    @staticmethod
+    def get_category_counts():
+        """Get {category: number of todos}, including None for uncategorized todos"""
+        return {group['_id']: group['count']
+                for group in storage.db.todos.aggregate(CATEGORY_COUNTS_PIPELINE)}
+    
+    @staticmethod
+    def stats_pipeline(bucket=None):
+        """One aggregation computing every figure of GET /api/todos/stats.
+
+        Each figure is a $facet branch over the same scan, so the server
+        returns a single small document. With bucket (a STATS_BUCKETS key)
+        todos are also counted per period of created_at and of due_date.
+        """
+        if bucket is not None and bucket not in STATS_BUCKETS:
+            raise ValueError('Invalid bucket')
+        facets = {
+            'by_status': _count_by('$completed'),
+            'by_category': _count_by('$category'),
+            'completed_by_category': _count_by('$category', {'completed': True}),
+            'overdue_by_category': _count_by('$category', Todo.overdue_query()),
+        }
+        if bucket is not None:
+            for name, field in (('created', '$created_at'), ('due', '$due_date')):
+                facets[name] = _count_by(
+                    {'$dateToString': {'format': STATS_BUCKETS[bucket], 'date': field}}
+                )
+        return [{'$facet': facets}]
+    
+    @staticmethod
+    def stats_from(result, bucket=None):
+        """API representation of the document stats_pipeline() returns"""
+        status = _counts(result['by_status'])
+        completed = _counts(result['completed_by_category'])
+        overdue = _counts(result['overdue_by_category'])
+        total = sum(status.values())
+        stats = {
+            'total': total,
+            'completed': status.get(True, 0),
+            'open': total - status.get(True, 0),
+            'overdue': sum(overdue.values()),
+            'by_category': [{
+                'name': group['_id'],
+                'count': group['count'],
+                'completed': completed.get(group['_id'], 0),
+                'overdue': overdue.get(group['_id'], 0),
+            } for group in result['by_category']],
+        }
+        if bucket is not None:
+            stats['bucket'] = bucket
+            for name in ('created', 'due'):
+                stats[name] = [{'period': group['_id'], 'count': group['count']}
+                               for group in result[name]]
+        return stats
+    
+    @staticmethod
+    def get_stats(bucket=None):
+        """Todo counts by status, category and overdue state, in one round trip"""
+        result, = storage.db.todos.aggregate(Todo.stats_pipeline(bucket))
+        return Todo.stats_from(result, bucket)
+    
+    @staticmethod
+    def get_overdue(batch_size=None, fields=None):
+        """Get all overdue todos ordered by due date"""
+        return storage.db.todos.find(
+            Todo.overdue_query(),
+            Todo.projection(fields),
+            sort=[('due_date', 1), ('_id', 1)],
+            batch_size=batch_size or 0
+        )
+    
+    @staticmethod
+    def get_overdue_page(limit=100, cursor=None, fields=None, explain=False):
+        """Get one page of overdue todos ordered by due date, plus the next cursor"""
+        return Todo._paginate(Todo.overdue_query(), 'due_date', limit, cursor,
+                              fields=fields, explain=explain)
     
     @staticmethod
-    def get_overdue():
-        """Get all overdue todos"""
-        return mongo.db.todos.find({
+    def get_open_with_due_date():
+        """Get every incomplete todo with a due date, overdue or not, in no particular order"""
+        # The date bound matches only date values, so the partial overdue index serves it
+        return storage.db.todos.find({'completed': False, 'due_date': {'$gte': datetime.min}})
+    
+    @staticmethod
+    def overdue_query():
+        return {
             'due_date': {'$lt': datetime.utcnow()},
             'completed': False
-        })
+        }
+    
+    @staticmethod
+    def _paginate(query, sort_field, limit, cursor=None, direction=1, fields=None,
+                  explain=False):
+        """Keyset pagination over (sort_field, _id).
+
+        Fetches one extra document to find out whether another page exists, so
+        each page costs a single indexed range scan no matter how deep it is.
+        Raises InvalidCursor if the cursor cannot be decoded. With explain=True
+        the query plan is returned instead of the page.
+        """
+        found = storage.db.todos.find(**Todo.page_query(
+            query, sort_field, limit, cursor, direction, fields
+        ))
+        if explain:
+            return found.explain()
+        return Todo.split_page(list(found), sort_field, limit, direction)
+    
+    @staticmethod
+    def page_query(query, sort_field, limit, cursor=None, direction=1, fields=None):
+        """find() arguments for one keyset page, fetching limit + 1 documents"""
+        if cursor:
+            value, last_id = decode_cursor(cursor, sort_field, direction)
+            after = keyset_filter(sort_field, value, last_id, direction)
+            # Keep any $text clause at the top level, where MongoDB requires it
+            query = dict(query, **{'$and': query.get('$and', []) + [after]})
+        return {
+            'filter': query,
+            'projection': Todo.projection(fields, extra=(sort_field,)),
+            'sort': [(sort_field, direction), ('_id', direction)],
+            'limit': limit + 1
+        }
+    
+    @staticmethod
+    def split_page(docs, sort_field, limit, direction=1):
+        """Trim the documents fetched by page_query to a page and its next cursor"""
+        next_cursor = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            next_cursor = encode_cursor(sort_field, docs[-1], direction)
+        return docs, next_cursor
+    
+    @staticmethod
+    def create_indexes():
+        """Create every index declared in todo_app.models.indexes"""
+        return (indexes.create_indexes(storage.db.todos) +
+                indexes.create_indexes(storage.db.todo_tombstones, indexes.TOMBSTONE_INDEXES))
     
     @staticmethod
     def clear_all():
         """Clear all todos (useful for testing)"""
-        return mongo.db.todos.delete_many({}) 
\ No newline at end of file
+        return storage.db.todos.delete_many({}) 
\ No newline at end of file
@@ -0,0 +1,131 @@
+import os
+import threading
+from collections import Counter
+from pymongo import monitoring
+
+def client_options(config, listeners=()):
+    """MongoClient keyword arguments for the MONGO_* pool/driver settings in config.
+
+    Shared by the WSGI app (through Flask-PyMongo) and the ASGI app, so both
+    size and tune their pools the same way. Unset optional settings are left
+    out so the driver's own defaults apply.
+    """
+    options = {
+        'maxPoolSize': config['MONGO_MAX_POOL_SIZE'],
+        'minPoolSize': config['MONGO_MIN_POOL_SIZE'],
+        'waitQueueTimeoutMS': config['MONGO_WAIT_QUEUE_TIMEOUT_MS'],
+        'serverSelectionTimeoutMS': config['MONGO_SERVER_SELECTION_TIMEOUT_MS'],
+        'connectTimeoutMS': config['MONGO_CONNECT_TIMEOUT_MS'],
+        'readPreference': config['MONGO_READ_PREFERENCE'],
+    }
+    if config['MONGO_MAX_IDLE_TIME_MS']:
+        options['maxIdleTimeMS'] = config['MONGO_MAX_IDLE_TIME_MS']
+    if config['MONGO_COMPRESSORS']:
+        # The driver warns about and skips compressors whose library is missing
+        options['compressors'] = config['MONGO_COMPRESSORS']
+    if listeners:
+        options['event_listeners'] = list(listeners)
+    return options
+
+class PoolStats(monitoring.ConnectionPoolListener):
+    """Connection pool listener keeping live counters for the health endpoint.
+
+    One instance belongs to one client, so a worker that builds its own client
+    after fork also starts from fresh counters.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._open = Counter()
+        self._in_use = Counter()
+        self._events = Counter()
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._checkouts = 0
+
+    def _count(self, event, name, open_delta=0, in_use_delta=0):
+        with self._lock:
+            address = '%s:%s' % event.address
+            self._events[name] += 1
+            if open_delta:
+                self._open[address] += open_delta
+            if in_use_delta:
+                self._in_use[address] += in_use_delta
+
+    def pool_created(self, event):
+        self._count(event, 'pools_created')
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._count(event, 'pools_cleared')
+
+    def pool_closed(self, event):
+        self._count(event, 'pools_closed')
+
+    def connection_created(self, event):
+        self._count(event, 'connections_created', open_delta=1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._count(event, 'connections_closed', open_delta=-1)
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        # reason is 'timeout' when the wait queue timed out, 'poolClosed' or 'connectionError'
+        self._count(event, f'checkout_failed_{event.reason}')
+
+    def connection_checked_out(self, event):
+        self._count(event, 'checkouts', in_use_delta=1)
+        # duration (seconds, including any wait for a free connection) needs PyMongo 4.9+
+        waited = getattr(event, 'duration', None)
+        if waited is not None:
+            with self._lock:
+                self._checkouts += 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+
+    def connection_checked_in(self, event):
+        self._count(event, 'checkins', in_use_delta=-1)
+
+    def snapshot(self):
+        """Current pool state per server address plus cumulative event counts"""
+        with self._lock:
+            addresses = sorted(set(self._open) | set(self._in_use))
+            return {
+                'servers': {address: {
+                    'open': self._open[address],
+                    'in_use': self._in_use[address],
+                    'idle': self._open[address] - self._in_use[address],
+                } for address in addresses},
+                'events': dict(self._events),
+                'checkout_wait_ms': {
+                    'mean': self._wait_total / self._checkouts * 1000 if self._checkouts else 0.0,
+                    'max': self._wait_max * 1000,
+                },
+            }
+
+def health_report(ping_seconds, error, backend, pool_stats, config):
+    """(body, status) for /api/health from a ping result and the pool listener"""
+    body = {
+        'status': 'ok' if error is None else 'unavailable',
+        'pid': os.getpid(),
+        'storage': {
+            'backend': backend,
+            'ping_ms': None if error else round(ping_seconds * 1000, 2),
+            'error': error,
+        },
+    }
+    # The in-memory backend has no connections to report
+    if pool_stats is not None:
+        body['pool'] = {
+            'max_size': config['MONGO_MAX_POOL_SIZE'],
+            'min_size': config['MONGO_MIN_POOL_SIZE'],
+            **pool_stats.snapshot(),
+        }
+    return body, 200 if error is None else 503
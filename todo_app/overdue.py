@@ -0,0 +1,237 @@
+"""Materialized set of overdue todos, kept current by a background scheduler.
+
+With OVERDUE_SCHEDULER_ENABLED the process loads every incomplete todo that
+has a due date, in one query, when the app starts. Those already past due go
+into the overdue set, kept sorted by (due_date, _id). The rest go into a
+min-heap keyed by due date. A daemon thread sleeps until the earliest
+deadline, moves every todo whose deadline has passed from the heap to the
+set, and calls the registered reminder hooks for each. Reads promote due
+entries themselves too, so they never depend on the thread having woken on
+time. Due dates are naive UTC, as the routes parse them and PyMongo reads them.
+
+The write routes report each change through record(), as they do for the
+category cache. Writes made by other processes are picked up when the whole
+state is reloaded, every OVERDUE_RELOAD_SECONDS. The set holds documents,
+so memory grows with the number of incomplete dated todos.
+"""
+import heapq
+import logging
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+from todo_app.pagination import decode_cursor, encode_cursor
+
+logger = logging.getLogger(__name__)
+
+def _open_with_due_date(doc):
+    """True if doc is a todo that is, or will become, overdue"""
+    return doc is not None and not doc.get('completed') and isinstance(doc.get('due_date'), datetime)
+
+class OverdueScheduler:
+    def __init__(self, reload_interval=300, max_sleep=60):
+        self.enabled = False
+        self.reload_interval = reload_interval
+        self.max_sleep = max_sleep
+        self._hooks = []
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()  # one reload query at a time
+        self._changes = None  # changes recorded while a reload query runs
+        self._wake = threading.Event()
+        self._thread = None
+        self._due = []  # promoted documents whose hooks haven't run yet
+        self._reset()
+
+    def _reset(self):
+        self._loaded_at = None
+        self._upcoming = {}  # _id -> document due in the future
+        self._heap = []  # (due_date, _id), stale entries skipped when popped
+        self._overdue = {}  # _id -> document past due
+        self._keys = []  # sorted (due_date, _id) of self._overdue
+
+    def init_app(self, app):
+        self.enabled = app.config['OVERDUE_SCHEDULER_ENABLED']
+        self.reload_interval = app.config['OVERDUE_RELOAD_SECONDS']
+        self.invalidate()
+        self.start()
+
+    def start(self):
+        """Load the set and start the scheduler thread, if enabled.
+
+        Done up front rather than on the first read, so hooks fire even if
+        nobody reads the listing.
+        """
+        if self.enabled:
+            try:
+                self._refresh()
+            except Exception:
+                logger.exception('Failed to load overdue todos; retrying on the next read')
+
+    def after_fork(self):
+        """Start over in a forked worker, which inherits the state but not the thread"""
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._due = []
+        self._changes = None
+        self._reset()
+        self.start()
+
+    def on_overdue(self, func):
+        """Register func(doc) to be called, on the scheduler thread, as each todo falls due.
+
+        Usable as a decorator. Todos that were already overdue when the set
+        was loaded are not reported.
+        """
+        self._hooks.append(func)
+        return func
+
+    def page(self, limit, cursor=None):
+        """Overdue todos after cursor in (due_date, _id) order, plus the next cursor"""
+        self._refresh()
+        with self._lock:
+            self._promote()
+            start = 0
+            if cursor:
+                start = bisect_right(self._keys, decode_cursor(cursor, 'due_date'))
+            keys = self._keys[start:start + limit + 1]
+            docs = [self._overdue[todo_id] for _, todo_id in keys]
+        next_cursor = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            next_cursor = encode_cursor('due_date', docs[-1])
+        return docs, next_cursor
+
+    def all(self):
+        """Every overdue todo in (due_date, _id) order"""
+        self._refresh()
+        with self._lock:
+            self._promote()
+            return [self._overdue[todo_id] for _, todo_id in self._keys]
+
+    def record(self, before, after):
+        """Apply one todo change; before/after are documents, None for create/delete"""
+        with self._lock:
+            if self._changes is not None:
+                self._changes.append((before, after))
+            if self._loaded_at is not None:
+                self._apply(before, after)
+        self._wake.set()
+
+    def invalidate(self):
+        """Drop the set so the next read reloads it"""
+        with self._lock:
+            self._reset()
+
+    def _stale(self):
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.reload_interval
+
+    def _refresh(self):
+        """Reload if the state is missing or old, and make sure the thread is running.
+
+        The query runs without the lock, so writes are not held up by it.
+        Changes recorded while it runs are replayed on top of its result.
+        """
+        with self._reload_lock:
+            with self._lock:
+                if not self._stale():
+                    return
+                self._changes = []
+            from todo_app.models.todo import Todo
+            try:
+                docs = list(Todo.get_open_with_due_date())
+            except Exception:
+                with self._lock:
+                    self._changes = None
+                raise
+            with self._lock:
+                changes, self._changes = self._changes, None
+                self._reset()
+                for doc in docs:
+                    self._add(doc)
+                for before, after in changes:
+                    self._apply(before, after)
+                self._loaded_at = time.monotonic()
+                self._start()
+
+    def _apply(self, before, after):
+        if before is not None:
+            self._remove(before['_id'])
+        if _open_with_due_date(after):
+            self._add(after)
+
+    def _add(self, doc):
+        """Track doc, replacing any version of it already tracked"""
+        self._remove(doc['_id'])
+        key = (doc['due_date'], doc['_id'])
+        if doc['due_date'] < datetime.utcnow():
+            self._overdue[doc['_id']] = doc
+            insort(self._keys, key)
+        else:
+            self._upcoming[doc['_id']] = doc
+            heapq.heappush(self._heap, key)
+
+    def _remove(self, todo_id):
+        if self._upcoming.pop(todo_id, None) is not None:
+            return  # its heap entry is skipped as stale when it surfaces
+        doc = self._overdue.pop(todo_id, None)
+        if doc is not None:
+            del self._keys[bisect_left(self._keys, (doc['due_date'], todo_id))]
+
+    def _promote(self):
+        """Move every upcoming todo whose deadline has passed into the overdue set.
+
+        The moved documents are queued for the scheduler thread to run the
+        hooks on, whichever thread promoted them.
+        """
+        now = datetime.utcnow()
+        promoted = []
+        while self._heap and self._heap[0][0] < now:
+            due_date, todo_id = heapq.heappop(self._heap)
+            doc = self._upcoming.get(todo_id)
+            if doc is None or doc['due_date'] != due_date:
+                continue
+            del self._upcoming[todo_id]
+            self._overdue[todo_id] = doc
+            insort(self._keys, (due_date, todo_id))
+            promoted.append(doc)
+        if promoted and self._hooks:
+            self._due.extend(promoted)
+            self._wake.set()
+
+    def _start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='overdue-scheduler',
+                                            daemon=True)
+            self._thread.start()
+
+    def _seconds_until_next(self):
+        with self._lock:
+            if not self._heap:
+                return self.max_sleep
+            wait = (self._heap[0][0] - datetime.utcnow()).total_seconds()
+        return min(max(wait, 0), self.max_sleep)
+
+    def _run(self):
+        while True:
+            self._wake.wait(self._seconds_until_next())
+            self._wake.clear()
+            if self.enabled:
+                # Also reloads on an idle server, to pick up other processes' writes
+                try:
+                    self._refresh()
+                except Exception:
+                    logger.exception('Failed to reload overdue todos')
+            with self._lock:
+                if self._loaded_at is not None:
+                    self._promote()
+                due, self._due = self._due, []
+            for doc in due:
+                for hook in self._hooks:
+                    try:
+                        hook(doc)
+                    except Exception:
+                        logger.exception('Overdue hook %r failed for todo %s', hook, doc['_id'])
+
+overdue_scheduler = OverdueScheduler()
@@ -0,0 +1,108 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from bson.objectid import ObjectId
+from bson.errors import InvalidId
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'t': 'date', 'v': value.isoformat()}
+    return {'t': 'raw', 'v': value}
+
+def _decode_value(encoded):
+    if encoded.get('t') == 'date':
+        value = datetime.fromisoformat(encoded['v'])
+        if value.tzinfo is not None:
+            # Cursors are built from stored, naive UTC values
+            raise ValueError('Cursor dates must be naive UTC')
+        return value
+    return encoded.get('v')
+
+def _dump_token(payload):
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+def _load_token(token):
+    padded = token + '=' * (-len(token) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+
+def encode_cursor(sort_field, doc, direction=1):
+    """Build an opaque cursor pointing just after doc in (sort_field, _id) order"""
+    payload = {
+        'f': sort_field,
+        'd': direction,
+        'i': str(doc['_id']),
+        **_encode_value(doc.get(sort_field)),
+    }
+    return _dump_token(payload)
+
+def decode_cursor(token, sort_field, direction=1):
+    """Decode a cursor into (value, ObjectId), checking it belongs to this ordering"""
+    try:
+        payload = _load_token(token)
+        if payload['f'] != sort_field or payload.get('d', 1) != direction:
+            raise InvalidCursor('Cursor does not match the requested ordering')
+        return _decode_value(payload), ObjectId(payload['i'])
+    except InvalidCursor:
+        raise
+    except (binascii.Error, ValueError, KeyError, TypeError, InvalidId,
+            UnicodeError, AttributeError) as e:
+        raise InvalidCursor('Invalid cursor') from e
+
+def encode_sync_token(updated_after, deleted_after):
+    """Opaque delta-sync token from two (timestamp, ObjectId) keyset positions"""
+    return _dump_token({
+        'u': [_encode_value(updated_after[0]), str(updated_after[1])],
+        'd': [_encode_value(deleted_after[0]), str(deleted_after[1])],
+    })
+
+def decode_sync_token(token):
+    """Decode a sync token into its (updated_after, deleted_after) positions.
+
+    Both positions must be (naive UTC datetime, ObjectId) pairs, as
+    encode_sync_token writes them.
+    """
+    try:
+        payload = _load_token(token)
+        positions = tuple(
+            (_decode_value(payload[key][0]), ObjectId(payload[key][1]))
+            for key in ('u', 'd')
+        )
+    except (binascii.Error, ValueError, KeyError, TypeError, IndexError, InvalidId,
+            UnicodeError, AttributeError) as e:
+        raise InvalidCursor('Invalid sync token') from e
+    for timestamp, _ in positions:
+        if not isinstance(timestamp, datetime):
+            raise InvalidCursor('Invalid sync token')
+    return positions
+
+def keyset_filter(sort_field, value, last_id, direction=1):
+    """Mongo filter matching documents that sort strictly after (value, last_id)
+
+    Documents are ordered by sort_field and then _id, both in the given
+    direction (1 ascending, -1 descending). Missing/null values sort before
+    everything else ascending and after everything else descending, mirroring
+    MongoDB's own ordering.
+    """
+    if direction == 1:
+        if value is None:
+            return {'$or': [
+                {sort_field: None, '_id': {'$gt': last_id}},
+                {sort_field: {'$ne': None}},
+            ]}
+        return {'$or': [
+            {sort_field: {'$gt': value}},
+            {sort_field: value, '_id': {'$gt': last_id}},
+        ]}
+    
+    if value is None:
+        return {sort_field: None, '_id': {'$lt': last_id}}
+    return {'$or': [
+        {sort_field: {'$lt': value}},
+        {sort_field: value, '_id': {'$lt': last_id}},
+        {sort_field: None},
+    ]}
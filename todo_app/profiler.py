@@ -0,0 +1,96 @@
+"""Sampling profiler for slow requests (PROFILE_SLOW_REQUESTS_SECONDS).
+
+While profiling is enabled a daemon thread samples the Python stack of every
+thread that is serving a request, every PROFILE_INTERVAL_MS. When a request
+turns out slower than the threshold its samples are written to
+PROFILE_DIR in the folded format ("frame;frame;frame count" per line) that
+flamegraph.pl, speedscope and inferno read directly; faster requests'
+samples are dropped.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from flask import g, request
+
+def fold(frame):
+    """One folded stack line, outermost frame first"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+class SlowRequestProfiler:
+    def __init__(self, threshold, directory, interval=0.005):
+        self.threshold = threshold
+        self.directory = directory
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._samples = {}  # thread id -> Counter of folded stacks
+        self._busy = threading.Event()
+        self._thread = None
+
+    def init_app(self, app):
+        threshold = app.config['PROFILE_SLOW_REQUESTS_SECONDS']
+        if not threshold:
+            return
+        self.threshold = threshold
+        self.directory = app.config['PROFILE_DIR']
+        self.interval = app.config['PROFILE_INTERVAL_MS'] / 1000
+        app.before_request(self._before)
+        app.teardown_request(self._teardown)
+
+    def _before(self):
+        g.profile_start = time.perf_counter()
+        self.start()
+
+    def _teardown(self, exc):
+        start = g.pop('profile_start', None)
+        if start is not None:
+            self.finish(time.perf_counter() - start, request.endpoint or 'unmatched')
+
+    def start(self):
+        """Start sampling the calling thread"""
+        with self._lock:
+            self._samples[threading.get_ident()] = Counter()
+            self._busy.set()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='slow-request-profiler',
+                                                daemon=True)
+                self._thread.start()
+
+    def finish(self, duration, name):
+        """Stop sampling the calling thread; write its stacks if duration was slow.
+
+        Returns the path written, or None.
+        """
+        with self._lock:
+            samples = self._samples.pop(threading.get_ident(), None)
+            if not self._samples:
+                self._busy.clear()
+        if not samples or duration < self.threshold:
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, '%d-%d-%s-%dms.folded' % (
+            time.time() * 1000, os.getpid(), name.replace('/', '_'), duration * 1000))
+        with open(path, 'w') as f:
+            for stack, count in samples.most_common():
+                f.write(f'{stack} {count}\n')
+        return path
+
+    def _run(self):
+        own = threading.get_ident()
+        while True:
+            self._busy.wait()
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, samples in self._samples.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None and thread_id != own:
+                        samples[fold(frame)] += 1
+
+profiler = SlowRequestProfiler(threshold=0, directory='profiles')
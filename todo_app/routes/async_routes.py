@@ -0,0 +1,385 @@
+"""The todos API as a Quart blueprint, for the ASGI app (todo_app.asgi).
+
+Each route mirrors its namesake in todo_routes and shares its request
+parsing (routes.params), bulk planning, serialization and cache/versioning
+bookkeeping; the database round trips are awaited through AsyncTodo, so a
+worker keeps serving other connections while MongoDB answers.
+"""
+import tempfile
+import time
+from functools import wraps
+from pymongo.errors import PyMongoError
+from quart import Blueprint, Response, current_app, g, jsonify, make_response, request, url_for
+from todo_app import versioning
+from todo_app.async_mongo import async_mongo
+from todo_app.cache import category_cache, stats_cache, todo_cache
+from todo_app.models.async_todo import AsyncTodo
+from todo_app.models.todo import FIELDS, SyncTokenExpired, Todo
+from todo_app.mongo_client import health_report
+from todo_app.pagination import InvalidCursor
+from todo_app.routes.bulk import BulkPlan
+from todo_app.routes.params import (
+    parse_bool_arg, parse_export_format, parse_limit, parse_new_todo, parse_page_args,
+    parse_todo_filters, parse_todo_updates, validate_object_id
+)
+from todo_app.routes.transfer import IMPORT_FORMATS, TodoImport, read_rows, text_stream
+from todo_app.streaming import (
+    JSON_MIMETYPE, NDJSON_MIMETYPE, aiter_csv, aiter_json_array, aiter_ndjson, download,
+    wants_csv, wants_ndjson, wants_stream
+)
+
+# Import bodies larger than this are spooled to a temporary file while parsed
+IMPORT_SPOOL_BYTES = 1024 * 1024
+
+todos = Blueprint('todos', __name__)
+
+def record_change(before, after):
+    """Keep in-process caches current after a write; see todo_routes.record_change"""
+    category_cache.record(before, after)
+    todo_cache.record(before, after)
+    stats_cache.record(before, after)
+    g.setdefault('changed_version_scopes', set()).update(
+        versioning.changed_scopes(before, after)
+    )
+
+@todos.after_request
+async def bump_versions(response):
+    """Publish the listing versions changed by this request's writes"""
+    scopes = g.pop('changed_version_scopes', None)
+    if scopes:
+        try:
+            await async_mongo.db.todo_versions.bulk_write(
+                versioning.bump_operations(scopes), ordered=False
+            )
+        except Exception as e:
+            current_app.logger.error(f"Failed to bump todo versions: {e}")
+    return response
+
+def not_modified_response(etag):
+    response = Response('', 304)
+    response.set_etag(etag, weak=True)
+    response.headers['Vary'] = 'Accept'
+    return response
+
+def versioned(scope_func, window_setting=None):
+    """Async versioning.versioned: answer unchanged listings with 304 before querying"""
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(*args, **kwargs):
+            version, updated_at = versioning.version_from(
+                await async_mongo.db.todo_versions.find_one({'_id': scope_func()})
+            )
+            window = current_app.config[window_setting] if window_setting else None
+            etag = versioning.listing_etag(version, updated_at, wants_ndjson(request), window)
+            last_modified = None if window else updated_at
+            if versioning.is_fresh(request, etag, last_modified):
+                return not_modified_response(etag)
+
+            response = await make_response(await view(*args, **kwargs))
+            if response.status_code == 200:
+                response.set_etag(etag, weak=True)
+                if last_modified is not None:
+                    response.last_modified = last_modified
+                response.vary.add('Accept')
+            return response
+        return wrapper
+    return decorator
+
+def listing_scope():
+    """Version scope of a GET /api/todos response: its category, or the whole collection"""
+    category = request.args.get('category')
+    return versioning.category_scope(category) if category else versioning.COLLECTION_SCOPE
+
+def paginated_response(items, next_cursor):
+    """JSON array response carrying the next page cursor in X-Next-Cursor and Link headers"""
+    response = jsonify(items)
+    if next_cursor:
+        args = request.args.to_dict()
+        args['cursor'] = next_cursor
+        response.headers['X-Next-Cursor'] = next_cursor
+        response.headers['Link'] = f'<{url_for(request.endpoint, **args)}>; rel="next"'
+    return response
+
+def stream_response(docs, serialize):
+    """Stream an async cursor as a JSON array or NDJSON; see streaming.stream_response"""
+    chunk_size = current_app.config['TODOS_STREAM_CHUNK_SIZE']
+    dumps = current_app.json.dumps
+    if wants_ndjson(request):
+        body, mimetype = aiter_ndjson(docs, serialize, dumps, chunk_size), NDJSON_MIMETYPE
+    else:
+        body, mimetype = aiter_json_array(docs, serialize, dumps, chunk_size), JSON_MIMETYPE
+    response = Response(body, mimetype=mimetype)
+    response.headers['Vary'] = 'Accept'
+    return response
+
+@todos.route('/api/todos', methods=['GET'])
+@versioned(listing_scope)
+async def get_todos():
+    """Get todos matching the search/filter parameters, one sorted page at a time"""
+    sort = request.args.get('sort', 'created')
+    order = request.args.get('order', 'asc')
+    try:
+        fields = Todo.parse_fields(request.args.get('fields'))
+        if wants_stream(request):
+            return stream_response(AsyncTodo.find_cursor(
+                parse_todo_filters(request.args), sort, order,
+                batch_size=current_app.config['TODOS_STREAM_BATCH_SIZE'],
+                fields=fields
+            ), Todo.serializer(fields))
+
+        limit, cursor = parse_page_args(request.args, current_app.config)
+        todos_list, next_cursor = await AsyncTodo.find_page(
+            parse_todo_filters(request.args),
+            sort=sort,
+            order=order,
+            limit=limit,
+            cursor=cursor,
+            fields=fields
+        )
+    except InvalidCursor:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    serialize = Todo.serializer(fields)
+    return paginated_response([serialize(todo) for todo in todos_list], next_cursor)
+
+@todos.route('/api/todos', methods=['POST'])
+async def create_todo():
+    try:
+        todo = parse_new_todo(await request.get_json())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    result = await AsyncTodo.save(todo)
+    document = dict(todo.to_document(), _id=result.inserted_id)
+    record_change(None, document)
+
+    return jsonify(Todo.to_dict(document)), 201
+
+@todos.route('/api/todos/<todo_id>', methods=['GET'])
+async def get_todo(todo_id):
+    """Get one todo, from the in-process todo cache when it holds it"""
+    object_id = validate_object_id(todo_id)
+    if not object_id:
+        return jsonify({'error': 'Invalid todo ID format'}), 404
+    try:
+        fields = Todo.parse_fields(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    doc, generation = todo_cache.lookup(object_id)
+    if doc is None:
+        doc = todo_cache.load(object_id, await AsyncTodo.get_by_id(object_id), generation)
+    if doc is None:
+        return jsonify({'error': 'Todo not found'}), 404
+    response = jsonify(Todo.to_dict(doc, fields))
+
+    etag = versioning.content_etag(await response.get_data())
+    if versioning.is_fresh(request, etag):
+        return not_modified_response(etag)
+    response.set_etag(etag, weak=True)
+    return response
+
+@todos.route('/api/todos/<todo_id>', methods=['PUT'])
+async def update_todo(todo_id):
+    data = await request.get_json()
+    if not data:
+        return jsonify({'error': 'No data provided'}), 400
+
+    object_id = validate_object_id(todo_id)
+    if not object_id:
+        return jsonify({'error': 'Invalid todo ID format'}), 404
+
+    try:
+        updates = parse_todo_updates(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if not updates:
+        return jsonify({'error': 'No data provided'}), 400
+
+    previous = await AsyncTodo.update(object_id, updates)
+    if previous is None:
+        return jsonify({'error': 'Todo not found'}), 404
+    record_change(previous, dict(previous, **updates))
+    return jsonify({'message': 'Todo updated successfully'})
+
+@todos.route('/api/todos/bulk', methods=['POST'])
+async def bulk_todos():
+    """Apply a batch of create/update/delete operations; see todo_routes.bulk_todos"""
+    data = await request.get_json(silent=True)
+    operations = data.get('operations') if isinstance(data, dict) else None
+    if not isinstance(operations, list) or not operations:
+        return jsonify({'error': 'Operations are required'}), 400
+    if len(operations) > current_app.config['TODOS_BULK_MAX_OPERATIONS']:
+        return jsonify({'error': 'Too many operations'}), 400
+
+    plan = BulkPlan(operations)
+    existing = await AsyncTodo.get_many(plan.target_ids) if plan.targets else {}
+    errors = await AsyncTodo.bulk(plan.pymongo_operations) if plan.writes else {}
+    results, deleted_ids = plan.finish(existing, errors, record_change)
+    if deleted_ids:
+        await AsyncTodo.add_tombstones(deleted_ids)
+    return jsonify({'results': results})
+
+@todos.route('/api/todos/import', methods=['POST'])
+async def import_todos():
+    """Create todos from an NDJSON or CSV body; see todo_routes.import_todos
+
+    The body is received into a spooled temporary file, so a large import
+    goes to disk rather than memory, then parsed like the WSGI app's.
+    """
+    import_format = IMPORT_FORMATS.get(request.mimetype)
+    if import_format is None:
+        return jsonify({'error': 'Import body must be application/x-ndjson or text/csv'}), 415
+
+    importer = TodoImport(current_app.config['TODOS_IMPORT_BATCH_SIZE'],
+                          current_app.config['TODOS_IMPORT_MAX_ERRORS'])
+    with tempfile.SpooledTemporaryFile(IMPORT_SPOOL_BYTES) as body:
+        async for chunk in request.body:
+            body.write(chunk)
+        body.seek(0)
+        for batch in importer.batches(read_rows(text_stream(body), import_format)):
+            errors = await AsyncTodo.insert_documents([document for _, document in batch])
+            importer.finish(batch, errors, record_change)
+    return jsonify(importer.result())
+
+@todos.route('/api/todos/export', methods=['GET'])
+async def export_todos():
+    """Stream matching todos as a downloadable NDJSON or CSV file; see todo_routes.export_todos"""
+    try:
+        export_format = parse_export_format(request.args,
+                                            'csv' if wants_csv(request) else 'ndjson')
+        fields = Todo.parse_fields(request.args.get('fields'))
+        docs = AsyncTodo.find_cursor(
+            parse_todo_filters(request.args),
+            request.args.get('sort', 'created'),
+            request.args.get('order', 'asc'),
+            batch_size=current_app.config['TODOS_STREAM_BATCH_SIZE'],
+            fields=fields
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    chunk_size = current_app.config['TODOS_STREAM_CHUNK_SIZE']
+    serialize = Todo.serializer(fields)
+    if export_format == 'csv':
+        body = aiter_csv(docs, serialize, fields or list(FIELDS), chunk_size)
+    else:
+        body = aiter_ndjson(docs, serialize, current_app.json.dumps, chunk_size)
+    return download(Response(body), export_format)
+
+@todos.route('/api/todos/changes', methods=['GET'])
+async def get_todo_changes():
+    """Get todos created, updated or deleted since a sync token"""
+    try:
+        limit = parse_limit(request.args, current_app.config, 'SYNC_PAGE_SIZE')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        changed, deleted, next_token, has_more = await AsyncTodo.get_changes(
+            request.args.get('since'), limit, current_app.config['SYNC_LAG_SECONDS']
+        )
+    except InvalidCursor:
+        return jsonify({'error': 'Invalid sync token'}), 400
+    except SyncTokenExpired:
+        return jsonify({'error': 'Sync token expired, a full sync is required'}), 410
+
+    serialize = Todo.serializer()
+    return jsonify({
+        'changes': [serialize(todo) for todo in changed],
+        'deleted': [str(todo_id) for todo_id in deleted],
+        'next': next_token,
+        'has_more': has_more
+    })
+
+@todos.route('/api/categories', methods=['GET'])
+async def get_categories():
+    """Get list of all categories, with todo counts if ?counts=true"""
+    try:
+        with_counts = parse_bool_arg(request.args, 'counts')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    counts, generation = category_cache.lookup()
+    if counts is None:
+        counts = category_cache.load(await AsyncTodo.get_category_counts(), generation)
+    if with_counts:
+        response = jsonify([{'name': name, 'count': counts[name]} for name in sorted(counts)])
+    else:
+        response = jsonify(sorted(counts))
+
+    etag = versioning.content_etag(await response.get_data())
+    if versioning.is_fresh(request, etag):
+        return not_modified_response(etag)
+    response.set_etag(etag, weak=True)
+    return response
+
+@todos.route('/api/todos/stats', methods=['GET'])
+async def get_todo_stats():
+    """Get todo counts by status, category and overdue state; see todo_routes.get_todo_stats"""
+    bucket = request.args.get('bucket') or None
+    stats, generation = stats_cache.lookup(bucket)
+    if stats is None:
+        try:
+            stats = stats_cache.load(bucket, await AsyncTodo.get_stats(bucket), generation)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+    response = jsonify(stats)
+
+    etag = versioning.content_etag(await response.get_data())
+    if versioning.is_fresh(request, etag):
+        return not_modified_response(etag)
+    response.set_etag(etag, weak=True)
+    return response
+
+@todos.route('/api/todos/overdue', methods=['GET'])
+@versioned(lambda: versioning.COLLECTION_SCOPE, window_setting='OVERDUE_ETAG_WINDOW')
+async def get_overdue_todos():
+    """Get overdue todos, one page at a time or streamed like get_todos"""
+    try:
+        fields = Todo.parse_fields(request.args.get('fields'))
+        if wants_stream(request):
+            return stream_response(AsyncTodo.get_overdue(
+                batch_size=current_app.config['TODOS_STREAM_BATCH_SIZE'],
+                fields=fields
+            ), Todo.serializer(fields))
+
+        limit, cursor = parse_page_args(request.args, current_app.config)
+        todos_list, next_cursor = await AsyncTodo.get_overdue_page(limit, cursor, fields=fields)
+    except InvalidCursor:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    serialize = Todo.serializer(fields)
+    return paginated_response([serialize(todo) for todo in todos_list], next_cursor)
+
+@todos.route('/api/todos/<todo_id>', methods=['DELETE'])
+async def delete_todo(todo_id):
+    object_id = validate_object_id(todo_id)
+    if not object_id:
+        return jsonify({'error': 'Invalid todo ID format'}), 404
+
+    deleted = await AsyncTodo.delete(object_id)
+    if deleted is None:
+        return jsonify({'error': 'Todo not found'}), 404
+    record_change(deleted, None)
+    return jsonify({'message': 'Todo deleted successfully'})
+
+@todos.route('/api/health', methods=['GET'])
+async def health():
+    """Report whether storage answers a ping, and this worker's connection pool state"""
+    start = time.perf_counter()
+    error = None
+    try:
+        await async_mongo.db.command('ping')
+    except PyMongoError as e:
+        error = str(e)
+    body, status = health_report(time.perf_counter() - start, error,
+                                 current_app.config['STORAGE_BACKEND'],
+                                 current_app.extensions.get('mongo_pool_stats'),
+                                 current_app.config)
+    body['todo_cache'] = todo_cache.stats()
+    return jsonify(body), status
@@ -0,0 +1,92 @@
+from bson.objectid import ObjectId
+from todo_app.models.todo import Todo
+from todo_app.routes.params import parse_new_todo, parse_todo_updates, validate_object_id
+
+class BulkPlan:
+    """Validated form of a POST /api/todos/bulk payload.
+
+    Parsing happens up front so invalid items get their error result without
+    reaching the database; writes holds the pymongo operations for the rest,
+    and targets the ids whose current documents must be fetched before the
+    write to tell found from not-found and to feed record_change. An id may
+    be targeted only once per batch.
+    """
+
+    def __init__(self, operations):
+        self.operations = operations
+        self.results = [None] * len(operations)
+        self.writes = []  # (result index, pymongo operation)
+        self.created = {}
+        self.targets = {}
+        self.updates = {}
+        for index, operation in enumerate(operations):
+            try:
+                self._add(index, operation)
+            except (ValueError, TypeError, AttributeError) as e:
+                self.results[index] = {'status': 400, 'error': str(e)}
+
+    def _add(self, index, operation):
+        op = operation.get('op') if isinstance(operation, dict) else None
+        if op == 'create':
+            todo = parse_new_todo(operation.get('todo'))
+            document = dict(todo.to_document(), _id=ObjectId())
+            self.created[index] = document
+            self.writes.append((index, Todo.insert_op(document)))
+        elif op in ('update', 'delete'):
+            object_id = validate_object_id(operation.get('id'))
+            if not object_id:
+                self.results[index] = {'status': 404, 'error': 'Invalid todo ID format'}
+                return
+            if object_id in self.targets.values():
+                # Each op is checked against the document as it was before the batch
+                raise ValueError('Todo already targeted by an earlier operation')
+            if op == 'update':
+                updates = parse_todo_updates(operation.get('todo') or {})
+                if not updates:
+                    raise ValueError('No data provided')
+                self.updates[index] = updates
+                self.writes.append((index, Todo.update_op(object_id, updates)))
+            else:
+                self.writes.append((index, Todo.delete_op(object_id)))
+            self.targets[index] = object_id
+        else:
+            raise ValueError('Unknown operation')
+
+    @property
+    def target_ids(self):
+        return set(self.targets.values())
+
+    @property
+    def pymongo_operations(self):
+        return [write for _, write in self.writes]
+
+    def finish(self, existing, errors, record_change):
+        """Fill in the results once the bulk write has run.
+
+        existing maps target ids to their documents as fetched before the
+        write, errors maps failed write positions to messages. Returns
+        (results, ids of the todos that were deleted).
+        """
+        deleted_ids = []
+        for position, (index, _) in enumerate(self.writes):
+            if position in errors:
+                self.results[index] = {'status': 500, 'error': errors[position]}
+            elif index in self.created:
+                record_change(None, self.created[index])
+                self.results[index] = {'status': 201, 'todo': Todo.to_dict(self.created[index])}
+            elif self.targets[index] not in existing:
+                self.results[index] = {'status': 404, 'error': 'Todo not found'}
+            else:
+                before = existing[self.targets[index]]
+                if index in self.updates:
+                    record_change(before, dict(before, **self.updates[index]))
+                else:
+                    deleted_ids.append(self.targets[index])
+                    record_change(before, None)
+                self.results[index] = {'status': 200, 'id': str(self.targets[index])}
+        
+        for index, result in enumerate(self.results):
+            operation = self.operations[index]
+            result['index'] = index
+            result['op'] = operation.get('op') if isinstance(operation, dict) else None
+        return self.results, deleted_ids
@@ -0,0 +1,108 @@
+"""Request parsing shared by the WSGI and ASGI route modules.
+
+Nothing here touches a request context: callers pass in the query args and
+app config, so the same helpers serve the Flask and the Quart blueprints.
+"""
+from bson.objectid import ObjectId
+from bson.errors import InvalidId
+from datetime import datetime, timezone
+from todo_app.models.todo import Todo
+
+def validate_object_id(todo_id):
+    """Validate and convert string ID to ObjectId"""
+    try:
+        return ObjectId(todo_id)
+    except (InvalidId, TypeError):
+        return None
+
+def naive_utc(value):
+    """Convert an aware datetime to naive UTC, the form MongoDB hands back"""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+def parse_due_date(value):
+    """Parse an ISO 8601 due date; None clears it"""
+    if value is None:
+        return None
+    try:
+        return naive_utc(datetime.fromisoformat(value))
+    except (TypeError, ValueError):
+        raise ValueError('Invalid due date format')
+
+def parse_new_todo(data):
+    """Build a Todo from a create payload, raising ValueError if it is invalid"""
+    if not data or 'title' not in data:
+        raise ValueError('Title is required')
+    return Todo(
+        title=data['title'],
+        category=data.get('category'),
+        due_date=parse_due_date(data.get('due_date')),
+        completed=data.get('completed', False)
+    )
+
+def parse_todo_updates(data):
+    """Extract the fields an update payload sets, raising ValueError if it is invalid"""
+    updates = {}
+    if 'title' in data:
+        updates['title'] = data['title']
+    if 'category' in data:
+        updates['category'] = data['category']
+    if 'completed' in data:
+        updates['completed'] = data['completed']
+    if 'due_date' in data:
+        updates['due_date'] = parse_due_date(data['due_date'])
+    return updates
+
+def parse_limit(args, config, default_setting='TODOS_PAGE_SIZE'):
+    """Read the limit query parameter, clamping it to the configured maximum"""
+    limit = args.get('limit', config[default_setting])
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        raise ValueError('Invalid limit')
+    if limit < 1:
+        raise ValueError('Invalid limit')
+    return min(limit, config['TODOS_MAX_PAGE_SIZE'])
+
+def parse_page_args(args, config):
+    """Read limit/cursor query parameters"""
+    return parse_limit(args, config), args.get('cursor')
+
+def parse_bool_arg(args, name):
+    """Read an optional true/false query parameter"""
+    value = args.get(name)
+    if value is None or value == '':
+        return None
+    if value.lower() in ('true', '1', 'yes'):
+        return True
+    if value.lower() in ('false', '0', 'no'):
+        return False
+    raise ValueError(f'Invalid value for {name}')
+
+def parse_date_arg(args, name):
+    """Read an optional ISO 8601 date query parameter"""
+    value = args.get(name)
+    if not value:
+        return None
+    try:
+        return naive_utc(datetime.fromisoformat(value))
+    except ValueError:
+        raise ValueError(f'Invalid date format for {name}')
+
+def parse_export_format(args, default):
+    """Read the format query parameter of an export: 'ndjson' or 'csv'"""
+    value = args.get('format') or default
+    if value not in ('ndjson', 'csv'):
+        raise ValueError('Invalid format')
+    return value
+
+def parse_todo_filters(args):
+    """Build the Mongo query for a todo listing from the request's filter parameters"""
+    return Todo.build_query(
+        category=args.get('category'),
+        q=args.get('q', '').strip(),
+        completed=parse_bool_arg(args, 'completed'),
+        due_before=parse_date_arg(args, 'due_before'),
+        due_after=parse_date_arg(args, 'due_after')
+    )
@@ -1,62 +1,140 @@
-from flask import Blueprint, jsonify, request
-from bson.objectid import ObjectId
-from bson.errors import InvalidId
-from datetime import datetime
-from todo_app.models.todo import Todo
+import time
+from flask import Blueprint, current_app, jsonify, request, url_for
+from pymongo.errors import PyMongoError
+from todo_app import versioning
+from todo_app.cache import category_cache, stats_cache, todo_cache
+from todo_app.metrics import count_serialized, phase
+from todo_app.mongo_client import health_report
+from todo_app.models.todo import FIELDS, SyncTokenExpired, Todo
+from todo_app.overdue import overdue_scheduler
+from todo_app.pagination import InvalidCursor
+from todo_app.routes.bulk import BulkPlan
+from todo_app.storage import storage
+from todo_app.routes.params import (
+    parse_bool_arg, parse_export_format, parse_limit, parse_new_todo, parse_page_args,
+    parse_todo_filters, parse_todo_updates, validate_object_id
+)
+from todo_app.routes.transfer import IMPORT_FORMATS, TodoImport, read_rows, text_stream
+from todo_app.streaming import export_response, stream_response, wants_csv, wants_stream
+from todo_app.write_behind import write_behind
 
 todos = Blueprint('todos', __name__)
 
-def validate_object_id(todo_id):
-    """Validate and convert string ID to ObjectId"""
+def record_change(before, after):
+    """Keep in-process caches current after a write.
+
+    before/after are the todo documents on either side of the change, None
+    for a create (before) or a delete (after).
+    """
+    category_cache.record(before, after)
+    todo_cache.record(before, after)
+    stats_cache.record(before, after)
+    overdue_scheduler.record(before, after)
+    versioning.record_change(before, after)
+
+@todos.after_request
+def bump_versions(response):
+    """Publish the listing versions changed by this request's writes"""
     try:
-        return ObjectId(todo_id)
-    except InvalidId:
-        return None
+        if write_behind.acknowledges_on_enqueue:
+            # The writes may not be stored yet; the queue bumps once they are
+            write_behind.bump_after_flush(versioning.pop_changed())
+        else:
+            versioning.bump_changed()
+    except Exception as e:
+        current_app.logger.error(f"Failed to bump todo versions: {e}")
+    return response
+
+def listing_scope():
+    """Version scope of a GET /api/todos response: its category, or the whole collection"""
+    category = request.args.get('category')
+    return versioning.category_scope(category) if category else versioning.COLLECTION_SCOPE
+
+def paginated_response(docs, serialize, next_cursor):
+    """JSON array of serialized docs, with the next page cursor in X-Next-Cursor and Link headers"""
+    with phase('serialize'):
+        response = jsonify([serialize(doc) for doc in docs])
+    count_serialized(len(docs))
+    if next_cursor:
+        args = request.args.to_dict()
+        args['cursor'] = next_cursor
+        response.headers['X-Next-Cursor'] = next_cursor
+        response.headers['Link'] = f'<{url_for(request.endpoint, **args)}>; rel="next"'
+    return response
 
 @todos.route('/api/todos', methods=['GET'])
+@versioning.versioned(listing_scope)
 def get_todos():
-    category = request.args.get('category')
-    todos_list = Todo.get_by_category(category) if category else Todo.get_all()
+    """Get todos matching the search/filter parameters, one sorted page at a time.
+
+    With ?stream=true or Accept: application/x-ndjson the whole result set is
+    streamed from a batched cursor instead of being paginated.
+    """
+    sort = request.args.get('sort', 'created')
+    order = request.args.get('order', 'asc')
+    try:
+        fields = Todo.parse_fields(request.args.get('fields'))
+        if wants_stream():
+            return stream_response(Todo.find_cursor(
+                parse_todo_filters(request.args), sort, order,
+                batch_size=current_app.config['TODOS_STREAM_BATCH_SIZE'],
+                fields=fields
+            ), Todo.serializer(fields))
+        
+        limit, cursor = parse_page_args(request.args, current_app.config)
+        todos_list, next_cursor = Todo.find_page(
+            parse_todo_filters(request.args),
+            sort=sort,
+            order=order,
+            limit=limit,
+            cursor=cursor,
+            fields=fields
+        )
+    except InvalidCursor:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    return jsonify([{
-        'id': str(todo['_id']),
-        'title': todo['title'],
-        'category': todo['category'],
-        'due_date': todo['due_date'].isoformat() if todo.get('due_date') else None,
-        'completed': todo['completed'],
-        'created_at': todo['created_at'].isoformat()
-    } for todo in todos_list])
+    return paginated_response(todos_list, Todo.serializer(fields), next_cursor)
 
 @todos.route('/api/todos', methods=['POST'])
 def create_todo():
-    data = request.get_json()
-    if not data or 'title' not in data:
-        return jsonify({'error': 'Title is required'}), 400
-    
-    # Parse due_date if provided
-    due_date = None
-    if 'due_date' in data:
-        try:
-            due_date = datetime.fromisoformat(data['due_date'])
-        except ValueError:
-            return jsonify({'error': 'Invalid due date format'}), 400
-    
-    todo = Todo(
-        title=data['title'],
-        category=data.get('category'),
-        due_date=due_date,
-        completed=data.get('completed', False)
-    )
-    result = todo.save()
-    
-    return jsonify({
-        'id': str(result.inserted_id),
-        'title': todo.title,
-        'category': todo.category,
-        'due_date': todo.due_date.isoformat() if todo.due_date else None,
-        'completed': todo.completed,
-        'created_at': todo.created_at.isoformat()
-    }), 201
+    try:
+        todo = parse_new_todo(request.get_json())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if write_behind.enabled:
+        document = write_behind.insert(todo.to_document())
+    else:
+        result = todo.save()
+        document = dict(todo.to_document(), _id=result.inserted_id)
+    record_change(None, document)
+    
+    return jsonify(Todo.to_dict(document)), 201
+
+@todos.route('/api/todos/<todo_id>', methods=['GET'])
+def get_todo(todo_id):
+    """Get one todo, from the in-process todo cache when it holds it"""
+    object_id = validate_object_id(todo_id)
+    if not object_id:
+        return jsonify({'error': 'Invalid todo ID format'}), 404
+    try:
+        fields = Todo.parse_fields(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    doc = todo_cache.get(object_id)
+    if doc is None:
+        return jsonify({'error': 'Todo not found'}), 404
+    response = jsonify(Todo.to_dict(doc, fields))
+    
+    etag = versioning.content_etag(response.get_data())
+    not_modified = versioning.not_modified(etag)
+    if not_modified is not None:
+        return not_modified
+    response.set_etag(etag, weak=True)
+    return response
 
 @todos.route('/api/todos/<todo_id>', methods=['PUT'])
 def update_todo(todo_id):
@@ -68,43 +146,204 @@ def update_todo(todo_id):
     object_id = validate_object_id(todo_id)
     if not object_id:
         return jsonify({'error': 'Invalid todo ID format'}), 404
-        
-    updates = {}
-    if 'title' in data:
-        updates['title'] = data['title']
-    if 'category' in data:
-        updates['category'] = data['category']
-    if 'completed' in data:
-        updates['completed'] = data['completed']
-    if 'due_date' in data:
-        try:
-            updates['due_date'] = datetime.fromisoformat(data['due_date'])
-        except ValueError:
-            return jsonify({'error': 'Invalid due date format'}), 400
-    
-    result = Todo.update(object_id, updates)
-    if result.modified_count:
-        return jsonify({'message': 'Todo updated successfully'})
-    return jsonify({'error': 'Todo not found'}), 404
+    
+    try:
+        updates = parse_todo_updates(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if not updates:
+        return jsonify({'error': 'No data provided'}), 400
+    
+    if write_behind.enabled:
+        previous = write_behind.update(object_id, updates)
+    else:
+        previous = Todo.update(object_id, updates)
+    if previous is None:
+        return jsonify({'error': 'Todo not found'}), 404
+    record_change(previous, dict(previous, **updates))
+    return jsonify({'message': 'Todo updated successfully'})
+
+@todos.route('/api/todos/bulk', methods=['POST'])
+def bulk_todos():
+    """Apply a batch of create/update/delete operations in one unordered bulk write.
+
+    Each operation is {"op": "create", "todo": {...}}, {"op": "update",
+    "id": ..., "todo": {...}} or {"op": "delete", "id": ...}. The response has
+    one result per operation, in request order, with the status code the
+    equivalent single-item request would have returned.
+    """
+    data = request.get_json(silent=True)
+    operations = data.get('operations') if isinstance(data, dict) else None
+    if not isinstance(operations, list) or not operations:
+        return jsonify({'error': 'Operations are required'}), 400
+    if len(operations) > current_app.config['TODOS_BULK_MAX_OPERATIONS']:
+        return jsonify({'error': 'Too many operations'}), 400
+    
+    if write_behind.enabled:
+        # The before-images below are read from storage, so queued writes must land first
+        write_behind.flush()
+    plan = BulkPlan(operations)
+    # Unordered bulk writes only report totals, so fetch the targets up front:
+    # that tells which exist and gives the before-images for record_change
+    existing = Todo.get_many(plan.target_ids) if plan.targets else {}
+    errors = Todo.bulk(plan.pymongo_operations) if plan.writes else {}
+    results, deleted_ids = plan.finish(existing, errors, record_change)
+    if deleted_ids:
+        Todo.add_tombstones(deleted_ids)
+    return jsonify({'results': results})
+
+@todos.route('/api/todos/import', methods=['POST'])
+def import_todos():
+    """Create todos from an NDJSON or CSV body, read and inserted a batch at a time.
+
+    The format follows the Content-Type (application/x-ndjson or text/csv).
+    Invalid rows are skipped and reported by line number; the rest are
+    inserted with one insert_many per TODOS_IMPORT_BATCH_SIZE rows.
+    """
+    import_format = IMPORT_FORMATS.get(request.mimetype)
+    if import_format is None:
+        return jsonify({'error': 'Import body must be application/x-ndjson or text/csv'}), 415
+    
+    importer = TodoImport(current_app.config['TODOS_IMPORT_BATCH_SIZE'],
+                          current_app.config['TODOS_IMPORT_MAX_ERRORS'])
+    rows = read_rows(text_stream(request.stream), import_format)
+    for batch in importer.batches(rows):
+        errors = Todo.insert_documents([document for _, document in batch])
+        importer.finish(batch, errors, record_change)
+    return jsonify(importer.result())
+
+@todos.route('/api/todos/export', methods=['GET'])
+def export_todos():
+    """Stream every todo matching the listing filters as a downloadable file.
+
+    ?format=ndjson|csv picks the format, which otherwise follows the Accept
+    header (NDJSON unless text/csv is preferred). Takes the same filter,
+    sort and fields parameters as get_todos.
+    """
+    try:
+        export_format = parse_export_format(request.args, 'csv' if wants_csv() else 'ndjson')
+        fields = Todo.parse_fields(request.args.get('fields'))
+        docs = Todo.find_cursor(
+            parse_todo_filters(request.args),
+            request.args.get('sort', 'created'),
+            request.args.get('order', 'asc'),
+            batch_size=current_app.config['TODOS_STREAM_BATCH_SIZE'],
+            fields=fields
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return export_response(docs, Todo.serializer(fields), fields or list(FIELDS), export_format)
+
+@todos.route('/api/todos/changes', methods=['GET'])
+def get_todo_changes():
+    """Get todos created, updated or deleted since a sync token.
+
+    Without ?since= every todo is returned. Clients keep the returned "next"
+    token for their following sync and call again straight away while
+    "has_more" is true. A 410 means the token is too old and a full sync is
+    needed.
+    """
+    try:
+        limit = parse_limit(request.args, current_app.config, 'SYNC_PAGE_SIZE')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        changed, deleted, next_token, has_more = Todo.get_changes(
+            request.args.get('since'), limit, current_app.config['SYNC_LAG_SECONDS']
+        )
+    except InvalidCursor:
+        return jsonify({'error': 'Invalid sync token'}), 400
+    except SyncTokenExpired:
+        return jsonify({'error': 'Sync token expired, a full sync is required'}), 410
+    
+    serialize = Todo.serializer()
+    with phase('serialize'):
+        response = jsonify({
+            'changes': [serialize(todo) for todo in changed],
+            'deleted': [str(todo_id) for todo_id in deleted],
+            'next': next_token,
+            'has_more': has_more
+        })
+    count_serialized(len(changed))
+    return response
 
 @todos.route('/api/categories', methods=['GET'])
 def get_categories():
-    """Get list of all categories"""
-    categories = Todo.get_categories()
-    return jsonify(list(filter(None, categories)))  # Filter out None values
+    """Get list of all categories, with todo counts if ?counts=true.
+
+    Served from the in-process category cache rather than the database.
+    """
+    try:
+        with_counts = parse_bool_arg(request.args, 'counts')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if with_counts:
+        counts = category_cache.counts()
+        response = jsonify([{'name': name, 'count': counts[name]} for name in sorted(counts)])
+    else:
+        response = jsonify(category_cache.categories())
+    
+    # The list is small and already in memory, so its own hash is the cheapest validator
+    etag = versioning.content_etag(response.get_data())
+    not_modified = versioning.not_modified(etag)
+    if not_modified is not None:
+        return not_modified
+    response.set_etag(etag, weak=True)
+    return response
+
+@todos.route('/api/todos/stats', methods=['GET'])
+def get_todo_stats():
+    """Get todo counts by status, category and overdue state for dashboards.
+
+    ?bucket=day|week|month|year adds counts per period of creation and due
+    date. Computed by one aggregation and reused for TODO_STATS_TTL seconds.
+    """
+    try:
+        stats = stats_cache.get(request.args.get('bucket') or None)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    response = jsonify(stats)
+    
+    etag = versioning.content_etag(response.get_data())
+    not_modified = versioning.not_modified(etag)
+    if not_modified is not None:
+        return not_modified
+    response.set_etag(etag, weak=True)
+    return response
 
 @todos.route('/api/todos/overdue', methods=['GET'])
+@versioning.versioned(lambda: versioning.COLLECTION_SCOPE, window_setting='OVERDUE_ETAG_WINDOW')
 def get_overdue_todos():
-    """Get all overdue todos"""
-    todos_list = Todo.get_overdue()
-    return jsonify([{
-        'id': str(todo['_id']),
-        'title': todo['title'],
-        'category': todo['category'],
-        'due_date': todo['due_date'].isoformat(),
-        'completed': todo['completed'],
-        'created_at': todo['created_at'].isoformat()
-    } for todo in todos_list])
+    """Get overdue todos, one page at a time or streamed like get_todos.
+
+    With OVERDUE_SCHEDULER_ENABLED both come from the in-process overdue set
+    instead of a query.
+    """
+    try:
+        fields = Todo.parse_fields(request.args.get('fields'))
+        if wants_stream():
+            if overdue_scheduler.enabled:
+                docs = overdue_scheduler.all()
+            else:
+                docs = Todo.get_overdue(
+                    batch_size=current_app.config['TODOS_STREAM_BATCH_SIZE'],
+                    fields=fields
+                )
+            return stream_response(docs, Todo.serializer(fields))
+        
+        limit, cursor = parse_page_args(request.args, current_app.config)
+        if overdue_scheduler.enabled:
+            todos_list, next_cursor = overdue_scheduler.page(limit, cursor)
+        else:
+            todos_list, next_cursor = Todo.get_overdue_page(limit, cursor, fields=fields)
+    except InvalidCursor:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return paginated_response(todos_list, Todo.serializer(fields), next_cursor)
 
 @todos.route('/api/todos/<todo_id>', methods=['DELETE'])
 def delete_todo(todo_id):
@@ -113,7 +352,26 @@ def delete_todo(todo_id):
     if not object_id:
         return jsonify({'error': 'Invalid todo ID format'}), 404
         
-    result = Todo.delete(object_id)
-    if result.deleted_count:
-        return jsonify({'message': 'Todo deleted successfully'})
-    return jsonify({'error': 'Todo not found'}), 404 
\ No newline at end of file
+    if write_behind.enabled:
+        deleted = write_behind.delete(object_id)
+    else:
+        deleted = Todo.delete(object_id)
+    if deleted is None:
+        return jsonify({'error': 'Todo not found'}), 404
+    record_change(deleted, None)
+    return jsonify({'message': 'Todo deleted successfully'}) 
+
+@todos.route('/api/health', methods=['GET'])
+def health():
+    """Report whether storage answers a ping, and this worker's connection pool state"""
+    start = time.perf_counter()
+    error = None
+    try:
+        storage.ping()
+    except PyMongoError as e:
+        error = str(e)
+    body, status = health_report(time.perf_counter() - start, error, storage.backend,
+                                 current_app.extensions.get('mongo_pool_stats'),
+                                 current_app.config)
+    body['todo_cache'] = todo_cache.stats()
+    return jsonify(body), status
@@ -0,0 +1,126 @@
+"""Row parsing for POST /api/todos/import, shared by the WSGI and ASGI routes.
+
+The body is read as a text stream one line (NDJSON) or record (CSV) at a
+time, and valid rows are handed out in batches for insert_many, so memory
+use depends on the batch size, not on the size of the file. A row that
+cannot be parsed or validated is recorded as an error against its line
+number and the import carries on with the next one.
+"""
+import csv
+import io
+import json
+from bson.objectid import ObjectId
+from todo_app.routes.params import parse_new_todo
+from todo_app.streaming import CSV_MIMETYPE, NDJSON_MIMETYPE
+
+IMPORT_FORMATS = {
+    NDJSON_MIMETYPE: 'ndjson',
+    CSV_MIMETYPE: 'csv',
+}
+
+# Columns read from an imported CSV file; any others (such as an export's id
+# and timestamps) are ignored
+CSV_IMPORT_COLUMNS = ('title', 'category', 'due_date', 'completed')
+
+CSV_BOOLEANS = {
+    'true': True, '1': True, 'yes': True,
+    'false': False, '0': False, 'no': False,
+}
+
+def text_stream(binary):
+    """Decode a binary request body as UTF-8 text, lazily; bad bytes become U+FFFD"""
+    return io.TextIOWrapper(binary, encoding='utf-8', errors='replace', newline='')
+
+def ndjson_rows(lines):
+    """Yield (line number, row dict or ValueError) for each non-blank line"""
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield number, ValueError('Invalid JSON')
+            continue
+        if not isinstance(row, dict):
+            yield number, ValueError('Row must be a JSON object')
+            continue
+        yield number, row
+
+def csv_rows(lines):
+    """Yield (line number, row dict or ValueError) for each CSV record after the header.
+
+    Empty cells count as absent, and completed is read as true/false, 1/0 or yes/no.
+    """
+    reader = csv.DictReader(lines)
+    while True:
+        try:
+            record = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            yield reader.line_num, ValueError(str(e))
+            continue
+        row = {name: record[name] for name in CSV_IMPORT_COLUMNS if record.get(name)}
+        if 'completed' in row:
+            completed = CSV_BOOLEANS.get(row['completed'].strip().lower())
+            if completed is None:
+                yield reader.line_num, ValueError('Invalid value for completed')
+                continue
+            row['completed'] = completed
+        yield reader.line_num, row
+
+def read_rows(lines, import_format):
+    """Parse text lines in an IMPORT_FORMATS format"""
+    if import_format == 'csv':
+        return csv_rows(lines)
+    return ndjson_rows(lines)
+
+class TodoImport:
+    """Running totals of one import, and the batching of its valid rows.
+
+    batches() turns parsed rows into lists of (line number, document); once
+    a batch is written, finish() is given the positions that failed. Only
+    the first max_errors errors are kept for the response; failed counts
+    them all.
+    """
+
+    def __init__(self, batch_size=1000, max_errors=100):
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+
+    def batches(self, rows):
+        batch = []
+        for line, row in rows:
+            try:
+                if isinstance(row, Exception):
+                    raise row
+                document = dict(parse_new_todo(row).to_document(), _id=ObjectId())
+            except (ValueError, TypeError) as e:
+                self.fail(line, str(e))
+                continue
+            batch.append((line, document))
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def finish(self, batch, errors, record_change):
+        """Count a written batch; errors maps failed positions in it to messages"""
+        for position, (line, document) in enumerate(batch):
+            if position in errors:
+                self.fail(line, errors[position])
+            else:
+                self.imported += 1
+                record_change(None, document)
+
+    def fail(self, line, message):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'line': line, 'error': message})
+
+    def result(self):
+        return {'imported': self.imported, 'failed': self.failed, 'errors': self.errors}
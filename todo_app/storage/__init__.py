@@ -0,0 +1,42 @@
+"""Where Todo and the listing versions keep their collections.
+
+STORAGE_BACKEND selects the backend: 'mongo' (the default) is MongoDB
+through Flask-PyMongo; 'memory' is the in-process engine in
+storage.memory, which answers the same queries without a network hop. It
+suits tests and single-process deployments whose data need not outlive the
+process; every worker process would have its own separate store.
+"""
+from todo_app.storage.memory import MemoryDatabase
+
+BACKENDS = ('mongo', 'memory')
+
+class Storage:
+    def __init__(self):
+        self.backend = 'mongo'
+        self.memory = None
+
+    def init_app(self, app):
+        backend = app.config['STORAGE_BACKEND']
+        if backend not in BACKENDS:
+            raise ValueError(f'Unknown STORAGE_BACKEND: {backend}')
+        self.backend = backend
+        self.memory = MemoryDatabase() if backend == 'memory' else None
+
+    @property
+    def db(self):
+        """The pymongo Database, or MemoryDatabase, holding the app's collections"""
+        if self.memory is not None:
+            return self.memory
+        from todo_app import mongo
+        return mongo.db
+
+    def ping(self):
+        return self.db.command('ping')
+
+    def close(self):
+        """Release the MongoDB client, if this backend has one"""
+        if self.backend == 'mongo':
+            from todo_app import mongo
+            mongo.cx.close()
+
+storage = Storage()
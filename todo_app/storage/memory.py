@@ -0,0 +1,629 @@
+"""In-process storage engine implementing the part of PyMongo's API the app uses.
+
+MemoryDatabase hands out MemoryCollections by attribute, like a pymongo
+Database. A collection keeps its documents in a dict keyed by _id, plus a
+hash index on the leading field of every index declared through
+create_indexes(), so id lookups and equality filters such as category or
+completed read only the matching documents. Range filters and sorts run
+over the candidates in Python, which suits the single-process, modest-sized
+deployments this engine is meant for; the data lives as long as the process.
+
+Query semantics follow MongoDB for the operators the app issues: equality
+(None also matching a missing field), $ne, $in, $nin, $lt/$lte/$gt/$gte
+within one BSON type, $exists, $and/$or/$nor and $text (whole-word matching
+without stemming) over the text-indexed fields. Sorting uses BSON type
+order. Datetimes in documents and query operands are converted to naive UTC
+and truncated to milliseconds, as BSON does.
+Aggregations support $match, $group ($sum, $min, $max; keys may use
+$dateToString), $sort, $limit and $facet.
+"""
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from bson.objectid import ObjectId
+from pymongo import DeleteMany, DeleteOne, InsertOne, ReplaceOne, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from pymongo.results import (
+    BulkWriteResult, DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+)
+
+MISSING = object()
+
+# How often expired documents are purged from collections with a TTL index,
+# matching MongoDB's TTL monitor
+TTL_INTERVAL = 60
+
+def _rank(value):
+    """Position of value's type in BSON comparison order"""
+    if value is MISSING or value is None:
+        return 1
+    if isinstance(value, bool):
+        return 8
+    if isinstance(value, (int, float)):
+        return 2
+    if isinstance(value, str):
+        return 3
+    if isinstance(value, dict):
+        return 4
+    if isinstance(value, (list, tuple)):
+        return 5
+    if isinstance(value, bytes):
+        return 6
+    if isinstance(value, ObjectId):
+        return 7
+    if isinstance(value, datetime):
+        return 9
+    return 10
+
+def sort_key(value):
+    rank = _rank(value)
+    return (rank, 0) if rank == 1 else (rank, value)
+
+def _equal(value, expected):
+    if expected is None:
+        return value is MISSING or value is None
+    return _rank(value) == _rank(expected) and value == expected
+
+def _compare(test):
+    def operator(value, arg):
+        return value is not MISSING and _rank(value) == _rank(arg) and test(value, arg)
+    return operator
+
+OPERATORS = {
+    '$eq': _equal,
+    '$ne': lambda value, arg: not _equal(value, arg),
+    '$in': lambda value, arg: any(_equal(value, item) for item in arg),
+    '$nin': lambda value, arg: not any(_equal(value, item) for item in arg),
+    '$lt': _compare(lambda a, b: a < b),
+    '$lte': _compare(lambda a, b: a <= b),
+    '$gt': _compare(lambda a, b: a > b),
+    '$gte': _compare(lambda a, b: a >= b),
+    '$exists': lambda value, arg: (value is not MISSING) == bool(arg),
+}
+
+def _is_operator_dict(condition):
+    return isinstance(condition, dict) and condition and all(
+        key.startswith('$') for key in condition
+    )
+
+def _words(text):
+    return set(re.findall(r'\w+', text.lower()))
+
+def text_matches(doc, search, fields):
+    """$text semantics: any search term as a whole word, and no -negated term"""
+    words = set()
+    for field in fields:
+        value = doc.get(field)
+        if isinstance(value, str):
+            words |= _words(value)
+    terms = search.split()
+    wanted = set().union(*(_words(term) for term in terms if not term.startswith('-')))
+    unwanted = set().union(*(_words(term[1:]) for term in terms if term.startswith('-')))
+    return bool(words & wanted) and not words & unwanted
+
+def matches(doc, query, text_fields=()):
+    """True if doc satisfies the MongoDB query filter"""
+    for key, condition in query.items():
+        if key == '$and':
+            if not all(matches(doc, part, text_fields) for part in condition):
+                return False
+        elif key == '$or':
+            if not any(matches(doc, part, text_fields) for part in condition):
+                return False
+        elif key == '$nor':
+            if any(matches(doc, part, text_fields) for part in condition):
+                return False
+        elif key == '$text':
+            if not text_fields:
+                raise OperationFailure('text index required for $text query', 27)
+            if not text_matches(doc, condition['$search'], text_fields):
+                return False
+        else:
+            value = doc.get(key, MISSING)
+            if _is_operator_dict(condition):
+                for operator, arg in condition.items():
+                    if operator not in OPERATORS:
+                        raise OperationFailure(f'unknown operator: {operator}', 2)
+                    if not OPERATORS[operator](value, arg):
+                        return False
+            elif not _equal(value, condition):
+                return False
+    return True
+
+def sort_documents(docs, sort):
+    """Sort docs in place by a [(field, direction), ...] spec"""
+    for field, direction in reversed(sort):
+        docs.sort(key=lambda doc: sort_key(doc.get(field, MISSING)), reverse=direction == -1)
+    return docs
+
+def project(doc, projection):
+    if not projection:
+        return dict(doc)
+    if isinstance(projection, (list, tuple)):
+        projection = {field: 1 for field in projection}
+    included = [field for field, flag in projection.items() if flag and field != '_id']
+    if included:
+        result = {field: doc[field] for field in included if field in doc}
+        if projection.get('_id', 1) and '_id' in doc:
+            result['_id'] = doc['_id']
+        return result
+    return {field: value for field, value in doc.items() if projection.get(field, 1)}
+
+def _to_storage(value):
+    """value as BSON would round-trip it: datetimes in naive UTC, to the millisecond"""
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.replace(microsecond=value.microsecond // 1000 * 1000)
+    if isinstance(value, dict):
+        return {key: _to_storage(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_storage(item) for item in value]
+    return value
+
+def apply_update(doc, update):
+    """Return a copy of doc with a MongoDB update ($set/$unset/$inc or replacement) applied"""
+    if not any(key.startswith('$') for key in update):
+        return dict(update, _id=doc['_id'])
+    result = dict(doc)
+    for operator, fields in update.items():
+        if operator == '$set':
+            result.update(fields)
+        elif operator == '$unset':
+            for field in fields:
+                result.pop(field, None)
+        elif operator == '$inc':
+            for field, amount in fields.items():
+                result[field] = result.get(field, 0) + amount
+        elif operator == '$setOnInsert':
+            continue
+        else:
+            raise OperationFailure(f'unknown update operator: {operator}', 9)
+    return result
+
+def _upsert_document(query, update):
+    base = {key: value for key, value in query.items()
+            if not key.startswith('$') and not _is_operator_dict(value)}
+    base.setdefault('_id', ObjectId())
+    doc = apply_update(base, update)
+    if any(key.startswith('$') for key in update):
+        doc.update(update.get('$setOnInsert', {}))
+    return doc
+
+class MemoryCursor:
+    """Iterator over a query result, computed when the query ran"""
+
+    def __init__(self, docs, plan):
+        self._docs = iter(docs)
+        self._plan = plan
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._docs)
+
+    def next(self):
+        return next(self._docs)
+
+    def close(self):
+        self._docs = iter(())
+
+    def explain(self):
+        return {'queryPlanner': {'winningPlan': self._plan}}
+
+class MemoryCollection:
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.RLock()
+        self._docs = {}
+        self._indexes = {'_id_': {'key': [('_id', 1)]}}
+        self._hashed = {}  # field -> {value: set of _ids}
+        self._text_fields = []
+        self._ttl = None  # (field, seconds)
+        self._next_expiry = 0.0
+
+    # Storage and indexes
+
+    def _index_key(self, doc, field):
+        value = doc.get(field)
+        return value if _rank(value) not in (4, 5) else repr(value)
+
+    def _add(self, doc):
+        if doc['_id'] in self._docs:
+            raise DuplicateKeyError(
+                f'E11000 duplicate key error collection: {self.name} index: _id_ '
+                f'dup key: {{ _id: {doc["_id"]!r} }}', 11000
+            )
+        self._docs[doc['_id']] = doc
+        for field, index in self._hashed.items():
+            index.setdefault(self._index_key(doc, field), set()).add(doc['_id'])
+
+    def _remove(self, doc):
+        del self._docs[doc['_id']]
+        for field, index in self._hashed.items():
+            ids = index.get(self._index_key(doc, field))
+            if ids is not None:
+                ids.discard(doc['_id'])
+                if not ids:
+                    del index[self._index_key(doc, field)]
+
+    def _replace(self, old, new):
+        self._remove(old)
+        self._add(new)
+
+    def _candidates(self, query):
+        """(documents that may match, plan stage) using the _id and hash indexes"""
+        best, plan = None, {'stage': 'COLLSCAN'}
+        for field, condition in query.items():
+            if field == '$and':
+                for part in condition:
+                    ids, part_plan = self._candidate_ids(part)
+                    if ids is not None and (best is None or len(ids) < len(best)):
+                        best, plan = ids, part_plan
+                continue
+            ids, field_plan = self._candidate_ids({field: condition})
+            if ids is not None and (best is None or len(ids) < len(best)):
+                best, plan = ids, field_plan
+        if best is None:
+            return list(self._docs.values()), plan
+        return [self._docs[_id] for _id in best if _id in self._docs], plan
+
+    def _candidate_ids(self, query):
+        if len(query) != 1:
+            return None, None
+        (field, condition), = query.items()
+        if field != '_id' and field not in self._hashed:
+            return None, None
+        if _is_operator_dict(condition):
+            if list(condition) != ['$in']:
+                return None, None
+            values = condition['$in']
+        elif isinstance(condition, dict):
+            return None, None
+        else:
+            values = [condition]
+        plan = {'stage': 'FETCH', 'inputStage': {'stage': 'IXSCAN', 'keyPattern': {field: 1}}}
+        if field == '_id':
+            return {value for value in values if value in self._docs}, plan
+        index = self._hashed[field]
+        ids = set()
+        for value in values:
+            ids |= index.get(self._index_key({field: value}, field), set())
+        return ids, plan
+
+    def _expire(self):
+        if self._ttl is None or time.monotonic() < self._next_expiry:
+            return
+        self._next_expiry = time.monotonic() + TTL_INTERVAL
+        field, seconds = self._ttl
+        cutoff = datetime.utcnow().timestamp() - seconds
+        for doc in list(self._docs.values()):
+            value = doc.get(field)
+            if isinstance(value, datetime) and value.timestamp() < cutoff:
+                self._remove(doc)
+
+    def _find_docs(self, query, sort=None, skip=0, limit=0):
+        if query and '$text' in query and not self._text_fields:
+            raise OperationFailure('text index required for $text query', 27)
+        self._expire()
+        # Query operands are BSON-encoded too, so compare them the way they are stored
+        query = _to_storage(query or {})
+        candidates, plan = self._candidates(query)
+        docs = [doc for doc in candidates if matches(doc, query, self._text_fields)]
+        if sort:
+            sort_documents(docs, list(sort))
+            plan = {'stage': 'SORT', 'inputStage': plan}
+        if skip:
+            docs = docs[skip:]
+        if limit:
+            docs = docs[:abs(limit)]
+        return docs, plan
+
+    def create_indexes(self, indexes):
+        names = []
+        with self._lock:
+            for model in indexes:
+                document = model.document
+                keys = list(document['key'].items())
+                name = document.get('name') or '_'.join(f'{k}_{v}' for k, v in keys)
+                self._indexes[name] = dict(document, key=keys)
+                field, kind = keys[0]
+                if kind == 'text':
+                    self._text_fields = sorted(set(self._text_fields) | {
+                        key for key, value in keys if value == 'text'
+                    })
+                elif field != '_id' and field not in self._hashed:
+                    index = self._hashed[field] = {}
+                    for doc in self._docs.values():
+                        index.setdefault(self._index_key(doc, field), set()).add(doc['_id'])
+                if 'expireAfterSeconds' in document:
+                    self._ttl = (field, document['expireAfterSeconds'])
+                names.append(name)
+        return names
+
+    def index_information(self):
+        with self._lock:
+            return {name: dict(info) for name, info in self._indexes.items()}
+
+    # Reads
+
+    def find(self, filter=None, projection=None, skip=0, limit=0, sort=None, batch_size=0,
+             **kwargs):
+        with self._lock:
+            docs, plan = self._find_docs(filter, sort, skip, limit)
+            return MemoryCursor([project(doc, projection) for doc in docs], plan)
+
+    def find_one(self, filter=None, projection=None, sort=None, **kwargs):
+        if filter is not None and not isinstance(filter, dict):
+            filter = {'_id': filter}
+        return next(self.find(filter, projection, sort=sort, limit=1), None)
+
+    def count_documents(self, filter, **kwargs):
+        with self._lock:
+            return len(self._find_docs(filter)[0])
+
+    def distinct(self, key, filter=None, **kwargs):
+        with self._lock:
+            docs, _ = self._find_docs(filter)
+            values = {}
+            for doc in docs:
+                value = doc.get(key, MISSING)
+                if value is not MISSING:
+                    values.setdefault((_rank(value), repr(value)), value)
+            return sorted(values.values(), key=sort_key)
+
+    def aggregate(self, pipeline, **kwargs):
+        with self._lock:
+            docs = [dict(doc) for doc in self._find_docs({})[0]]
+        return MemoryCursor(self._run_pipeline(docs, pipeline), {'stage': 'COLLSCAN'})
+
+    def _run_pipeline(self, docs, pipeline):
+        for stage in pipeline:
+            (operator, spec), = stage.items()
+            if operator == '$match':
+                docs = [doc for doc in docs if matches(doc, _to_storage(spec), self._text_fields)]
+            elif operator == '$group':
+                docs = _group(docs, spec)
+            elif operator == '$sort':
+                docs = sort_documents(docs, list(spec.items()))
+            elif operator == '$limit':
+                docs = docs[:spec]
+            elif operator == '$facet':
+                docs = [{name: self._run_pipeline(docs, stages) for name, stages in spec.items()}]
+            else:
+                raise OperationFailure(f'Unsupported pipeline stage: {operator}', 40324)
+        return docs
+
+    # Writes
+
+    def insert_one(self, document, **kwargs):
+        document.setdefault('_id', ObjectId())
+        with self._lock:
+            self._add(_to_storage(document))
+        return InsertOneResult(document['_id'], True)
+
+    def insert_many(self, documents, ordered=True, **kwargs):
+        documents = list(documents)
+        result = self.bulk_write([InsertOne(doc) for doc in documents], ordered=ordered)
+        return InsertManyResult([doc['_id'] for doc in documents][:result.inserted_count], True)
+
+    def _update(self, filter, update, upsert=False, multi=False):
+        docs, _ = self._find_docs(filter, limit=0 if multi else 1)
+        for doc in docs:
+            self._replace(doc, _to_storage(apply_update(doc, update)))
+        if docs or not upsert:
+            return {'n': len(docs), 'nModified': len(docs), 'upserted': None}
+        doc = _to_storage(_upsert_document(filter, update))
+        self._add(doc)
+        return {'n': 1, 'nModified': 0, 'upserted': doc['_id']}
+
+    def update_one(self, filter, update, upsert=False, **kwargs):
+        with self._lock:
+            return UpdateResult(self._update(filter, update, upsert), True)
+
+    def update_many(self, filter, update, upsert=False, **kwargs):
+        with self._lock:
+            return UpdateResult(self._update(filter, update, upsert, multi=True), True)
+
+    def replace_one(self, filter, replacement, upsert=False, **kwargs):
+        with self._lock:
+            return UpdateResult(self._update(filter, replacement, upsert), True)
+
+    def _delete(self, filter, multi=False):
+        docs, _ = self._find_docs(filter, limit=0 if multi else 1)
+        for doc in docs:
+            self._remove(doc)
+        return len(docs)
+
+    def delete_one(self, filter, **kwargs):
+        with self._lock:
+            return DeleteResult({'n': self._delete(filter)}, True)
+
+    def delete_many(self, filter, **kwargs):
+        with self._lock:
+            return DeleteResult({'n': self._delete(filter, multi=True)}, True)
+
+    def find_one_and_delete(self, filter, projection=None, sort=None, **kwargs):
+        with self._lock:
+            docs, _ = self._find_docs(filter, sort, limit=1)
+            if not docs:
+                return None
+            self._remove(docs[0])
+            return project(docs[0], projection)
+
+    def find_one_and_update(self, filter, update, projection=None, sort=None, upsert=False,
+                            return_document=False, **kwargs):
+        with self._lock:
+            docs, _ = self._find_docs(filter, sort, limit=1)
+            if docs:
+                before = docs[0]
+                after = _to_storage(apply_update(before, update))
+                self._replace(before, after)
+            elif upsert:
+                before, after = None, _to_storage(_upsert_document(filter, update))
+                self._add(after)
+            else:
+                return None
+            result = after if return_document else before
+            return project(result, projection) if result is not None else None
+
+    def bulk_write(self, requests, ordered=True, **kwargs):
+        counts = {'nInserted': 0, 'nMatched': 0, 'nModified': 0, 'nRemoved': 0,
+                  'nUpserted': 0, 'upserted': [], 'writeErrors': [], 'writeConcernErrors': []}
+        with self._lock:
+            for index, request in enumerate(requests):
+                try:
+                    self._bulk_one(request, index, counts)
+                except (DuplicateKeyError, OperationFailure) as e:
+                    counts['writeErrors'].append({
+                        'index': index, 'code': e.code, 'errmsg': str(e), 'op': request
+                    })
+                    if ordered:
+                        break
+        if counts['writeErrors']:
+            raise BulkWriteError(counts)
+        return BulkWriteResult(counts, True)
+
+    def _bulk_one(self, request, index, counts):
+        if isinstance(request, InsertOne):
+            request._doc.setdefault('_id', ObjectId())
+            self._add(_to_storage(request._doc))
+            counts['nInserted'] += 1
+        elif isinstance(request, (UpdateOne, UpdateMany, ReplaceOne)):
+            result = self._update(request._filter, request._doc, request._upsert,
+                                  multi=isinstance(request, UpdateMany))
+            if result['upserted'] is not None:
+                counts['nUpserted'] += 1
+                counts['upserted'].append({'index': index, '_id': result['upserted']})
+            else:
+                counts['nMatched'] += result['n']
+                counts['nModified'] += result['nModified']
+        elif isinstance(request, (DeleteOne, DeleteMany)):
+            counts['nRemoved'] += self._delete(request._filter,
+                                               multi=isinstance(request, DeleteMany))
+        else:
+            raise TypeError(f'{request!r} is not a valid request')
+
+def _group_value(doc, expression):
+    if isinstance(expression, str) and expression.startswith('$'):
+        return doc.get(expression[1:])
+    if _is_operator_dict(expression) and '$dateToString' in expression:
+        spec = expression['$dateToString']
+        date = _group_value(doc, spec['date'])
+        # MongoDB's format specifiers (%Y, %m, %d, %G, %V, ...) are strftime's
+        return date.strftime(spec['format']) if isinstance(date, datetime) else None
+    return expression
+
+def _group(docs, spec):
+    groups = {}
+    for doc in docs:
+        key = _group_value(doc, spec['_id'])
+        group = groups.setdefault((_rank(key), repr(key)), {'_id': key})
+        for field, accumulator in spec.items():
+            if field == '_id':
+                continue
+            (operator, expression), = accumulator.items()
+            value = _group_value(doc, expression)
+            if operator == '$sum':
+                group[field] = group.get(field, 0) + (value if isinstance(value, (int, float)) else 0)
+            elif operator in ('$min', '$max'):
+                if value is None:
+                    continue
+                current = group.get(field)
+                better = min if operator == '$min' else max
+                group[field] = value if current is None else better(current, value, key=sort_key)
+            else:
+                raise OperationFailure(f'Unsupported accumulator: {operator}', 15952)
+    return list(groups.values())
+
+class MemoryDatabase:
+    """A set of MemoryCollections, created on first access like MongoDB's"""
+
+    def __init__(self, name='memory'):
+        self.name = name
+        self._collections = {}
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return self[name]
+
+    def __getitem__(self, name):
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = MemoryCollection(name)
+            return self._collections[name]
+
+    def command(self, command, value=None, **kwargs):
+        if command == 'ping':
+            return {'ok': 1.0}
+        if command == 'explain':
+            if 'distinct' in value:
+                collection = self[value['distinct']]
+                key = value['key']
+                stage = 'DISTINCT_SCAN' if key in collection._hashed else 'COLLSCAN'
+                return {'queryPlanner': {'winningPlan': {'stage': stage}}, 'ok': 1.0}
+            raise OperationFailure('explain is only supported for distinct', 2)
+        raise OperationFailure(f'no such command: {command}', 59)
+
+class AsyncMemoryCursor:
+    """MemoryCursor with the async iteration PyMongo's AsyncCursor offers"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._cursor)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def to_list(self, length=None):
+        docs = list(self._cursor)
+        return docs if length is None else docs[:length]
+
+    async def close(self):
+        self._cursor.close()
+
+    async def explain(self):
+        return self._cursor.explain()
+
+class AsyncMemoryCollection:
+    """A MemoryCollection behind PyMongo's async Collection interface.
+
+    The engine never blocks on I/O, so each call simply runs inline.
+    """
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    def find(self, *args, **kwargs):
+        return AsyncMemoryCursor(self._collection.find(*args, **kwargs))
+
+    async def aggregate(self, *args, **kwargs):
+        return AsyncMemoryCursor(self._collection.aggregate(*args, **kwargs))
+
+    def __getattr__(self, name):
+        method = getattr(self._collection, name)
+
+        async def call(*args, **kwargs):
+            return method(*args, **kwargs)
+        return call
+
+class AsyncMemoryDatabase:
+    def __init__(self, database):
+        self._database = database
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return AsyncMemoryCollection(self._database[name])
+
+    async def command(self, *args, **kwargs):
+        return self._database.command(*args, **kwargs)
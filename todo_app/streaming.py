@@ -0,0 +1,160 @@
+import csv
+import io
+from flask import Response, current_app, request, stream_with_context
+from todo_app.metrics import count_serialized
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+JSON_MIMETYPE = 'application/json'
+CSV_MIMETYPE = 'text/csv'
+
+# Mimetype and file extension of each GET /api/todos/export format
+EXPORT_FORMATS = {
+    'ndjson': (NDJSON_MIMETYPE, 'ndjson'),
+    'csv': (CSV_MIMETYPE, 'csv'),
+}
+
+def wants_ndjson(req=None):
+    """True when the client prefers newline-delimited JSON over a JSON array
+
+    req defaults to Flask's current request; the ASGI routes pass Quart's.
+    """
+    req = req or request
+    best = req.accept_mimetypes.best_match([JSON_MIMETYPE, NDJSON_MIMETYPE])
+    return best == NDJSON_MIMETYPE
+
+def wants_csv(req=None):
+    """True when the client prefers CSV over newline-delimited JSON"""
+    req = req or request
+    return req.accept_mimetypes.best_match([NDJSON_MIMETYPE, CSV_MIMETYPE]) == CSV_MIMETYPE
+
+def wants_stream(req=None):
+    """True when the request asks for a streamed (unpaginated) listing"""
+    req = req or request
+    return wants_ndjson(req) or req.args.get('stream', '').lower() in ('true', '1', 'yes')
+
+def _chunks(docs, serialize, chunk_size, dumps):
+    """Serialize docs and group the encoded strings into lists of chunk_size"""
+    chunk = []
+    try:
+        for doc in docs:
+            chunk.append(dumps(serialize(doc)))
+            if len(chunk) >= chunk_size:
+                count_serialized(len(chunk))
+                yield chunk
+                chunk = []
+        if chunk:
+            count_serialized(len(chunk))
+            yield chunk
+    finally:
+        # Release the server-side cursor if the client goes away mid-stream
+        close = getattr(docs, 'close', None)
+        if close:
+            close()
+
+async def _achunks(docs, serialize, chunk_size, dumps):
+    """_chunks for an async cursor"""
+    chunk = []
+    try:
+        async for doc in docs:
+            chunk.append(dumps(serialize(doc)))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    finally:
+        close = getattr(docs, 'close', None)
+        if close:
+            await close()
+
+def iter_json_array(docs, serialize, chunk_size=100, dumps=None):
+    """Yield a JSON array of serialized docs a chunk at a time"""
+    yield '['
+    separator = ''
+    for chunk in _chunks(docs, serialize, chunk_size, dumps or current_app.json.dumps):
+        yield separator + ','.join(chunk)
+        separator = ','
+    yield ']'
+
+def iter_ndjson(docs, serialize, chunk_size=100, dumps=None):
+    """Yield serialized docs as newline-delimited JSON a chunk at a time"""
+    for chunk in _chunks(docs, serialize, chunk_size, dumps or current_app.json.dumps):
+        yield '\n'.join(chunk) + '\n'
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return value
+
+def csv_dumps(columns):
+    """A dumps function encoding a serialized doc as one CSV line of columns"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def dumps(item):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow([_csv_value(item.get(column)) for column in columns])
+        return buffer.getvalue()
+    return dumps
+
+def iter_csv(docs, serialize, columns, chunk_size=100):
+    """Yield serialized docs as CSV with a header row, a chunk at a time"""
+    yield ','.join(columns) + '\r\n'
+    for chunk in _chunks(docs, serialize, chunk_size, csv_dumps(columns)):
+        yield ''.join(chunk)
+
+async def aiter_csv(docs, serialize, columns, chunk_size=100):
+    """iter_csv over an async cursor"""
+    yield ','.join(columns) + '\r\n'
+    async for chunk in _achunks(docs, serialize, chunk_size, csv_dumps(columns)):
+        yield ''.join(chunk)
+
+async def aiter_json_array(docs, serialize, dumps, chunk_size=100):
+    """iter_json_array over an async cursor"""
+    yield '['
+    separator = ''
+    async for chunk in _achunks(docs, serialize, chunk_size, dumps):
+        yield separator + ','.join(chunk)
+        separator = ','
+    yield ']'
+
+async def aiter_ndjson(docs, serialize, dumps, chunk_size=100):
+    """iter_ndjson over an async cursor"""
+    async for chunk in _achunks(docs, serialize, chunk_size, dumps):
+        yield '\n'.join(chunk) + '\n'
+
+def stream_response(docs, serialize):
+    """Stream docs (typically a batched pymongo cursor) as a JSON array or NDJSON.
+
+    The format follows the Accept header. Nothing but the current chunk is
+    held in memory, so time to first byte and worker memory stay flat no
+    matter how many documents the cursor yields.
+    """
+    chunk_size = current_app.config['TODOS_STREAM_CHUNK_SIZE']
+    if wants_ndjson():
+        body, mimetype = iter_ndjson(docs, serialize, chunk_size), NDJSON_MIMETYPE
+    else:
+        body, mimetype = iter_json_array(docs, serialize, chunk_size), JSON_MIMETYPE
+    response = Response(stream_with_context(body), mimetype=mimetype)
+    response.headers['Vary'] = 'Accept'
+    return response
+
+def export_response(docs, serialize, columns, export_format):
+    """Stream docs as a downloadable NDJSON or CSV file (an EXPORT_FORMATS key)"""
+    chunk_size = current_app.config['TODOS_STREAM_CHUNK_SIZE']
+    if export_format == 'csv':
+        body = iter_csv(docs, serialize, columns, chunk_size)
+    else:
+        body = iter_ndjson(docs, serialize, chunk_size)
+    return download(Response(stream_with_context(body)), export_format)
+
+def download(response, export_format):
+    """Set the mimetype and attachment filename of an export response"""
+    mimetype, extension = EXPORT_FORMATS[export_format]
+    response.mimetype = mimetype
+    response.headers['Content-Disposition'] = f'attachment; filename=todos.{extension}'
+    response.headers['Vary'] = 'Accept'
+    return response
@@ -0,0 +1,201 @@
+import unittest
+from datetime import datetime, timedelta
+from todo_app.asgi import create_async_app
+from todo_app.async_mongo import async_mongo
+from todo_app.cache import invalidate_all
+from todo_app.config import TestingConfig
+
+class TestAsyncTodoRoutes(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        """Start a fresh app per test, since the async client is bound to the test's event loop"""
+        self.app = create_async_app(TestingConfig)
+        self.serving = self.app.test_app()
+        await self.serving.startup()
+        self.client = self.app.test_client()
+        await async_mongo.db.todos.delete_many({})
+        invalidate_all()
+
+    async def asyncTearDown(self):
+        await async_mongo.db.todos.delete_many({})
+        await self.serving.shutdown()
+
+    async def create(self, **todo):
+        response = await self.client.post('/api/todos', json=todo)
+        self.assertEqual(response.status_code, 201)
+        return await response.get_json()
+
+    async def test_create_and_list_todos(self):
+        """Todos created through the ASGI app are listed like in the WSGI app"""
+        created = await self.create(title='Async Todo', category='Work')
+        self.assertEqual(created['title'], 'Async Todo')
+        self.assertFalse(created['completed'])
+
+        response = await self.client.get('/api/todos')
+        self.assertEqual(response.status_code, 200)
+        data = await response.get_json()
+        self.assertEqual([todo['id'] for todo in data], [created['id']])
+
+    async def test_create_todo_missing_title(self):
+        response = await self.client.post('/api/todos', json={'category': 'Work'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual((await response.get_json())['error'], 'Title is required')
+
+    async def test_get_todos_pagination(self):
+        """Pages are linked by X-Next-Cursor and together cover every todo once"""
+        for i in range(5):
+            await self.create(title=f'Todo {i}')
+
+        seen = []
+        response = await self.client.get('/api/todos?limit=2')
+        while True:
+            self.assertEqual(response.status_code, 200)
+            seen.extend(todo['title'] for todo in await response.get_json())
+            cursor = response.headers.get('X-Next-Cursor')
+            if not cursor:
+                break
+            response = await self.client.get(f'/api/todos?limit=2&cursor={cursor}')
+        self.assertEqual(seen, [f'Todo {i}' for i in range(5)])
+
+    async def test_get_todos_invalid_cursor(self):
+        response = await self.client.get('/api/todos?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 400)
+
+    async def test_update_and_delete_todo(self):
+        created = await self.create(title='Original', category='Work')
+
+        response = await self.client.put(f"/api/todos/{created['id']}",
+                                         json={'title': 'Updated', 'completed': True})
+        self.assertEqual(response.status_code, 200)
+        data = await (await self.client.get('/api/todos')).get_json()
+        self.assertEqual(data[0]['title'], 'Updated')
+        self.assertTrue(data[0]['completed'])
+
+        response = await self.client.delete(f"/api/todos/{created['id']}")
+        self.assertEqual(response.status_code, 200)
+        response = await self.client.delete(f"/api/todos/{created['id']}")
+        self.assertEqual(response.status_code, 404)
+
+    async def test_get_todo(self):
+        created = await self.create(title='Single')
+        response = await self.client.get(f"/api/todos/{created['id']}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((await response.get_json())['title'], 'Single')
+
+        await self.client.put(f"/api/todos/{created['id']}", json={'title': 'Renamed'})
+        response = await self.client.get(f"/api/todos/{created['id']}")
+        self.assertEqual((await response.get_json())['title'], 'Renamed')
+
+        await self.client.delete(f"/api/todos/{created['id']}")
+        response = await self.client.get(f"/api/todos/{created['id']}")
+        self.assertEqual(response.status_code, 404)
+
+    async def test_todo_stats(self):
+        await self.create(title='Done', category='Work', completed=True)
+        await self.create(title='Late', category='Work',
+                          due_date=(datetime.utcnow() - timedelta(days=1)).isoformat())
+        response = await self.client.get('/api/todos/stats?bucket=month')
+        self.assertEqual(response.status_code, 200)
+        data = await response.get_json()
+        self.assertEqual((data['total'], data['completed'], data['overdue']), (2, 1, 1))
+        self.assertEqual(data['by_category'],
+                         [{'name': 'Work', 'count': 2, 'completed': 1, 'overdue': 1}])
+        self.assertEqual(sum(group['count'] for group in data['created']), 2)
+
+    async def test_import_and_export(self):
+        body = 'title,category,completed\r\nImported,Work,yes\r\n,Work,no\r\n'
+        response = await self.client.post('/api/todos/import', data=body,
+                                           headers={'Content-Type': 'text/csv'})
+        self.assertEqual(await response.get_json(), {
+            'imported': 1, 'failed': 1, 'errors': [{'line': 3, 'error': 'Title is required'}]
+        })
+
+        response = await self.client.get('/api/todos/export?fields=title,completed',
+                                          headers={'Accept': 'text/csv'})
+        self.assertEqual(response.mimetype, 'text/csv')
+        self.assertEqual(await response.get_data(as_text=True),
+                         'title,completed\r\nImported,true\r\n')
+
+    async def test_update_invalid_id(self):
+        response = await self.client.put('/api/todos/invalid-id', json={'title': 'x'})
+        self.assertEqual(response.status_code, 404)
+
+    async def test_stream_ndjson(self):
+        for i in range(3):
+            await self.create(title=f'Todo {i}')
+
+        response = await self.client.get('/api/todos',
+                                         headers={'Accept': 'application/x-ndjson'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        lines = (await response.get_data(as_text=True)).splitlines()
+        self.assertEqual(len(lines), 3)
+
+    async def test_bulk_operations(self):
+        created = await self.create(title='Existing')
+        response = await self.client.post('/api/todos/bulk', json={'operations': [
+            {'op': 'create', 'todo': {'title': 'New'}},
+            {'op': 'update', 'id': created['id'], 'todo': {'completed': True}},
+            {'op': 'delete', 'id': '0' * 24},
+        ]})
+        self.assertEqual(response.status_code, 200)
+        results = (await response.get_json())['results']
+        self.assertEqual([result['status'] for result in results], [201, 200, 404])
+
+    async def test_categories_with_counts(self):
+        await self.create(title='A', category='Work')
+        await self.create(title='B', category='Work')
+        await self.create(title='C', category='Home')
+
+        response = await self.client.get('/api/categories?counts=true')
+        self.assertEqual(await response.get_json(), [
+            {'name': 'Home', 'count': 1},
+            {'name': 'Work', 'count': 2},
+        ])
+
+    async def test_listing_not_modified_until_write(self):
+        await self.create(title='Cached')
+        response = await self.client.get('/api/todos')
+        etag = response.headers['ETag']
+
+        response = await self.client.get('/api/todos', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+        await self.create(title='Another')
+        response = await self.client.get('/api/todos', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+
+    async def test_changes_report_deletes(self):
+        created = await self.create(title='Synced')
+        data = await (await self.client.get('/api/todos/changes')).get_json()
+        self.assertEqual([todo['id'] for todo in data['changes']], [created['id']])
+
+        await self.client.delete(f"/api/todos/{created['id']}")
+        data = await (await self.client.get(f"/api/todos/changes?since={data['next']}")).get_json()
+        self.assertIn(created['id'], data['deleted'])
+
+    async def test_overdue_todos(self):
+        past = (datetime.utcnow() - timedelta(days=1)).isoformat()
+        future = (datetime.utcnow() + timedelta(days=1)).isoformat()
+        await self.create(title='Late', due_date=past)
+        await self.create(title='On time', due_date=future)
+
+        data = await (await self.client.get('/api/todos/overdue')).get_json()
+        self.assertEqual([todo['title'] for todo in data], ['Late'])
+
+    async def test_health(self):
+        response = await self.client.get('/api/health')
+        self.assertEqual(response.status_code, 200)
+        data = await response.get_json()
+        self.assertEqual(data['status'], 'ok')
+        self.assertEqual(data['storage']['backend'], TestingConfig.STORAGE_BACKEND)
+
+class TestAsyncAppConfig(unittest.TestCase):
+    def test_flask_only_features_rejected(self):
+        """Test settings the async write routes would bypass stop the app from starting"""
+        for setting in ('OVERDUE_SCHEDULER_ENABLED', 'WRITE_BEHIND_ENABLED'):
+            config = type('Config', (TestingConfig,), {setting: True})
+            with self.subTest(setting=setting), self.assertRaises(ValueError):
+                create_async_app(config)
+
+if __name__ == '__main__':
+    unittest.main()
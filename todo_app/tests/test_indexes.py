@@ -0,0 +1,141 @@
+import unittest
+from datetime import datetime, timedelta
+from todo_app import create_app
+from todo_app.config import TestingConfig
+from todo_app.models.indexes import (
+    TODO_INDEXES, TOMBSTONE_INDEXES, TOMBSTONE_RETENTION_SECONDS, collection_scans
+)
+from todo_app.models.todo import SORT_FIELDS, Todo
+from todo_app.storage import storage
+
+def index_specs(indexes):
+    """Map index names to their key list and options"""
+    return {index.document['name']: dict(index.document, key=list(index.document['key'].items()))
+            for index in indexes}
+
+class TestIndexRegistry(unittest.TestCase):
+    """Checks of the registered specs that need no MongoDB server"""
+
+    def test_listing_sorts_have_keyset_indexes(self):
+        """Test every sort, alone or after a category/completed filter, has a (field, _id) index"""
+        keys = [spec['key'] for spec in index_specs(TODO_INDEXES).values()]
+        for field in SORT_FIELDS.values():
+            with self.subTest(field=field):
+                self.assertIn([(field, 1), ('_id', 1)], keys)
+        for prefix in ('category', 'completed'):
+            with self.subTest(prefix=prefix):
+                self.assertIn([(prefix, 1), ('created_at', 1), ('_id', 1)], keys)
+        self.assertIn([('updated_at', 1), ('_id', 1)], keys)
+        self.assertIn([('title', 'text')], keys)
+
+    def test_overdue_index_is_partial(self):
+        """Test the overdue index skips completed todos and the overdue queries can use it"""
+        spec = index_specs(TODO_INDEXES)['overdue_due_date']
+        self.assertEqual(spec['key'], [('due_date', 1)])
+        self.assertEqual(spec['partialFilterExpression'], {'completed': False})
+        self.assertIs(Todo.overdue_query()['completed'], False)
+
+    def test_tombstones_expire(self):
+        specs = index_specs(TOMBSTONE_INDEXES)
+        self.assertEqual(specs['deleted_at_ttl']['key'], [('deleted_at', 1)])
+        self.assertEqual(specs['deleted_at_ttl']['expireAfterSeconds'],
+                         TOMBSTONE_RETENTION_SECONDS)
+        self.assertEqual(specs['deleted_at_id']['key'], [('deleted_at', 1), ('_id', 1)])
+
+    def test_create_indexes_on_configured_backend(self):
+        """Test create_indexes registers every spec, options included, and is idempotent"""
+        app = create_app(TestingConfig)
+        with app.app_context():
+            Todo.create_indexes()
+            Todo.create_indexes()
+            for collection, indexes in ((storage.db.todos, TODO_INDEXES),
+                                        (storage.db.todo_tombstones, TOMBSTONE_INDEXES)):
+                existing = collection.index_information()
+                for name, spec in index_specs(indexes).items():
+                    with self.subTest(name=name):
+                        self.assertIn(name, existing)
+                        for option in ('partialFilterExpression', 'expireAfterSeconds'):
+                            self.assertEqual(existing[name].get(option), spec.get(option))
+                        if spec['key'][0][1] != 'text':
+                            self.assertEqual(list(existing[name]['key']), spec['key'])
+
+@unittest.skipUnless(TestingConfig.STORAGE_BACKEND == 'mongo',
+                     'query plans are only meaningful against MongoDB')
+class TestTodoIndexes(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """Run once before all tests"""
+        cls.app = create_app(TestingConfig)
+        cls.client = cls.app.test_client()
+        with cls.app.app_context():
+            Todo.clear_all()
+            Todo.create_indexes()
+            now = datetime.utcnow()
+            for i in range(20):
+                Todo(
+                    title=f'Todo {i}',
+                    category=f'Category {i % 3}',
+                    due_date=now + timedelta(days=i - 10),
+                    completed=i % 2 == 0
+                ).save()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Run once after all tests"""
+        with cls.app.app_context():
+            Todo.clear_all()
+            storage.close()
+
+    def assertIndexed(self, explain):
+        """Fail if the winning plan reads the whole collection"""
+        self.assertEqual(collection_scans(explain), [])
+
+    def test_indexes_created(self):
+        """Test every registered index exists and creation is idempotent"""
+        with self.app.app_context():
+            Todo.create_indexes()
+            existing = set(storage.db.todos.index_information())
+        for index in TODO_INDEXES:
+            self.assertIn(index.document['name'], existing)
+
+    def test_listing_queries_use_indexes(self):
+        """Test the GET /api/todos query variants avoid collection scans"""
+        with self.app.app_context():
+            for filters, sort, order in [
+                ({}, 'created', 'asc'),
+                ({'category': 'Category 1'}, 'created', 'asc'),
+                ({'completed': False}, 'created', 'desc'),
+                ({}, 'due', 'asc'),
+                ({'due_before': datetime.utcnow()}, 'due', 'asc'),
+                ({}, 'title', 'desc'),
+                ({'q': 'Todo'}, 'created', 'asc'),
+            ]:
+                with self.subTest(filters=filters, sort=sort, order=order):
+                    self.assertIndexed(Todo.find_page(
+                        Todo.build_query(**filters), sort, order, explain=True
+                    ))
+
+    def test_paginated_queries_use_indexes(self):
+        """Test follow-up pages use an index range scan"""
+        with self.app.app_context():
+            for sort in ('created', 'due', 'title'):
+                _, cursor = Todo.find_page(sort=sort, limit=5)
+                with self.subTest(sort=sort):
+                    self.assertIndexed(Todo.find_page(
+                        sort=sort, limit=5, cursor=cursor, explain=True
+                    ))
+
+    def test_overdue_query_uses_index(self):
+        """Test GET /api/todos/overdue avoids a collection scan"""
+        with self.app.app_context():
+            self.assertIndexed(Todo.get_overdue_page(explain=True))
+            _, cursor = Todo.get_overdue_page(limit=2)
+            self.assertIndexed(Todo.get_overdue_page(limit=2, cursor=cursor, explain=True))
+
+    def test_categories_query_uses_index(self):
+        """Test GET /api/categories avoids a collection scan"""
+        with self.app.app_context():
+            self.assertIndexed(Todo.get_categories(explain=True))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+from bson.objectid import ObjectId
+from pymongo import DeleteOne, InsertOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure
+from todo_app.models import indexes
+from todo_app.storage.memory import MemoryDatabase
+
+class TestMemoryCollection(unittest.TestCase):
+    def setUp(self):
+        self.todos = MemoryDatabase().todos
+        self.todos.create_indexes(indexes.TODO_INDEXES)
+
+    def titles(self, cursor):
+        return [doc['title'] for doc in cursor]
+
+    def test_none_matches_missing_and_null(self):
+        """Test {field: None} matches documents without the field, as in MongoDB"""
+        self.todos.insert_one({'title': 'Null', 'category': None})
+        self.todos.insert_one({'title': 'Missing'})
+        self.todos.insert_one({'title': 'Set', 'category': 'Work'})
+
+        self.assertCountEqual(self.titles(self.todos.find({'category': None})), ['Null', 'Missing'])
+        self.assertEqual(self.titles(self.todos.find({'category': {'$ne': None}})), ['Set'])
+
+    def test_comparisons_stay_within_type(self):
+        """Test range operators never match null or values of another type"""
+        now = datetime.utcnow()
+        self.todos.insert_one({'title': 'Past', 'due_date': now - timedelta(days=1)})
+        self.todos.insert_one({'title': 'No date', 'due_date': None})
+        self.todos.insert_one({'title': 'Text date', 'due_date': 'yesterday'})
+
+        self.assertEqual(self.titles(self.todos.find({'due_date': {'$lt': now}})), ['Past'])
+
+    def test_sort_uses_bson_order(self):
+        """Test nulls sort first ascending and ties fall back to the next sort key"""
+        first, second = ObjectId(), ObjectId()
+        self.todos.insert_one({'_id': second, 'title': 'b', 'due_date': datetime(2024, 1, 1)})
+        self.todos.insert_one({'_id': first, 'title': 'a', 'due_date': datetime(2024, 1, 1)})
+        self.todos.insert_one({'title': 'none', 'due_date': None})
+
+        found = self.todos.find({}, sort=[('due_date', 1), ('_id', 1)])
+        self.assertEqual(self.titles(found), ['none', 'a', 'b'])
+        found = self.todos.find({}, sort=[('due_date', -1), ('_id', -1)])
+        self.assertEqual(self.titles(found), ['b', 'a', 'none'])
+
+    def test_projection_and_limit(self):
+        for i in range(3):
+            self.todos.insert_one({'title': f'Todo {i}', 'category': 'Work'})
+
+        docs = list(self.todos.find({}, {'title': 1}, sort=[('title', 1)], limit=2))
+        self.assertEqual(len(docs), 2)
+        self.assertEqual(set(docs[0]), {'_id', 'title'})
+
+    def test_text_search(self):
+        """Test $text matches whole words and needs a text index"""
+        self.todos.insert_one({'title': 'Buy groceries'})
+        self.todos.insert_one({'title': 'Write report'})
+
+        self.assertEqual(self.titles(self.todos.find({'$text': {'$search': 'GROCERIES'}})),
+                         ['Buy groceries'])
+        self.assertEqual(self.titles(self.todos.find({'$text': {'$search': 'rep'}})), [])
+        with self.assertRaises(OperationFailure):
+            list(MemoryDatabase().todos.find({'$text': {'$search': 'report'}}))
+
+    def test_datetimes_truncated_to_milliseconds(self):
+        self.todos.insert_one({'title': 'Precise', 'created_at': datetime(2024, 1, 1, 0, 0, 0, 123456)})
+        self.assertEqual(self.todos.find_one({})['created_at'].microsecond, 123000)
+
+    def test_aware_datetimes_stored_and_queried_as_naive_utc(self):
+        """Test aware datetimes behave as BSON makes them: naive UTC, in documents and queries"""
+        plus_two = timezone(timedelta(hours=2))
+        self.todos.insert_one({'title': 'Aware', 'due_date': datetime(2024, 1, 1, 12, tzinfo=plus_two)})
+        self.todos.insert_one({'title': 'Naive', 'due_date': datetime(2024, 1, 1, 11)})
+        self.assertEqual(self.todos.find_one({'title': 'Aware'})['due_date'], datetime(2024, 1, 1, 10))
+
+        cutoff = datetime(2024, 1, 1, 10, 30, tzinfo=timezone.utc)
+        self.assertEqual(self.titles(self.todos.find({'due_date': {'$lt': cutoff}})), ['Aware'])
+        self.assertEqual(self.titles(self.todos.find({}, sort=[('due_date', 1)])), ['Aware', 'Naive'])
+        matched = self.todos.aggregate([{'$match': {'due_date': {'$gte': cutoff}}}])
+        self.assertEqual(self.titles(matched), ['Naive'])
+
+    def test_find_one_and_update_returns_before(self):
+        result = self.todos.insert_one({'title': 'Old', 'category': 'Work'})
+
+        before = self.todos.find_one_and_update({'_id': result.inserted_id},
+                                                {'$set': {'title': 'New'}},
+                                                return_document=ReturnDocument.BEFORE)
+        self.assertEqual(before['title'], 'Old')
+        self.assertEqual(self.todos.find_one({'_id': result.inserted_id})['title'], 'New')
+        self.assertEqual(self.titles(self.todos.find({'title': 'New'})), ['New'])
+        self.assertIsNone(self.todos.find_one_and_update({'_id': ObjectId()}, {'$set': {'x': 1}}))
+
+    def test_upsert_with_inc(self):
+        versions = MemoryDatabase().todo_versions
+        for _ in range(2):
+            versions.update_one({'_id': 'todos'}, {'$inc': {'version': 1}}, upsert=True)
+        self.assertEqual(versions.find_one({'_id': 'todos'})['version'], 2)
+
+    def test_bulk_write_unordered_reports_errors(self):
+        """Test an unordered bulk write applies every valid operation and reports the rest"""
+        existing = self.todos.insert_one({'title': 'Existing'}).inserted_id
+
+        with self.assertRaises(BulkWriteError) as raised:
+            self.todos.bulk_write([
+                InsertOne({'_id': existing, 'title': 'Duplicate'}),
+                UpdateOne({'_id': existing}, {'$set': {'completed': True}}),
+                InsertOne({'title': 'New'}),
+                DeleteOne({'_id': ObjectId()}),
+            ], ordered=False)
+        errors = raised.exception.details['writeErrors']
+        self.assertEqual([error['index'] for error in errors], [0])
+        self.assertEqual(errors[0]['code'], 11000)
+        self.assertTrue(self.todos.find_one({'_id': existing})['completed'])
+        self.assertEqual(self.todos.count_documents({}), 2)
+
+    def test_group_and_distinct(self):
+        for category in ('Work', 'Work', 'Home', None):
+            self.todos.insert_one({'title': 't', 'category': category})
+
+        counts = {group['_id']: group['count'] for group in self.todos.aggregate([
+            {'$group': {'_id': '$category', 'count': {'$sum': 1}}}
+        ])}
+        self.assertEqual(counts, {'Work': 2, 'Home': 1, None: 1})
+        self.assertEqual(self.todos.distinct('category'), [None, 'Home', 'Work'])
+
+    def test_facet_and_date_buckets(self):
+        for day in (1, 1, 2):
+            self.todos.insert_one({'title': 't', 'due_date': datetime(2024, 3, day, 12)})
+        self.todos.insert_one({'title': 't', 'due_date': None})
+
+        result, = self.todos.aggregate([{'$facet': {
+            'total': [{'$group': {'_id': None, 'count': {'$sum': 1}}}],
+            'per_day': [
+                {'$match': {'due_date': {'$ne': None}}},
+                {'$group': {'_id': {'$dateToString': {'format': '%Y-%m-%d', 'date': '$due_date'}},
+                            'count': {'$sum': 1}}},
+                {'$sort': {'_id': 1}},
+            ],
+        }}])
+        self.assertEqual(result['total'], [{'_id': None, 'count': 4}])
+        self.assertEqual(result['per_day'], [{'_id': '2024-03-01', 'count': 2},
+                                             {'_id': '2024-03-02', 'count': 1}])
+
+    def test_equality_queries_use_hash_index(self):
+        self.todos.insert_one({'title': 't', 'category': 'Work'})
+
+        plan = self.todos.find({'category': 'Work'}).explain()['queryPlanner']['winningPlan']
+        self.assertEqual(plan['inputStage']['stage'], 'IXSCAN')
+        self.assertEqual(self.titles(self.todos.find({'category': 'Home'})), [])
+
+        self.todos.delete_many({'category': 'Work'})
+        self.assertEqual(self.titles(self.todos.find({'category': 'Work'})), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import os
+import tempfile
+import time
+import unittest
+from todo_app import create_app
+from todo_app.config import TestingConfig
+from todo_app.metrics import Histogram, metrics
+from todo_app.profiler import SlowRequestProfiler
+
+class MetricsConfig(TestingConfig):
+    METRICS_ENABLED = True
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(MetricsConfig)
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        metrics.enabled = False
+
+    def test_server_timing_header(self):
+        """Test every response breaks its time down in a Server-Timing header"""
+        self.client.post('/api/todos', json={'title': 'Timed'})
+        response = self.client.get('/api/todos')
+        timing = response.headers['Server-Timing']
+        self.assertIn('serialize;dur=', timing)
+        self.assertIn('total;dur=', timing)
+
+    def test_metrics_endpoint(self):
+        """Test /metrics exposes route latencies and serialized document counts"""
+        for i in range(3):
+            self.client.post('/api/todos', json={'title': f'Todo {i}'})
+        self.client.get('/api/todos')
+
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        text = response.get_data(as_text=True)
+        self.assertIn('# TYPE todo_request_duration_seconds histogram', text)
+        self.assertIn('todo_request_duration_seconds_count{endpoint="todos.get_todos",'
+                      'method="GET",status="200"} 1', text)
+        self.assertIn('todo_documents_serialized_total{endpoint="todos.get_todos"} 3', text)
+
+    def test_metrics_disabled_by_default(self):
+        app = create_app(TestingConfig)
+        response = app.test_client().get('/api/todos')
+        self.assertNotIn('Server-Timing', response.headers)
+        self.assertEqual(app.test_client().get('/metrics').status_code, 404)
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram('latency', 'Test latency', ('route',), buckets=(0.1, 1))
+        for value in (0.05, 0.5, 5):
+            histogram.observe(value, 'a')
+        lines = histogram.render()
+        self.assertIn('latency_bucket{route="a",le="0.1"} 1', lines)
+        self.assertIn('latency_bucket{route="a",le="1"} 2', lines)
+        self.assertIn('latency_bucket{route="a",le="+Inf"} 3', lines)
+        self.assertIn('latency_count{route="a"} 3', lines)
+
+class TestSlowRequestProfiler(unittest.TestCase):
+    def test_slow_request_writes_folded_stacks(self):
+        """Test a request over the threshold leaves a flamegraph-ready stack file"""
+        directory = tempfile.mkdtemp()
+        profiler = SlowRequestProfiler(threshold=0.01, directory=directory, interval=0.001)
+
+        profiler.start()
+        start = time.perf_counter()
+        while time.perf_counter() - start < 0.05:
+            sum(range(1000))
+        path = profiler.finish(time.perf_counter() - start, 'todos.get_todos')
+
+        self.assertTrue(path.startswith(directory))
+        with open(path) as f:
+            lines = f.read().splitlines()
+        self.assertTrue(lines)
+        stack, count = lines[0].rsplit(' ', 1)
+        self.assertIn('test_slow_request_writes_folded_stacks', stack)
+        self.assertGreater(int(count), 0)
+
+    def test_fast_request_discarded(self):
+        directory = tempfile.mkdtemp()
+        profiler = SlowRequestProfiler(threshold=10, directory=directory, interval=0.001)
+        profiler.start()
+        self.assertIsNone(profiler.finish(0.001, 'todos.get_todos'))
+        self.assertEqual(os.listdir(directory), [])
+
+if __name__ == '__main__':
+    unittest.main()
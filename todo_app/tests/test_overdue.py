@@ -0,0 +1,125 @@
+import os
+import threading
+import unittest
+from datetime import datetime, timedelta
+from bson.objectid import ObjectId
+from todo_app import after_fork, create_app
+from todo_app.config import TestingConfig
+from todo_app.models.todo import Todo
+from todo_app.overdue import overdue_scheduler
+
+class OverdueSchedulerConfig(TestingConfig):
+    OVERDUE_SCHEDULER_ENABLED = True
+
+class TestOverdueScheduler(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(OverdueSchedulerConfig)
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        overdue_scheduler.enabled = False
+        overdue_scheduler._hooks.clear()
+
+    def create(self, title, due_in, **fields):
+        due_date = (datetime.utcnow() + due_in).isoformat()
+        response = self.client.post('/api/todos', json=dict(fields, title=title, due_date=due_date))
+        return response.get_json()['id']
+
+    def overdue_titles(self, url='/api/todos/overdue'):
+        return [todo['title'] for todo in self.client.get(url).get_json()]
+
+    def test_served_from_set_kept_current_by_writes(self):
+        """Test the listing follows creates, completions and deletes without reloading"""
+        self.create('Old', timedelta(days=-2))
+        self.assertEqual(self.overdue_titles(), ['Old'])
+
+        with self.app.app_context():
+            # Bypasses the routes, so the loaded set must not see it
+            Todo('Unseen', due_date=datetime.utcnow() - timedelta(days=3)).save()
+        done = self.create('Done', timedelta(days=-1))
+        gone = self.create('Gone', timedelta(hours=-1))
+        self.create('Future', timedelta(days=1))
+        self.assertEqual(self.overdue_titles(), ['Old', 'Done', 'Gone'])
+
+        self.client.put(f'/api/todos/{done}', json={'completed': True})
+        self.client.delete(f'/api/todos/{gone}')
+        self.assertEqual(self.overdue_titles(), ['Old'])
+
+    def test_utc_offset_due_dates(self):
+        """Test Z-suffixed due dates, as the date picker sends them, go into the set as naive UTC"""
+        response = self.client.post('/api/todos', json={'title': 'Late',
+                                                        'due_date': '2020-01-01T00:00:00.000Z'})
+        self.assertEqual(response.status_code, 201)
+        todo_id = response.get_json()['id']
+        response = self.client.put(f'/api/todos/{todo_id}',
+                                   json={'due_date': '2020-01-01T02:00:00+02:00'})
+        self.assertEqual(response.status_code, 200)
+        self.create('Later', timedelta(days=-1))
+
+        response = self.client.get('/api/todos/overdue?limit=1')
+        self.assertEqual([todo['title'] for todo in response.get_json()], ['Late'])
+        self.assertEqual(response.get_json()[0]['due_date'], '2020-01-01T00:00:00')
+        self.assertEqual(self.overdue_titles(
+            f"/api/todos/overdue?limit=1&cursor={response.headers['X-Next-Cursor']}"), ['Later'])
+
+    def test_pagination(self):
+        for days in (3, 1, 2):
+            self.create(f'Overdue {days}', timedelta(days=-days))
+
+        response = self.client.get('/api/todos/overdue?limit=2')
+        self.assertEqual([todo['title'] for todo in response.get_json()], ['Overdue 3', 'Overdue 2'])
+        cursor = response.headers['X-Next-Cursor']
+        self.assertEqual(self.overdue_titles(f'/api/todos/overdue?limit=2&cursor={cursor}'),
+                         ['Overdue 1'])
+        self.assertEqual(self.overdue_titles('/api/todos/overdue?stream=true'),
+                         ['Overdue 3', 'Overdue 2', 'Overdue 1'])
+
+    def test_todo_falls_due_and_hook_runs(self):
+        """Test a todo moves into the set when its deadline passes, and hooks hear of it"""
+        reminded = threading.Event()
+        titles = []
+
+        @overdue_scheduler.on_overdue
+        def remind(doc):
+            titles.append(doc['title'])
+            reminded.set()
+
+        # Nothing reads the listing first: the set was loaded by create_app
+        self.create('Soon', timedelta(milliseconds=200))
+        self.assertTrue(reminded.wait(5))
+        self.assertEqual(titles, ['Soon'])
+        self.assertEqual(self.overdue_titles(), ['Soon'])
+
+    def test_forked_worker_runs_its_own_thread(self):
+        """Test a worker forked after create_app, as gunicorn's preload does, reloads and fires hooks"""
+        reminded = threading.Event()
+        overdue_scheduler.on_overdue(lambda doc: reminded.set())
+        with self.app.app_context():
+            Todo('Missed by the parent', due_date=datetime.utcnow() - timedelta(days=1)).save()
+
+        def worker():
+            after_fork(self.app)
+            self.create('Soon', timedelta(milliseconds=200))
+            return self.overdue_titles() == ['Missed by the parent'] and reminded.wait(5)
+
+        pid = os.fork()
+        if pid == 0:
+            try:
+                passed = worker()
+            except BaseException:
+                passed = False
+            os._exit(0 if passed else 1)
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+
+    def test_change_seen_twice_is_listed_once(self):
+        """Test a create also picked up by a reload doesn't appear twice"""
+        todo_id = self.create('Late', timedelta(days=-1))
+        self.assertEqual(self.overdue_titles(), ['Late'])
+        with self.app.app_context():
+            doc = Todo.get_by_id(ObjectId(todo_id))
+        overdue_scheduler.record(None, doc)
+        self.assertEqual(self.overdue_titles(), ['Late'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,30 +1,33 @@
+import base64
 import unittest
 import json
 from datetime import datetime, timedelta
 from bson.objectid import ObjectId
-from todo_app import create_app, mongo
+from todo_app import create_app
+from todo_app.cache import category_cache, invalidate_all, todo_cache
+from todo_app.config import TestingConfig
 from todo_app.models.todo import Todo
+from todo_app.storage import storage
 
 class TestTodoRoutes(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
         """Run once before all tests"""
-        cls.app = create_app()
-        cls.app.config['MONGO_URI'] = 'mongodb://localhost:27017/todo_app_test'
+        cls.app = create_app(TestingConfig)
         cls.client = cls.app.test_client()
 
     def setUp(self):
         """Run before each test"""
         with self.app.app_context():
             Todo.clear_all()
+        invalidate_all()
 
     @classmethod
     def tearDownClass(cls):
         """Run once after all tests"""
         with cls.app.app_context():
             Todo.clear_all()
-            # Close MongoDB connection
-            mongo.cx.close()
+            storage.close()
 
     def test_create_todo_success(self):
         """Test creating a new todo with valid data"""
@@ -157,6 +160,17 @@ class TestTodoRoutes(unittest.TestCase):
         response = self.client.delete('/api/todos/invalid_id')
         self.assertEqual(response.status_code, 404)
 
+    def test_utc_offset_dates(self):
+        """Test Z-suffixed dates, as the date picker sends them, in todos and filters"""
+        self.client.post('/api/todos', json={'title': 'Late', 'due_date': '2020-01-01T00:00:00.000Z'})
+        response = self.client.get('/api/todos/overdue')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([todo['title'] for todo in json.loads(response.data)], ['Late'])
+
+        response = self.client.get('/api/todos?sort=due&due_before=2020-01-02T00:00:00Z')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(json.loads(response.data)), 1)
+
     def test_get_categories_empty(self):
         """Test getting categories when none exist"""
         response = self.client.get('/api/categories')
@@ -210,5 +224,554 @@ class TestTodoRoutes(unittest.TestCase):
         self.assertEqual(len(data), 1)
         self.assertEqual(data[0]['title'], 'Overdue Todo')
 
+    def test_get_todos_pagination(self):
+        """Test paging through todos with limit and next cursor"""
+        for i in range(3):
+            self.client.post('/api/todos', json={'title': f'Todo {i}'})
+        
+        response = self.client.get('/api/todos?limit=2')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual([todo['title'] for todo in data], ['Todo 0', 'Todo 1'])
+        cursor = response.headers.get('X-Next-Cursor')
+        self.assertIsNotNone(cursor)
+        self.assertIn('rel="next"', response.headers.get('Link'))
+        
+        response = self.client.get(f'/api/todos?limit=2&cursor={cursor}')
+        data = json.loads(response.data)
+        self.assertEqual([todo['title'] for todo in data], ['Todo 2'])
+        self.assertIsNone(response.headers.get('X-Next-Cursor'))
+
+    def test_get_todos_invalid_page_args(self):
+        """Test that malformed limit and cursor values are rejected"""
+        response = self.client.get('/api/todos?limit=zero')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/api/todos?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 400)
+        data = json.loads(response.data)
+        self.assertEqual(data['error'], 'Invalid cursor')
+
+    def test_get_overdue_todos_pagination(self):
+        """Test paging through overdue todos ordered by due date"""
+        now = datetime.utcnow()
+        for days in (3, 1, 2):
+            self.client.post('/api/todos', json={
+                'title': f'Overdue {days}',
+                'due_date': (now - timedelta(days=days)).isoformat()
+            })
+        
+        response = self.client.get('/api/todos/overdue?limit=2')
+        data = json.loads(response.data)
+        self.assertEqual([todo['title'] for todo in data], ['Overdue 3', 'Overdue 2'])
+        cursor = response.headers['X-Next-Cursor']
+        
+        response = self.client.get(f'/api/todos/overdue?limit=2&cursor={cursor}')
+        data = json.loads(response.data)
+        self.assertEqual([todo['title'] for todo in data], ['Overdue 1'])
+
+    def test_get_todos_search_title(self):
+        """Test full-text search on todo titles"""
+        self.client.post('/api/todos', json={'title': 'Buy groceries'})
+        self.client.post('/api/todos', json={'title': 'Write report'})
+        
+        response = self.client.get('/api/todos?q=groceries')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual([todo['title'] for todo in data], ['Buy groceries'])
+
+    def test_get_todos_filter_completed(self):
+        """Test filtering todos by completion status"""
+        self.client.post('/api/todos', json={'title': 'Done', 'completed': True})
+        self.client.post('/api/todos', json={'title': 'Open'})
+        
+        response = self.client.get('/api/todos?completed=true')
+        data = json.loads(response.data)
+        self.assertEqual([todo['title'] for todo in data], ['Done'])
+        
+        response = self.client.get('/api/todos?completed=false')
+        data = json.loads(response.data)
+        self.assertEqual([todo['title'] for todo in data], ['Open'])
+        
+        response = self.client.get('/api/todos?completed=maybe')
+        self.assertEqual(response.status_code, 400)
+
+    def test_get_todos_filter_due_range(self):
+        """Test filtering todos by due date range"""
+        now = datetime.utcnow()
+        for days in (1, 5, 10):
+            self.client.post('/api/todos', json={
+                'title': f'Due in {days}',
+                'due_date': (now + timedelta(days=days)).isoformat()
+            })
+        
+        response = self.client.get('/api/todos', query_string={
+            'due_after': (now + timedelta(days=2)).isoformat(),
+            'due_before': (now + timedelta(days=7)).isoformat()
+        })
+        data = json.loads(response.data)
+        self.assertEqual([todo['title'] for todo in data], ['Due in 5'])
+        
+        response = self.client.get('/api/todos?due_before=soon')
+        self.assertEqual(response.status_code, 400)
+
+    def test_get_todos_sorted_pagination(self):
+        """Test sorting by title descending across pages"""
+        for title in ('b', 'd', 'a', 'c'):
+            self.client.post('/api/todos', json={'title': title})
+        
+        response = self.client.get('/api/todos?sort=title&order=desc&limit=3')
+        data = json.loads(response.data)
+        self.assertEqual([todo['title'] for todo in data], ['d', 'c', 'b'])
+        cursor = response.headers['X-Next-Cursor']
+        
+        response = self.client.get(f'/api/todos?sort=title&order=desc&limit=3&cursor={cursor}')
+        data = json.loads(response.data)
+        self.assertEqual([todo['title'] for todo in data], ['a'])
+        
+        # A cursor is only valid for the ordering it was issued for
+        response = self.client.get(f'/api/todos?sort=title&limit=3&cursor={cursor}')
+        self.assertEqual(response.status_code, 400)
+
+    def test_get_todos_invalid_sort(self):
+        """Test that unknown sort fields are rejected"""
+        response = self.client.get('/api/todos?sort=priority')
+        self.assertEqual(response.status_code, 400)
+        data = json.loads(response.data)
+        self.assertEqual(data['error'], 'Invalid sort field')
+
+    def test_get_todos_stream_json_array(self):
+        """Test streaming every todo as a single JSON array"""
+        for i in range(3):
+            self.client.post('/api/todos', json={'title': f'Todo {i}'})
+        
+        response = self.client.get('/api/todos?stream=true&limit=1')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_streamed)
+        self.assertEqual(response.mimetype, 'application/json')
+        data = json.loads(response.data)
+        self.assertEqual([todo['title'] for todo in data], ['Todo 0', 'Todo 1', 'Todo 2'])
+
+    def test_get_todos_stream_ndjson(self):
+        """Test streaming todos as NDJSON when the client asks for it"""
+        self.client.post('/api/todos', json={'title': 'Todo 1', 'category': 'Work'})
+        self.client.post('/api/todos', json={'title': 'Todo 2', 'category': 'Home'})
+        
+        response = self.client.get('/api/todos?category=Work',
+            headers={'Accept': 'application/x-ndjson'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        lines = response.get_data(as_text=True).splitlines()
+        self.assertEqual([json.loads(line)['title'] for line in lines], ['Todo 1'])
+
+    def test_get_overdue_todos_stream(self):
+        """Test streaming overdue todos"""
+        self.client.post('/api/todos', json={
+            'title': 'Overdue Todo',
+            'due_date': (datetime.utcnow() - timedelta(days=1)).isoformat()
+        })
+        
+        response = self.client.get('/api/todos/overdue?stream=true')
+        data = json.loads(response.data)
+        self.assertEqual([todo['title'] for todo in data], ['Overdue Todo'])
+
+    def test_get_todos_sparse_fields(self):
+        """Test limiting the returned fields with a sparse fieldset"""
+        for i in range(3):
+            self.client.post('/api/todos', json={'title': f'Todo {i}', 'category': 'Test'})
+        
+        response = self.client.get('/api/todos?fields=id,title&sort=title&limit=2')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual([set(todo) for todo in data], [{'id', 'title'}] * 2)
+        cursor = response.headers['X-Next-Cursor']
+        
+        response = self.client.get(f'/api/todos?fields=title&sort=title&limit=2&cursor={cursor}')
+        data = json.loads(response.data)
+        self.assertEqual(data, [{'title': 'Todo 2'}])
+
+    def test_get_todos_unknown_field(self):
+        """Test that unknown fields in a sparse fieldset are rejected"""
+        response = self.client.get('/api/todos?fields=id,secret')
+        self.assertEqual(response.status_code, 400)
+        data = json.loads(response.data)
+        self.assertEqual(data['error'], 'Unknown field: secret')
+
+    def test_bulk_operations(self):
+        """Test a mixed batch of create, update and delete operations"""
+        first_id = json.loads(self.client.post('/api/todos',
+            json={'title': 'First'}
+        ).data)['id']
+        second_id = json.loads(self.client.post('/api/todos',
+            json={'title': 'Second'}
+        ).data)['id']
+        
+        response = self.client.post('/api/todos/bulk', json={'operations': [
+            {'op': 'create', 'todo': {'title': 'Third', 'category': 'Bulk'}},
+            {'op': 'update', 'id': first_id, 'todo': {'completed': True}},
+            {'op': 'delete', 'id': second_id},
+            {'op': 'create', 'todo': {'category': 'No title'}},
+            {'op': 'delete', 'id': str(ObjectId())},
+            {'op': 'update', 'id': 'invalid_id', 'todo': {'title': 'x'}},
+            {'op': 'archive', 'id': first_id},
+        ]})
+        self.assertEqual(response.status_code, 200)
+        results = json.loads(response.data)['results']
+        self.assertEqual([result['status'] for result in results],
+                         [201, 200, 200, 400, 404, 404, 400])
+        self.assertEqual(results[0]['todo']['title'], 'Third')
+        self.assertEqual(results[3]['error'], 'Title is required')
+        
+        data = json.loads(self.client.get('/api/todos').data)
+        self.assertEqual([(todo['title'], todo['completed']) for todo in data],
+                         [('First', True), ('Third', False)])
+
+    def test_bulk_rejects_repeated_id(self):
+        """Test only the first operation on a todo in a batch runs"""
+        todo_id = json.loads(self.client.post('/api/todos',
+            json={'title': 'Todo', 'category': 'Work'}
+        ).data)['id']
+
+        response = self.client.post('/api/todos/bulk', json={'operations': [
+            {'op': 'update', 'id': todo_id, 'todo': {'completed': True}},
+            {'op': 'delete', 'id': todo_id},
+            {'op': 'delete', 'id': todo_id},
+        ]})
+        results = json.loads(response.data)['results']
+        self.assertEqual([result['status'] for result in results], [200, 400, 400])
+        self.assertEqual(results[1]['error'], 'Todo already targeted by an earlier operation')
+        self.assertTrue(json.loads(self.client.get(f'/api/todos/{todo_id}').data)['completed'])
+        self.assertEqual(json.loads(self.client.get('/api/categories?counts=true').data),
+                         [{'name': 'Work', 'count': 1}])
+
+    def test_bulk_requires_operations(self):
+        """Test that an empty or oversized batch is rejected"""
+        response = self.client.post('/api/todos/bulk', json={'operations': []})
+        self.assertEqual(response.status_code, 400)
+        
+        limit = self.app.config['TODOS_BULK_MAX_OPERATIONS']
+        response = self.client.post('/api/todos/bulk', json={'operations': [
+            {'op': 'create', 'todo': {'title': 'Todo'}}
+        ] * (limit + 1)})
+        self.assertEqual(response.status_code, 400)
+
+    def test_import_ndjson_reports_row_errors(self):
+        """Test invalid rows are reported by line while the valid ones are inserted"""
+        body = '\n'.join([
+            json.dumps({'title': 'First', 'category': 'Work', 'due_date': '2024-01-02T03:04:05'}),
+            json.dumps({'title': 'Bad date', 'due_date': 'tomorrow'}),
+            '',
+            'not json',
+            json.dumps({'category': 'Work'}),
+            json.dumps({'title': 'Last', 'completed': True}),
+        ])
+        response = self.client.post('/api/todos/import', data=body,
+                                    content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data), {
+            'imported': 2,
+            'failed': 3,
+            'errors': [
+                {'line': 2, 'error': 'Invalid due date format'},
+                {'line': 4, 'error': 'Invalid JSON'},
+                {'line': 5, 'error': 'Title is required'},
+            ],
+        })
+        self.assertEqual([todo['title'] for todo in json.loads(self.client.get('/api/todos').data)],
+                         ['First', 'Last'])
+        self.assertEqual(json.loads(self.client.get('/api/categories').data), ['Work'])
+        
+        response = self.client.post('/api/todos/import', data='title', content_type='text/plain')
+        self.assertEqual(response.status_code, 415)
+
+    def test_export_csv_round_trips_through_import(self):
+        """Test a CSV export, filtered like a listing, can be imported again"""
+        self.client.post('/api/todos', json={'title': 'Quoted, "title"', 'category': 'Work',
+                                             'due_date': '2024-01-02T03:04:05'})
+        self.client.post('/api/todos', json={'title': 'Done', 'completed': True})
+        
+        response = self.client.get('/api/todos/export?format=csv&completed=false')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/csv')
+        self.assertIn('filename=todos.csv', response.headers['Content-Disposition'])
+        exported = response.get_data(as_text=True)
+        self.assertTrue(exported.startswith('id,title,category,due_date,completed,'))
+        
+        with self.app.app_context():
+            Todo.clear_all()
+        result = json.loads(self.client.post('/api/todos/import', data=exported,
+                                             content_type='text/csv').data)
+        self.assertEqual((result['imported'], result['failed']), (1, 0))
+        todo, = json.loads(self.client.get('/api/todos').data)
+        self.assertEqual((todo['title'], todo['category'], todo['due_date'], todo['completed']),
+                         ('Quoted, "title"', 'Work', '2024-01-02T03:04:05', False))
+
+    def test_export_ndjson(self):
+        for title in ('A', 'B'):
+            self.client.post('/api/todos', json={'title': title})
+        response = self.client.get('/api/todos/export?fields=title&sort=title&order=desc')
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        self.assertEqual([json.loads(line) for line in response.get_data(as_text=True).splitlines()],
+                         [{'title': 'B'}, {'title': 'A'}])
+        self.assertEqual(self.client.get('/api/todos/export?format=xml').status_code, 400)
+
+    def test_get_categories_with_counts(self):
+        """Test getting categories with the number of todos in each"""
+        for category in ('Work', 'Home', 'Work', None):
+            self.client.post('/api/todos', json={'title': 'Todo', 'category': category})
+        
+        response = self.client.get('/api/categories?counts=true')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data), [
+            {'name': 'Home', 'count': 1},
+            {'name': 'Work', 'count': 2},
+        ])
+
+    def test_categories_cache_follows_writes(self):
+        """Test the category cache is maintained by create, update, delete and bulk"""
+        todo_id = json.loads(self.client.post('/api/todos',
+            json={'title': 'Todo', 'category': 'Work'}
+        ).data)['id']
+        self.assertEqual(json.loads(self.client.get('/api/categories').data), ['Work'])
+        
+        self.client.put(f'/api/todos/{todo_id}', json={'category': 'Home'})
+        self.assertEqual(json.loads(self.client.get('/api/categories').data), ['Home'])
+        
+        self.client.post('/api/todos/bulk', json={'operations': [
+            {'op': 'create', 'todo': {'title': 'Bulk', 'category': 'Errands'}},
+        ]})
+        self.assertEqual(json.loads(self.client.get('/api/categories').data),
+                         ['Errands', 'Home'])
+        
+        self.client.delete(f'/api/todos/{todo_id}')
+        self.assertEqual(json.loads(self.client.get('/api/categories').data), ['Errands'])
+
+    def test_categories_served_from_cache(self):
+        """Test writes that bypass the routes only show up after invalidation"""
+        self.assertEqual(json.loads(self.client.get('/api/categories').data), [])
+        with self.app.app_context():
+            Todo(title='Direct', category='Hidden').save()
+        self.assertEqual(json.loads(self.client.get('/api/categories').data), [])
+        
+        category_cache.invalidate()
+        self.assertEqual(json.loads(self.client.get('/api/categories').data), ['Hidden'])
+
+    def test_categories_reload_racing_a_write_is_not_kept(self):
+        """Test counts aggregated while a write was recorded are served once, not cached"""
+        counts, generation = category_cache.lookup()
+        self.assertIsNone(counts)
+        with self.app.app_context():
+            # The write lands before the aggregation, its record_change after it
+            Todo(title='Racing', category='Work').save()
+            aggregated = Todo.get_category_counts()
+        category_cache.record(None, {'category': 'Work'})
+
+        self.assertEqual(category_cache.load(aggregated, generation), {'Work': 1})
+        self.assertIsNone(category_cache.lookup()[0])
+        self.assertEqual(json.loads(self.client.get('/api/categories?counts=true').data),
+                         [{'name': 'Work', 'count': 1}])
+
+    def test_get_todo(self):
+        """Test fetching one todo by id, with a sparse fieldset and revalidation"""
+        todo_id = json.loads(self.client.post('/api/todos',
+            json={'title': 'Single', 'category': 'Work'}
+        ).data)['id']
+        
+        response = self.client.get(f'/api/todos/{todo_id}')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual((data['id'], data['title'], data['category']), (todo_id, 'Single', 'Work'))
+        self.assertEqual(json.loads(self.client.get(f'/api/todos/{todo_id}?fields=title').data),
+                         {'title': 'Single'})
+        
+        response = self.client.get(f'/api/todos/{todo_id}',
+                                   headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual(response.status_code, 304)
+        
+        self.assertEqual(self.client.get(f'/api/todos/{ObjectId()}').status_code, 404)
+        self.assertEqual(self.client.get('/api/todos/invalid').status_code, 404)
+
+    def test_get_todo_cache_follows_writes(self):
+        """Test single-todo reads come from the cache, and writes through the routes drop it"""
+        todo_id = json.loads(self.client.post('/api/todos', json={'title': 'Cached'}).data)['id']
+        before = todo_cache.stats()
+        self.client.get(f'/api/todos/{todo_id}')
+        with self.app.app_context():
+            # Bypasses the routes, so the cached copy is still served
+            Todo.update(ObjectId(todo_id), {'title': 'Direct'})
+        self.assertEqual(json.loads(self.client.get(f'/api/todos/{todo_id}').data)['title'],
+                         'Cached')
+        stats = todo_cache.stats()
+        self.assertEqual((stats['hits'] - before['hits'], stats['misses'] - before['misses'],
+                          stats['size']), (1, 1, 1))
+        
+        self.client.put(f'/api/todos/{todo_id}', json={'completed': True})
+        data = json.loads(self.client.get(f'/api/todos/{todo_id}').data)
+        self.assertEqual((data['title'], data['completed']), ('Direct', True))
+        
+        self.client.delete(f'/api/todos/{todo_id}')
+        self.assertEqual(self.client.get(f'/api/todos/{todo_id}').status_code, 404)
+        self.assertEqual(json.loads(self.client.get('/api/health').data)['todo_cache']['size'], 0)
+
+    def test_get_todo_stats(self):
+        """Test the stats aggregation, its date buckets and its invalidation by writes"""
+        now = datetime.utcnow()
+        for category, due_days, completed in (('Work', -1, False), ('Work', 1, True),
+                                              ('Home', -2, False), (None, None, False)):
+            due_date = (now + timedelta(days=due_days)).isoformat() if due_days else None
+            self.client.post('/api/todos', json={'title': 'Todo', 'category': category,
+                                                 'due_date': due_date, 'completed': completed})
+        
+        response = self.client.get('/api/todos/stats')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data), {
+            'total': 4, 'completed': 1, 'open': 3, 'overdue': 2,
+            'by_category': [
+                {'name': None, 'count': 1, 'completed': 0, 'overdue': 0},
+                {'name': 'Home', 'count': 1, 'completed': 0, 'overdue': 1},
+                {'name': 'Work', 'count': 2, 'completed': 1, 'overdue': 1},
+            ],
+        })
+        self.assertEqual(self.client.get('/api/todos/stats', headers={
+            'If-None-Match': response.headers['ETag']
+        }).status_code, 304)
+        
+        data = json.loads(self.client.get('/api/todos/stats?bucket=day').data)
+        self.assertEqual(data['bucket'], 'day')
+        self.assertEqual(data['created'], [{'period': now.strftime('%Y-%m-%d'), 'count': 4}])
+        self.assertEqual([group['period'] for group in data['due']], [None] + sorted(
+            (now + timedelta(days=days)).strftime('%Y-%m-%d') for days in (-2, -1, 1)
+        ))
+        self.assertEqual(self.client.get('/api/todos/stats?bucket=hour').status_code, 400)
+        
+        self.client.post('/api/todos', json={'title': 'New'})
+        self.assertEqual(json.loads(self.client.get('/api/todos/stats').data)['total'], 5)
+
+    def test_get_todos_conditional(self):
+        """Test ETag revalidation of the todo listing"""
+        self.client.post('/api/todos', json={'title': 'Todo 1'})
+        
+        response = self.client.get('/api/todos')
+        etag = response.headers['ETag']
+        self.assertIsNotNone(response.headers.get('Last-Modified'))
+        
+        response = self.client.get('/api/todos', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers['ETag'], etag)
+        
+        self.client.post('/api/todos', json={'title': 'Todo 2'})
+        response = self.client.get('/api/todos', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+        self.assertEqual(len(json.loads(response.data)), 2)
+
+    def test_get_todos_conditional_per_category(self):
+        """Test a category listing is only invalidated by writes to that category"""
+        self.client.post('/api/todos', json={'title': 'Work Todo', 'category': 'Work'})
+        etag = self.client.get('/api/todos?category=Work').headers['ETag']
+        
+        self.client.post('/api/todos', json={'title': 'Home Todo', 'category': 'Home'})
+        response = self.client.get('/api/todos?category=Work',
+            headers={'If-None-Match': etag}
+        )
+        self.assertEqual(response.status_code, 304)
+        
+        self.client.post('/api/todos', json={'title': 'More Work', 'category': 'Work'})
+        response = self.client.get('/api/todos?category=Work',
+            headers={'If-None-Match': etag}
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_get_overdue_and_categories_conditional(self):
+        """Test ETag revalidation of the overdue and category listings"""
+        self.client.post('/api/todos', json={
+            'title': 'Overdue Todo',
+            'category': 'Work',
+            'due_date': (datetime.utcnow() - timedelta(days=1)).isoformat()
+        })
+        for url in ('/api/todos/overdue', '/api/categories'):
+            etag = self.client.get(url).headers['ETag']
+            response = self.client.get(url, headers={'If-None-Match': etag})
+            self.assertEqual(response.status_code, 304, url)
+
+    def test_todo_changes_sync(self):
+        """Test delta sync reports creates, updates and deletes since a token"""
+        self.app.config['SYNC_LAG_SECONDS'] = 0
+        self.addCleanup(self.app.config.__setitem__, 'SYNC_LAG_SECONDS', 5)
+        first_id = json.loads(self.client.post('/api/todos', json={'title': 'First'}).data)['id']
+        second_id = json.loads(self.client.post('/api/todos', json={'title': 'Second'}).data)['id']
+        
+        response = self.client.get('/api/todos/changes')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual([todo['title'] for todo in data['changes']], ['First', 'Second'])
+        self.assertEqual(data['deleted'], [])
+        self.assertFalse(data['has_more'])
+        
+        self.client.post('/api/todos', json={'title': 'Third'})
+        self.client.put(f'/api/todos/{first_id}', json={'completed': True})
+        self.client.delete(f'/api/todos/{second_id}')
+        
+        data = json.loads(self.client.get('/api/todos/changes',
+            query_string={'since': data['next']}
+        ).data)
+        # Writes in the same millisecond tie on updated_at and fall back to _id order
+        changes = {todo['title']: todo for todo in data['changes']}
+        self.assertCountEqual(changes, ['Third', 'First'])
+        self.assertTrue(changes['First']['completed'])
+        self.assertEqual(data['deleted'], [second_id])
+        
+        data = json.loads(self.client.get('/api/todos/changes',
+            query_string={'since': data['next']}
+        ).data)
+        # Caught up: nothing new, though writes from the token's own millisecond may repeat
+        self.assertLessEqual({todo['title'] for todo in data['changes']}, {'Third', 'First'})
+        self.assertLessEqual(set(data['deleted']), {second_id})
+
+    def test_todo_changes_paging(self):
+        """Test a large change set is delivered over several calls"""
+        for i in range(3):
+            self.client.post('/api/todos', json={'title': f'Todo {i}'})
+        
+        titles = []
+        token = None
+        for _ in range(3):
+            data = json.loads(self.client.get('/api/todos/changes',
+                query_string={'since': token, 'limit': 2} if token else {'limit': 2}
+            ).data)
+            titles.extend(todo['title'] for todo in data['changes'])
+            token = data['next']
+            if not data['has_more']:
+                break
+        self.assertEqual(titles, ['Todo 0', 'Todo 1', 'Todo 2'])
+
+    def test_todo_changes_invalid_token(self):
+        """Test a malformed sync token is rejected"""
+        response = self.client.get('/api/todos/changes?since=garbage')
+        self.assertEqual(response.status_code, 400)
+        data = json.loads(response.data)
+        self.assertEqual(data['error'], 'Invalid sync token')
+
+        # Well-formed tokens whose positions aren't (naive datetime, ObjectId) pairs
+        object_id = str(ObjectId())
+        for position in ({'t': 'raw', 'v': None}, {'t': 'raw', 'v': 5},
+                         {'t': 'date', 'v': '2024-01-01T00:00:00+00:00'}):
+            payload = json.dumps({'u': [position, object_id], 'd': [position, object_id]})
+            token = base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+            with self.subTest(position=position):
+                response = self.client.get('/api/todos/changes', query_string={'since': token})
+                self.assertEqual(response.status_code, 400)
+
+    def test_health(self):
+        """Test the health check pings MongoDB and reports pool settings"""
+        response = self.client.get('/api/health')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data['status'], 'ok')
+        self.assertEqual(data['storage']['backend'], self.app.config['STORAGE_BACKEND'])
+        self.assertIsNone(data['storage']['error'])
+        if storage.backend == 'mongo':
+            self.assertEqual(data['pool']['max_size'], self.app.config['MONGO_MAX_POOL_SIZE'])
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -0,0 +1,126 @@
+import os
+import unittest
+from bson.objectid import ObjectId
+from todo_app import after_fork, create_app
+from todo_app.config import TestingConfig
+from todo_app.storage import storage
+from todo_app.write_behind import write_behind
+
+class WriteBehindConfig(TestingConfig):
+    WRITE_BEHIND_ENABLED = True
+
+class EnqueueConfig(WriteBehindConfig):
+    WRITE_BEHIND_DURABILITY = 'enqueue'
+    # Long enough that nothing is written until a test flushes
+    WRITE_BEHIND_FLUSH_MS = 60000
+
+class WriteBehindTestCase(unittest.TestCase):
+    config = WriteBehindConfig
+
+    def setUp(self):
+        self.app = create_app(self.config)
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        write_behind.close()
+        write_behind.enabled = False
+
+    def stored(self, todo_id):
+        return storage.db.todos.find_one({'_id': ObjectId(todo_id)})
+
+class TestWriteBehind(WriteBehindTestCase):
+    def test_flush_durability_answers_once_stored(self):
+        response = self.client.post('/api/todos', json={'title': 'Queued', 'category': 'Work'})
+        self.assertEqual(response.status_code, 201)
+        todo_id = response.get_json()['id']
+        self.assertEqual(self.stored(todo_id)['title'], 'Queued')
+
+        self.client.put(f'/api/todos/{todo_id}', json={'completed': True})
+        self.assertTrue(self.stored(todo_id)['completed'])
+
+        self.assertEqual(self.client.delete(f'/api/todos/{todo_id}').status_code, 200)
+        self.assertIsNone(self.stored(todo_id))
+        self.assertEqual(storage.db.todo_tombstones.count_documents({}), 1)
+        self.assertEqual(self.client.delete(f'/api/todos/{todo_id}').status_code, 404)
+
+    def test_missing_todo(self):
+        todo_id = str(ObjectId())
+        self.assertEqual(self.client.put(f'/api/todos/{todo_id}',
+                                         json={'title': 'x'}).status_code, 404)
+        self.assertEqual(self.client.delete(f'/api/todos/{todo_id}').status_code, 404)
+
+class TestWriteBehindEnqueue(WriteBehindTestCase):
+    config = EnqueueConfig
+
+    def test_writes_coalesce_until_flushed(self):
+        """Test repeated writes to one todo wait as a single operation"""
+        todo_id = self.client.post('/api/todos', json={'title': 'Draft'}).get_json()['id']
+        self.client.put(f'/api/todos/{todo_id}', json={'title': 'Final'})
+        self.client.put(f'/api/todos/{todo_id}', json={'category': 'Work'})
+        self.assertIsNone(self.stored(todo_id))
+
+        self.assertTrue(write_behind.flush(5))
+        stored = self.stored(todo_id)
+        self.assertEqual((stored['title'], stored['category']), ('Final', 'Work'))
+        stats = write_behind.stats()
+        self.assertEqual((stats['queued'], stats['coalesced'], stats['written']), (1, 2, 1))
+
+        # Updates to a stored todo merge into one $set; a delete after them wins
+        self.client.put(f'/api/todos/{todo_id}', json={'completed': True})
+        self.assertEqual(self.client.get('/api/categories?counts=true').get_json(),
+                         [{'name': 'Work', 'count': 1}])
+        self.client.delete(f'/api/todos/{todo_id}')
+        self.assertEqual(self.client.put(f'/api/todos/{todo_id}',
+                                         json={'title': 'Gone'}).status_code, 404)
+        write_behind.flush(5)
+        self.assertIsNone(self.stored(todo_id))
+        self.assertEqual(write_behind.stats()['written'], 2)
+
+    def test_delete_cancels_queued_insert(self):
+        todo_id = self.client.post('/api/todos', json={'title': 'Never stored'}).get_json()['id']
+        self.assertEqual(self.client.delete(f'/api/todos/{todo_id}').status_code, 200)
+        self.assertEqual(write_behind.stats()['pending'], 0)
+        write_behind.flush(5)
+        self.assertEqual(storage.db.todo_tombstones.count_documents({}), 0)
+
+    def test_versions_bumped_after_flush(self):
+        """Test listing ETags only change once the queued writes are stored"""
+        etag = self.client.get('/api/todos').headers['ETag']
+        self.client.post('/api/todos', json={'title': 'Queued'})
+        self.assertEqual(self.client.get('/api/todos').headers['ETag'], etag)
+
+        write_behind.flush(5)
+        response = self.client.get('/api/todos')
+        self.assertNotEqual(response.headers['ETag'], etag)
+        self.assertEqual([todo['title'] for todo in response.get_json()], ['Queued'])
+
+    def test_forked_worker_leaves_parent_writes_behind(self):
+        """Test a worker forked after create_app drops the writes it inherited and flushes its own"""
+        self.client.post('/api/todos', json={'title': 'Parent'})
+
+        def worker():
+            after_fork(self.app)
+            if write_behind.stats()['pending']:
+                return False
+            todo_id = self.client.post('/api/todos', json={'title': 'Worker'}).get_json()['id']
+            return (write_behind.flush(5) and self.stored(todo_id)['title'] == 'Worker'
+                    and storage.db.todos.count_documents({}) == 1)
+
+        pid = os.fork()
+        if pid == 0:
+            try:
+                passed = worker()
+            except BaseException:
+                passed = False
+            os._exit(0 if passed else 1)
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+        self.assertEqual(write_behind.stats()['pending'], 1)
+
+    def test_close_drains_queue(self):
+        todo_id = self.client.post('/api/todos', json={'title': 'Drained'}).get_json()['id']
+        write_behind.close()
+        self.assertEqual(self.stored(todo_id)['title'], 'Drained')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+import hashlib
+import time
+from datetime import datetime
+from functools import wraps
+from flask import current_app, g, make_response, request
+from pymongo import UpdateOne
+from todo_app.storage import storage
+
+# Version documents live in their own small collection, one per scope: the
+# whole todos collection plus one per category. Reading one is a point lookup
+# by _id, far cheaper than the listing query it lets a 304 skip.
+COLLECTION_SCOPE = 'todos'
+
+def category_scope(category):
+    return f'category:{category}'
+
+def get_version(scope):
+    """Return (version, updated_at) for scope; (0, None) if it was never written"""
+    return version_from(storage.db.todo_versions.find_one({'_id': scope}))
+
+def version_from(doc):
+    """(version, updated_at) from a version document, or (0, None) for a missing one"""
+    if doc is None:
+        return 0, None
+    return doc['version'], doc['updated_at']
+
+def bump_operations(scopes):
+    """Write operations incrementing the version of every scope"""
+    now = datetime.utcnow()
+    return [
+        UpdateOne(
+            {'_id': scope},
+            {'$inc': {'version': 1}, '$set': {'updated_at': now}},
+            upsert=True
+        ) for scope in sorted(scopes)
+    ]
+
+def bump(scopes):
+    """Increment the version of every scope in one round trip"""
+    storage.db.todo_versions.bulk_write(bump_operations(scopes), ordered=False)
+
+def changed_scopes(before, after):
+    """Version scopes touched by a todo change"""
+    scopes = {COLLECTION_SCOPE}
+    for doc in (before, after):
+        if doc and doc.get('category'):
+            scopes.add(category_scope(doc['category']))
+    return scopes
+
+def record_change(before, after):
+    """Mark the scopes touched by a todo change; bump_changed() writes them out"""
+    g.setdefault('changed_version_scopes', set()).update(changed_scopes(before, after))
+
+def pop_changed():
+    """Take the scopes recorded during this request, leaving none to bump"""
+    return g.pop('changed_version_scopes', set())
+
+def bump_changed():
+    """Bump every scope recorded during this request, if any"""
+    scopes = pop_changed()
+    if scopes:
+        bump(scopes)
+
+def content_etag(payload):
+    """ETag derived from a small response payload itself"""
+    return hashlib.sha1(payload).hexdigest()
+
+def is_fresh(req, etag, last_modified=None):
+    """True if req's If-None-Match/If-Modified-Since still match etag/last_modified"""
+    if req.if_none_match:
+        return req.if_none_match.contains_weak(etag)
+    if last_modified is not None and req.if_modified_since is not None:
+        return last_modified.replace(microsecond=0) <= req.if_modified_since.replace(tzinfo=None)
+    return False
+
+def listing_etag(version, updated_at, ndjson=False, window=None):
+    """ETag for a listing at a scope version; window buckets it by time (seconds)"""
+    etag = f'{version}.{updated_at.timestamp() if updated_at else 0}'
+    if ndjson:
+        etag += '.ndjson'
+    if window:
+        etag += f'.{int(time.time() // window)}'
+    return etag
+
+def not_modified(etag, last_modified=None):
+    """304 response if the request's validators still match, otherwise None"""
+    if not is_fresh(request, etag, last_modified):
+        return None
+    response = make_response('', 304)
+    response.set_etag(etag, weak=True)
+    response.headers['Vary'] = 'Accept'
+    return response
+
+def versioned(scope_func, window_setting=None):
+    """Decorate a listing view with ETag/Last-Modified validators.
+
+    scope_func() names the version scope the response depends on. The
+    version is checked before the view runs, so a matching If-None-Match or
+    If-Modified-Since is answered with 304 without querying the todos. For
+    listings that also change with the clock (overdue), window_setting names
+    the config value holding how many seconds a validator stays valid;
+    Last-Modified is not sent for those.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            from todo_app.streaming import wants_ndjson
+            version, updated_at = get_version(scope_func())
+            window = current_app.config[window_setting] if window_setting else None
+            etag = listing_etag(version, updated_at, wants_ndjson(), window)
+            last_modified = None if window else updated_at
+            
+            response = not_modified(etag, last_modified)
+            if response is not None:
+                return response
+            
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                response.set_etag(etag, weak=True)
+                if last_modified is not None:
+                    response.last_modified = last_modified
+                response.vary.add('Accept')
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,359 @@
+"""Write-behind queue: todo writes flushed to storage as batched bulk_writes.
+
+With WRITE_BEHIND_ENABLED the write routes hand creates, updates and
+deletes to an in-process queue instead of writing them one by one. A
+background thread writes the queue out as one unordered bulk_write once
+WRITE_BEHIND_BATCH_SIZE writes are waiting or WRITE_BEHIND_FLUSH_MS after
+the oldest arrived, whichever comes first. The queue is keyed by todo _id,
+so repeated writes to one todo coalesce into a single operation while they
+wait: updates merge into one $set, an update folds into a queued insert,
+and a delete cancels a queued insert outright.
+
+WRITE_BEHIND_DURABILITY decides when a write is acknowledged. 'flush' (the
+default) holds the request until its batch is written and reports failures
+like a direct write would, so the gain is fewer, larger round trips under
+concurrent load. 'enqueue' answers as soon as the write is queued: lower
+latency, but a write is lost if the process dies before its batch is
+written, and failures can only be logged. Queued writes are drained when
+the process exits.
+
+Listing reads still go to storage, so with 'enqueue' they may not show a
+write for up to one flush interval; updates and deletes look through the
+queue, so they always see the writes ahead of them.
+"""
+import atexit
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+from bson.objectid import ObjectId
+
+logger = logging.getLogger(__name__)
+
+DURABILITIES = ('flush', 'enqueue')
+
+INSERT, UPDATE, DELETE = 'insert', 'update', 'delete'
+
+class WriteFailed(Exception):
+    """Raised to the request whose queued write could not be written"""
+
+class _Entry:
+    """The coalesced pending write for one todo"""
+    __slots__ = ('op', 'document', 'updates', 'futures')
+
+    def __init__(self, op, document=None, updates=None):
+        self.op = op
+        self.document = document
+        self.updates = updates
+        self.futures = []
+
+    def apply(self, doc):
+        """The todo document after this write, given the one before it"""
+        if self.op == INSERT:
+            return dict(self.document)
+        if self.op == DELETE or doc is None:
+            return None
+        return dict(doc, **self.updates)
+
+class WriteBehindQueue:
+    def __init__(self, batch_size=500, flush_interval=0.02, max_pending=10000,
+                 durability='flush'):
+        self.enabled = False
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.durability = durability
+        self._lock = threading.Lock()
+        # Wakes the worker (new writes, flush or close requested) and the
+        # threads waiting for room or for a flush to finish
+        self._changed = threading.Condition(self._lock)
+        self._pending = {}  # _id -> _Entry, in arrival order
+        self._flushing = {}  # _id -> _Entry being written by the current batch
+        self._oldest = None  # monotonic arrival time of the oldest pending write
+        self._scopes = set()  # version scopes to bump once pending writes land
+        self._generation = 0  # batches written so far
+        self._flush_requested = False
+        self._closing = False
+        self._thread = None
+        self._stats = None
+        self._atexit_registered = False
+        self._reset_stats()
+
+    def init_app(self, app):
+        durability = app.config['WRITE_BEHIND_DURABILITY']
+        if durability not in DURABILITIES:
+            raise ValueError(f'Unknown WRITE_BEHIND_DURABILITY: {durability}')
+        # Writes queued for a previous app must reach the storage they were meant for
+        self.close()
+        self.enabled = app.config['WRITE_BEHIND_ENABLED']
+        self.durability = durability
+        self.batch_size = app.config['WRITE_BEHIND_BATCH_SIZE']
+        self.flush_interval = app.config['WRITE_BEHIND_FLUSH_MS'] / 1000
+        self.max_pending = app.config['WRITE_BEHIND_MAX_PENDING']
+        self._reset_stats()
+        if self.enabled and not self._atexit_registered:
+            atexit.register(self.close)
+            self._atexit_registered = True
+
+    def after_fork(self):
+        """Start over in a forked worker.
+
+        The worker inherits the queue but not the thread that writes it
+        out. Writes queued before the fork are the parent's to write.
+        """
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._pending = {}
+        self._flushing = {}
+        self._oldest = None
+        self._scopes = set()
+        self._flush_requested = False
+        self._closing = False
+        self._thread = None
+        self._reset_stats()
+
+    @property
+    def acknowledges_on_enqueue(self):
+        return self.enabled and self.durability == 'enqueue'
+
+    def insert(self, document):
+        """Queue a new todo document; returns it with the _id it will be stored under"""
+        document = dict(document, _id=ObjectId())
+        with self._lock:
+            entry = self._enqueue(document['_id'])
+            entry.op, entry.document = INSERT, document
+            future = self._track(entry)
+        self._wait(future)
+        return document
+
+    def update(self, todo_id, updates):
+        """Queue a $set of updates; returns the todo as it was before, or None if it doesn't exist"""
+        return self._write(todo_id, UPDATE, updates)
+
+    def delete(self, todo_id):
+        """Queue a delete; returns the deleted todo, or None if it doesn't exist"""
+        return self._write(todo_id, DELETE)
+
+    def bump_after_flush(self, scopes):
+        """Bump listing version scopes once the writes queued so far are written.
+
+        Bumping earlier would let a listing read before the flush be cached
+        under the new version.
+        """
+        if scopes:
+            with self._lock:
+                self._scopes.update(scopes)
+                self._start()
+                self._changed.notify_all()
+
+    def flush(self, timeout=None):
+        """Write out everything queued so far; False if timeout ran out first"""
+        with self._lock:
+            if self._thread is None:
+                return True
+            self._flush_requested = True
+            self._changed.notify_all()
+            return self._changed.wait_for(
+                lambda: not (self._pending or self._flushing or self._scopes), timeout
+            )
+
+    def close(self, timeout=None):
+        """Drain the queue and stop the worker thread"""
+        with self._lock:
+            thread = self._thread
+            if thread is None:
+                return
+            self._closing = True
+            self._changed.notify_all()
+        thread.join(timeout)
+        with self._lock:
+            self._thread = None
+            self._closing = False
+
+    def stats(self):
+        """Counters since init_app: writes queued and coalesced, batches and operations written"""
+        with self._lock:
+            return dict(self._stats, pending=len(self._pending))
+
+    def _reset_stats(self):
+        with self._lock:
+            self._stats = {'queued': 0, 'coalesced': 0, 'batches': 0, 'written': 0, 'failed': 0}
+
+    def _write(self, todo_id, op, updates=None):
+        """Queue an update or delete against the todo as the queue will leave it.
+
+        The stored document is read outside the lock. If a batch finished
+        in the meantime the read may predate it, so the lookup starts over.
+        """
+        while True:
+            with self._lock:
+                generation = self._generation
+                layers = self._layers(todo_id)
+            stored = None
+            if not layers or layers[0].op == UPDATE:
+                from todo_app.models.todo import Todo
+                stored = Todo.get_by_id(todo_id)
+            with self._lock:
+                if todo_id not in self._pending and len(self._pending) >= self.max_pending:
+                    # Waiting for room lets batches land, so look again afterwards
+                    self._changed.wait_for(lambda: len(self._pending) < self.max_pending)
+                    continue
+                if self._generation != generation:
+                    continue
+                previous = stored
+                for layer in self._layers(todo_id):
+                    previous = layer.apply(previous)
+                if previous is None:
+                    return None
+                entry = self._enqueue(todo_id)
+                future = self._track(entry)
+                self._coalesce(todo_id, entry, op, updates)
+            self._wait(future)
+            return previous
+
+    def _layers(self, todo_id):
+        """The in-flight, then pending, writes to a todo, oldest first"""
+        return [entry for entry in (self._flushing.get(todo_id), self._pending.get(todo_id))
+                if entry is not None]
+
+    def _enqueue(self, todo_id):
+        """The pending entry for todo_id, making room for a new one if needed"""
+        entry = self._pending.get(todo_id)
+        if entry is not None:
+            self._stats['coalesced'] += 1
+            return entry
+        self._start()
+        self._changed.wait_for(lambda: len(self._pending) < self.max_pending)
+        entry = self._pending[todo_id] = _Entry(None)
+        if self._oldest is None:
+            self._oldest = time.monotonic()
+        self._stats['queued'] += 1
+        if len(self._pending) in (1, self.batch_size):
+            self._changed.notify_all()
+        return entry
+
+    def _coalesce(self, todo_id, entry, op, updates):
+        if entry.op is None:
+            entry.op, entry.updates = op, dict(updates or {})
+        elif entry.op == DELETE:
+            pass  # the todo is already going away
+        elif op == DELETE and entry.op == INSERT:
+            # Never written, so there is nothing to delete; done as of now
+            del self._pending[todo_id]
+            if not self._pending:
+                self._oldest = None
+            self._settle(entry.futures, None)
+            self._changed.notify_all()
+        elif op == DELETE:
+            entry.op, entry.updates = DELETE, None
+        elif entry.op == INSERT:
+            entry.document.update(updates)
+        else:
+            entry.updates.update(updates)
+
+    def _track(self, entry):
+        """A future for entry's write, if the request is to wait for it"""
+        if self.durability != 'flush':
+            return None
+        future = Future()
+        entry.futures.append(future)
+        return future
+
+    @staticmethod
+    def _wait(future):
+        if future is not None:
+            error = future.result()
+            if error is not None:
+                raise WriteFailed(error)
+
+    @staticmethod
+    def _settle(futures, error):
+        for future in futures:
+            future.set_result(error)
+
+    def _start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+            self._thread.start()
+
+    def _take_batch(self):
+        """Wait for a batch to be due, then move it from pending to flushing"""
+        with self._lock:
+            self._changed.wait_for(lambda: self._pending or self._scopes or self._closing)
+            while (len(self._pending) < self.batch_size and self._pending
+                   and not (self._closing or self._flush_requested)):
+                remaining = self._oldest + self.flush_interval - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._changed.wait(remaining)
+            for todo_id in list(self._pending)[:self.batch_size]:
+                self._flushing[todo_id] = self._pending.pop(todo_id)
+            scopes = set()
+            if not self._pending:
+                self._oldest = None
+                # Scopes recorded so far belong to writes in this batch or earlier ones
+                scopes, self._scopes = self._scopes, set()
+                self._flush_requested = False
+            self._changed.notify_all()
+            return dict(self._flushing), scopes
+
+    def _run(self):
+        while True:
+            batch, scopes = self._take_batch()
+            if batch:
+                errors = self._write_batch(batch)
+            if scopes:
+                try:
+                    from todo_app import versioning
+                    versioning.bump(scopes)
+                except Exception:
+                    logger.exception('Failed to bump todo versions after a write-behind flush')
+            if batch:
+                # Reads between the queueing and now may have cached the stored version
+                from todo_app.cache import stats_cache, todo_cache
+                for todo_id in batch:
+                    todo_cache.invalidate(todo_id)
+                stats_cache.invalidate()
+            with self._lock:
+                if batch:
+                    self._flushing.clear()
+                    self._generation += 1
+                    self._stats['batches'] += 1
+                    self._stats['written'] += len(batch) - len(errors)
+                    self._stats['failed'] += len(errors)
+                self._changed.notify_all()
+                if self._closing and not (self._pending or self._scopes):
+                    return
+            if batch:
+                for todo_id, entry in batch.items():
+                    self._settle(entry.futures, errors.get(todo_id))
+
+    def _write_batch(self, batch):
+        """Write one batch; returns {_id: error message} for the writes that failed"""
+        from todo_app.models.todo import Todo
+        now = datetime.utcnow()
+        ids, operations = [], []
+        for todo_id, entry in batch.items():
+            ids.append(todo_id)
+            if entry.op == INSERT:
+                operations.append(Todo.insert_op(dict(entry.document, updated_at=now)))
+            elif entry.op == UPDATE:
+                operations.append(Todo.update_op(todo_id, entry.updates))
+            else:
+                operations.append(Todo.delete_op(todo_id))
+        try:
+            errors = {ids[index]: message for index, message in Todo.bulk(operations).items()}
+            deleted = [todo_id for todo_id, entry in batch.items()
+                       if entry.op == DELETE and todo_id not in errors]
+            if deleted:
+                Todo.add_tombstones(deleted)
+        except Exception as e:
+            logger.exception('Write-behind batch of %d writes failed', len(batch))
+            return {todo_id: str(e) for todo_id in batch}
+        for todo_id, message in errors.items():
+            logger.error('Write-behind %s of todo %s failed: %s', batch[todo_id].op, todo_id,
+                         message)
+        return errors
+
+write_behind = WriteBehindQueue()